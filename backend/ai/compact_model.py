@@ -0,0 +1,169 @@
+import json
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+
+# -----------------------
+# COMPACT INTENT MODEL
+# -----------------------
+# NumPy-only re-implementation of the TfidfVectorizer + LogisticRegression
+# pipeline from train_models.py (and of the HashingVectorizer + SGDClassifier
+# pipeline from online_training.py). Workers can classify messages without
+# importing sklearn/scipy; the weights live in a small .npz file.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPACT_MODEL_PATH = os.path.join(BASE_DIR, 'menu_ai_model.npz')
+
+MASK32 = 0xFFFFFFFF
+
+
+def _rotl32(x: int, r: int) -> int:
+    return ((x << r) | (x >> (32 - r))) & MASK32
+
+
+@lru_cache(maxsize=65536)
+def murmurhash3_32(key: str, seed: int = 0) -> int:
+    """Signed 32-bit MurmurHash3 of the UTF-8 bytes, as sklearn.utils.murmurhash3_32."""
+    data = key.encode("utf-8")
+    n = len(data)
+    h = seed & MASK32
+    tail = n - n % 4
+    for i in range(0, tail, 4):
+        k = int.from_bytes(data[i:i + 4], "little")
+        k = _rotl32((k * 0xCC9E2D51) & MASK32, 15)
+        h ^= (k * 0x1B873593) & MASK32
+        h = (_rotl32(h, 13) * 5 + 0xE6546B64) & MASK32
+    k = int.from_bytes(data[tail:], "little")
+    if k or n % 4:
+        k = _rotl32((k * 0xCC9E2D51) & MASK32, 15)
+        h ^= (k * 0x1B873593) & MASK32
+    h ^= n
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & MASK32
+    h ^= h >> 13
+    h = (h * 0xC2B2AE35) & MASK32
+    h ^= h >> 16
+    return h - 0x100000000 if h & 0x80000000 else h
+
+
+def _hashed_column(gram: str, n_features: int):
+    """Column and sign of an n-gram, as HashingVectorizer assigns them."""
+    h = murmurhash3_32(gram)
+    if h == -0x80000000:
+        return (0x7FFFFFFF - (n_features - 1)) % n_features, -1.0
+    return abs(h) % n_features, (1.0 if h >= 0 else -1.0)
+
+
+class CompactIntentModel:
+    """Same predict/predict_proba/classes_ interface as the fitted sklearn pipeline."""
+
+    def __init__(self, terms, idf, coef, intercept, classes, config: dict):
+        # "tfidf": fixed vocabulary + IDF weights; "hashing": n-grams hashed into n_features columns
+        self.kind = config.get("vectorizer", "tfidf")
+        self.vocabulary = {t: i for i, t in enumerate(terms)}
+        self.idf = idf
+        self.n_features = config.get("n_features", len(idf))
+        self.alternate_sign = config.get("alternate_sign", False)
+        # "softmax" for multinomial LogisticRegression, "ovr" for SGDClassifier(loss="log_loss")
+        self.proba = config.get("proba", "softmax")
+        self.meta = config.get("meta", {})
+        self.coef_t = np.ascontiguousarray(coef.T)
+        self.intercept = intercept
+        self.classes_ = classes
+        self.token_re = re.compile(config["token_pattern"])
+        self.ngram_range = tuple(config["ngram_range"])
+        self.norm = config["norm"]
+        self.sublinear_tf = config["sublinear_tf"]
+        self.lowercase = config["lowercase"]
+
+    @classmethod
+    def load(cls, path: str = COMPACT_MODEL_PATH) -> "CompactIntentModel":
+        data = np.load(path, allow_pickle=False)
+        config = json.loads(str(data["config"]))
+        return cls(data["terms"].tolist(), data["idf"], data["coef"], data["intercept"], data["classes"], config)
+
+    def _ngrams(self, text: str):
+        tokens = self.token_re.findall(text.lower() if self.lowercase else text)
+        lo, hi = self.ngram_range
+        for n in range(lo, hi + 1):
+            for i in range(len(tokens) - n + 1):
+                yield " ".join(tokens[i:i + n])
+
+    def transform(self, texts: list) -> np.ndarray:
+        """TF-IDF (or hashed TF) features for a batch of texts, dense."""
+        X = np.zeros((len(texts), self.n_features))
+        for row, text in enumerate(texts):
+            for gram in self._ngrams(text):
+                if self.kind == "hashing":
+                    col, sign = _hashed_column(gram, self.n_features)
+                    X[row, col] += sign if self.alternate_sign else 1.0
+                    continue
+                col = self.vocabulary.get(gram)
+                if col is not None:
+                    X[row, col] += 1.0
+        if self.kind == "tfidf":
+            if self.sublinear_tf:
+                nonzero = X > 0
+                X[nonzero] = np.log(X[nonzero]) + 1.0
+            X *= self.idf
+        if self.norm == "l2":
+            norms = np.linalg.norm(X, axis=1, keepdims=True)
+            np.divide(X, norms, out=X, where=norms > 0)
+        return X
+
+    def predict_proba(self, texts: list) -> np.ndarray:
+        scores = self.transform(texts) @ self.coef_t + self.intercept
+        if scores.shape[1] == 1:
+            p = 1.0 / (1.0 + np.exp(-scores))
+            return np.hstack([1.0 - p, p])
+        if self.proba == "ovr":
+            p = 1.0 / (1.0 + np.exp(-scores))
+            totals = p.sum(axis=1, keepdims=True)
+            return np.divide(p, totals, out=np.full_like(p, 1.0 / p.shape[1]), where=totals > 0)
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        return scores / scores.sum(axis=1, keepdims=True)
+
+    def predict(self, texts: list) -> np.ndarray:
+        return self.classes_[self.predict_proba(texts).argmax(axis=1)]
+
+
+def export_compact(pipeline, path: str = COMPACT_MODEL_PATH, meta: dict = None) -> str:
+    """Write the vocabulary, IDF weights and classifier weights of a fitted pipeline to .npz."""
+    vectorizer = pipeline.named_steps['vectorizer']
+    classifier = pipeline.named_steps['classifier']
+    config = {
+        "token_pattern": vectorizer.token_pattern,
+        "ngram_range": list(vectorizer.ngram_range),
+        "norm": vectorizer.norm,
+        "lowercase": bool(vectorizer.lowercase),
+        # SGDClassifier normalizes one-vs-rest sigmoids; LogisticRegression uses softmax
+        "proba": "ovr" if type(classifier).__name__ == "SGDClassifier" else "softmax",
+        "meta": meta or {},
+    }
+    if hasattr(vectorizer, "vocabulary_"):
+        terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+        idf = vectorizer.idf_.astype(np.float64)
+        config.update(vectorizer="tfidf", sublinear_tf=bool(vectorizer.sublinear_tf))
+    else:
+        terms, idf = [], np.zeros(0)
+        config.update(vectorizer="hashing", sublinear_tf=False, n_features=int(vectorizer.n_features),
+                      alternate_sign=bool(vectorizer.alternate_sign))
+    np.savez_compressed(
+        path,
+        terms=np.array(terms, dtype=str),
+        idf=idf,
+        coef=classifier.coef_.astype(np.float64),
+        intercept=classifier.intercept_.astype(np.float64),
+        classes=np.array([str(c) for c in classifier.classes_], dtype=str),
+        config=np.array(json.dumps(config)),
+    )
+    return path
+
+
+if __name__ == "__main__":
+    # Convert the existing pickle without retraining: python -m ai.compact_model
+    import joblib
+    pipeline = joblib.load(os.path.join(BASE_DIR, 'menu_ai_model.pkl'))
+    print(f"SUCCESS: Compact model saved at '{export_compact(pipeline)}'")
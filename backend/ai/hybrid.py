@@ -0,0 +1,152 @@
+import os
+import threading
+from collections import deque
+
+from ai.recommendation import get_recommendation, to_ai_category
+from ai.similarity import get_similarity_index
+
+# -----------------------
+# CONFIGURATION
+# -----------------------
+# Minimum classifier probability for answering without the LLM on the classifier's
+# word alone; below it keywords must back the answer. The bundled 3-class model
+# (no "other" class) gives off-topic chat 0.43-0.52 and its own training phrases
+# at most 0.60, so today only keyword-backed requests take the fast path
+FAST_PATH_THRESHOLD = float(os.getenv("AI_FAST_PATH_THRESHOLD", "0.8"))
+# Latency samples kept per path for percentile reporting
+LATENCY_WINDOW = 2000
+
+REC_KEYS = ["coffee", "tea", "cold", "sweet"]
+DIET_WORDS = {"vegan": "vegan", "sugar_free": "sugar-free", "low_calorie": "low calorie"}
+
+
+# -----------------------
+# LOCAL FAST PATH
+# -----------------------
+def has_local_signal(intent: dict) -> bool:
+    """True when the intent carries something the rule-based recommender can act on."""
+    return bool(intent.get("exclude_labels")) or any(intent.get(k) for k in DIET_WORDS)
+
+
+def local_reply(intent: dict, like: str = None) -> str:
+    """Short conversational reply describing what was filtered for."""
+    wanted = " and ".join(word for key, word in DIET_WORDS.items() if intent.get(key))
+    text = f"Here are some {wanted} picks" if wanted else "Here are some picks"
+    text += f" similar to {like}" if like else " from our menu"
+    if intent.get("exclude_labels"):
+        text += " without " + ", ".join(sorted(intent["exclude_labels"]))
+    return text + ". Enjoy!"
+
+
+def keyword_intent(intent: dict) -> dict:
+    """
+    The intent as far as keywords back it: diet flags named outright and the
+    exclusions of negation-scoped ingredients, without the classifier's guesses.
+    """
+    named = intent.get("keyword_flags", [])
+    return dict(intent, exclude_labels=intent.get("exclude_labels", []) if intent.get("negated") else [],
+                **{key: key in named for key in DIET_WORDS})
+
+
+def _grouped(products: list) -> dict:
+    grouped = {key: [] for key in REC_KEYS}
+    for p in products:
+        grouped.setdefault(to_ai_category(p.get("category")), []).append(p)
+    return grouped
+
+
+def answer_similar(intent: dict, message: str, products: list, version=None,
+                   threshold: float = FAST_PATH_THRESHOLD, branch=None):
+    """
+    "Something like a latte but vegan": the named product's precomputed
+    neighbours, filtered by the intent's exclusions and diet flags (only those
+    named outright unless the classifier is confident). None when no menu
+    product is named, nothing passes the filters or the table is still building.
+    """
+    index = get_similarity_index(products, version)
+    if index is None:
+        return None
+    product_id = index.find_product(message)
+    if product_id is None:
+        return None
+    if intent.get("confidence", 0.0) < threshold:
+        intent = keyword_intent(intent)
+    diet = [key for key in DIET_WORDS if intent.get(key)]
+    pairs = index.similar(product_id, exclude=intent.get("exclude_labels", []), diet=diet, branch=branch)
+    if not pairs:
+        return None
+    like = index.products[index.position[product_id]]["name"]
+    return {"reply": local_reply(intent, like), "recommendations": _grouped([p for p, _ in pairs])}
+
+
+def answer_locally(intent: dict, products: list, version=None, threshold: float = FAST_PATH_THRESHOLD,
+                   message: str = "", branch=None):
+    """
+    Answer straight from get_recommendation() when the classifier is confident,
+    or when keywords named the allergy/diet outright; the filters then come from
+    the keywords alone (keyword_intent), never from an unsure classifier. Requests for something similar to a named product are
+    answered from the similarity table. Returns a response in the same schema
+    as the LLM path, or None to fall back. `products` and `version` are the base
+    menu's; a branch (branches.BranchMenu) narrows and reprices the answer.
+    """
+    if intent.get("similar") and message:
+        similar = answer_similar(intent, message, products, version, threshold, branch)
+        if similar is not None:
+            return similar
+
+    if intent.get("confidence", 0.0) < threshold:
+        if intent.get("keyword_label") is None:
+            return None
+        intent = keyword_intent(intent)
+    if not has_local_signal(intent):
+        return None
+    recs = get_recommendation(intent, products, version=version, branch=branch)
+    if not recs:
+        return None
+
+    return {"reply": local_reply(intent), "recommendations": _grouped(recs)}
+
+
+# -----------------------
+# PATH STATISTICS
+# -----------------------
+class PathStats:
+    """Thread-safe request counts and recent latencies per answer path (local / llm)."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._window = window
+        self._counts = {}
+        self._latencies = {}
+
+    def record(self, path: str, seconds: float) -> None:
+        with self._lock:
+            self._counts[path] = self._counts.get(path, 0) + 1
+            self._latencies.setdefault(path, deque(maxlen=self._window)).append(seconds)
+
+    def snapshot(self) -> dict:
+        """Counts, fast-path hit rate and p50/p99 latency (ms) per path."""
+        with self._lock:
+            counts = dict(self._counts)
+            samples = {k: sorted(v) for k, v in self._latencies.items()}
+        total = sum(counts.values())
+        return {
+            "total": total,
+            "fast_path_hit_rate": round(counts.get("local", 0) / total, 4) if total else 0.0,
+            "paths": {
+                path: {
+                    "count": counts[path],
+                    "p50_ms": round(_percentile(samples[path], 50) * 1000, 2),
+                    "p99_ms": round(_percentile(samples[path], 99) * 1000, 2),
+                }
+                for path in counts
+            },
+        }
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
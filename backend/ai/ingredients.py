@@ -0,0 +1,221 @@
+import re
+from functools import lru_cache
+
+from ai.menu import MENU, MENU_META
+
+# -----------------------
+# ALLERGEN IMPLICATIONS
+# -----------------------
+# Avoiding the key means avoiding everything listed under it (and, transitively, what those imply)
+ALLERGEN_IMPLIES = {
+    "nuts": ["almond", "peanut"],
+    "milk": ["lactose", "yogurt", "ice_cream"],
+    "lactose": ["yogurt", "ice_cream"],
+    "gluten": ["oreo"],
+    "chocolate": ["oreo"],
+    "fruit": ["apple", "banana", "blueberry", "strawberry", "pineapple", "watermelon", "kiwi",
+              "orange", "lemon", "raspberry"],
+}
+DIET_FLAGS = ("vegan", "low_calorie", "sugar_free")
+# Labels written in the admin panel that mean a diet flag rather than an ingredient
+FLAG_LABELS = {
+    "vegan": ["vegan"],
+    "sugar_free": ["sugar free", "sekersiz"],
+    "low_calorie": ["low calorie"],
+}
+
+
+def _closure(implies: dict) -> dict:
+    """Transitive closure: name -> every ingredient it excludes, itself included."""
+    closed = {}
+
+    def visit(name, seen):
+        for child in implies.get(name, []):
+            if child not in seen:
+                seen.add(child)
+                visit(child, seen)
+        return seen
+
+    for name in implies:
+        closed[name] = frozenset(visit(name, {name}))
+    return closed
+
+
+ALLERGEN_CLOSURE = _closure(ALLERGEN_IMPLIES)
+
+
+@lru_cache(maxsize=4096)
+def normalize_ingredient(name: str) -> str:
+    """'Ice Cream' / 'ice-cream' -> 'ice_cream', the key style used in ai/menu.py."""
+    return re.sub(r"[\s\-]+", "_", (name or "").strip().lower())
+
+
+FLAG_KEYS = {flag: {normalize_ingredient(l) for l in labels} for flag, labels in FLAG_LABELS.items()}
+NON_INGREDIENT_LABELS = set().union(*FLAG_KEYS.values())
+
+
+def expand(names) -> frozenset:
+    """Every ingredient excluded by avoiding the given names."""
+    out = set()
+    for name in names:
+        key = normalize_ingredient(name)
+        out |= ALLERGEN_CLOSURE.get(key, {key})
+    return frozenset(out)
+
+
+# Ingredient words recognised in chat messages (whole words, English and Turkish)
+INGREDIENT_WORDS = {
+    "egg": "egg", "eggs": "egg", "yumurta": "egg",
+    "gluten": "gluten", "wheat": "gluten", "bugday": "gluten",
+    "chocolate": "chocolate", "cocoa": "chocolate", "cikolata": "chocolate",
+    "almond": "almond", "almonds": "almond", "badem": "almond",
+    "milk": "milk", "dairy": "milk", "sut": "milk",
+    "lactose": "lactose", "laktoz": "lactose", "yogurt": "yogurt", "yoghurt": "yogurt",
+    "nut": "nuts", "nuts": "nuts", "kuruyemis": "nuts", "peanut": "peanut", "peanuts": "peanut",
+    "ice cream": "ice_cream", "dondurma": "ice_cream",
+    "coffee": "coffee", "caffeine": "coffee", "kahve": "coffee",
+    "fruit": "fruit", "fruits": "fruit", "meyve": "fruit",
+    "banana": "banana", "muz": "banana", "strawberry": "strawberry", "cilek": "strawberry",
+    "apple": "apple", "elma": "apple", "kiwi": "kiwi", "kivi": "kiwi", "pineapple": "pineapple",
+    "ananas": "pineapple", "orange": "orange", "lemon": "lemon", "blueberry": "blueberry",
+    "raspberry": "raspberry", "watermelon": "watermelon", "cinnamon": "cinnamon", "oreo": "oreo",
+}
+# An ingredient word, optionally with the Turkish "without" suffix (sutsuz, yumurtasiz)
+INGREDIENT_PATTERN = re.compile(
+    r"\b(" + "|".join(sorted(map(re.escape, INGREDIENT_WORDS), key=len, reverse=True)) + r")(siz|suz)?\b")
+# A negation covers the ingredient right after it ("no egg", "allergic to almonds")...
+NEGATION_BEFORE = re.compile(
+    r"\b(?:no|not|without|free of|except|avoid|allergic to|allergy to|intolerant to|"
+    r"(?:do not|don't|dont) (?:want|like|eat|drink))\s+(?:(?:any|the|a|an)\s+)?$")
+# ...or right before it ("gluten-free", "nut allergy", "yumurta olmasin", "cilek alerjim var")
+NEGATION_AFTER = re.compile(r"[\s-]*(?:free|allerg\w*|alerji\w*|intolerance|olmasin|yok|icermeyen)\b")
+# What may sit between two ingredients of one list ("no milk, eggs or nuts")
+LIST_GAP = re.compile(r"\s*(?:,|/|\bor\b|\band\b|\bnor\b|\bveya\b|\bve\b)\s*(?:(?:any|the|a|an)\s+)?")
+
+
+def negated_ingredients(text: str) -> set:
+    """
+    Ingredient keys a (ASCII-folded, lowercased) message asks to leave out. Only
+    ingredients inside a negation's scope count, so "vegan coffee without milk"
+    gives {"milk"} and "not sure, maybe a chocolate cake" gives nothing. A
+    negation carries over a list joined by commas, "and" or "or".
+    """
+    matches = list(INGREDIENT_PATTERN.finditer(text))
+    before = [bool(NEGATION_BEFORE.search(text, 0, m.start())) for m in matches]
+    after = [bool(NEGATION_AFTER.match(text, m.end())) for m in matches]
+    for i in range(1, len(matches)):
+        # "no milk or eggs": the negation in front reaches the rest of the list
+        if before[i - 1] and LIST_GAP.fullmatch(text, matches[i - 1].end(), matches[i].start()):
+            before[i] = True
+    for i in range(len(matches) - 2, -1, -1):
+        # "milk and egg free": so does one behind it
+        if after[i + 1] and LIST_GAP.fullmatch(text, matches[i].end(), matches[i + 1].start()):
+            after[i] = True
+    return {INGREDIENT_WORDS[m.group(1)] for m, b, a in zip(matches, before, after) if b or a or m.group(2)}
+
+
+# -----------------------
+# MENU LOOKUP
+# -----------------------
+NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def _name_key(name: str) -> str:
+    return NON_ALNUM.sub(" ", (name or "").lower()).strip()
+
+
+# Products are matched to ai/menu.py entries by display name or menu key
+MENU_BY_NAME = {}
+for _items in MENU.values():
+    for _key, _info in _items.items():
+        MENU_BY_NAME[_name_key(_key)] = _info
+        if _key in MENU_META:
+            MENU_BY_NAME[_name_key(MENU_META[_key]["name"])] = _info
+
+
+def bitset(positions: list, size: int) -> int:
+    """Build an int with the given bit positions set (shared with FilterIndex)."""
+    bits = bytearray((size + 7) // 8)
+    for i in positions:
+        bits[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(bits, "little")
+
+
+# -----------------------
+# COMPILED INDEX
+# -----------------------
+class IngredientIndex:
+    """
+    Ingredient index over a product list (bit i = products[i]).
+
+    Each product's ingredients are the union of its ai/menu.py entry (matched by
+    name) and its labels, so admin edits in the products table are picked up on
+    the next menu version. Both directions are precomputed as Python ints:
+    item_masks[i] has one bit per ingredient the product contains, and
+    containing[ingredient] has one bit per product containing it. An allergy
+    query is one OR per avoided ingredient (after the implication closure) and
+    an AND-NOT against the candidate set.
+    """
+
+    def __init__(self, products: list):
+        self.products = products
+        size = len(products)
+        self.all = (1 << size) - 1
+        self.vocabulary = {}  # ingredient -> bit in item_masks
+        self.item_masks = []
+        item_positions = {}   # ingredient -> product positions
+        flag_positions = {flag: [] for flag in DIET_FLAGS}
+        self.matched = 0
+
+        # Products sharing a menu entry and label set share everything below; compute it once per signature
+        signatures = {}
+        for i, p in enumerate(products):
+            entry = MENU_BY_NAME.get(_name_key(p.get("name", "")))
+            signature = (id(entry), frozenset(p.get("labels", ())))
+            compiled = signatures.get(signature)
+            if compiled is None:
+                compiled = signatures[signature] = self._compile(entry, signature[1])
+            mask, ingredients, flags = compiled
+            if entry:
+                self.matched += 1
+            self.item_masks.append(mask)
+            for ingredient in ingredients:
+                item_positions.setdefault(ingredient, []).append(i)
+            for flag in flags:
+                flag_positions[flag].append(i)
+
+        self.containing = {k: bitset(v, size) for k, v in item_positions.items()}
+        self.flags = {k: bitset(v, size) for k, v in flag_positions.items()}
+
+    def _compile(self, entry, raw_labels) -> tuple:
+        """(ingredient mask, ingredient names, diet flags) for one menu entry + label set."""
+        labels = {normalize_ingredient(l) for l in raw_labels}
+        ingredients = {normalize_ingredient(x) for x in entry["ingredients"]} if entry else set()
+        ingredients |= labels - NON_INGREDIENT_LABELS
+        mask = 0
+        for ingredient in ingredients:
+            mask |= 1 << self.vocabulary.setdefault(ingredient, len(self.vocabulary))
+        # Labels are the source of truth once a product has any; menu flags fill the gaps
+        flags = [flag for flag in DIET_FLAGS
+                 if labels & FLAG_KEYS[flag] or (not labels and entry and entry.get(flag))]
+        return mask, sorted(ingredients), flags
+
+    def containing_any(self, names) -> int:
+        """Bitset of products containing any ingredient excluded by avoiding `names`."""
+        mask = 0
+        for ingredient in expand(names):
+            mask |= self.containing.get(ingredient, 0)
+        return mask
+
+    def safe_for(self, names) -> int:
+        """Bitset of products free of everything `names` implies."""
+        return self.all & ~self.containing_any(names)
+
+    def ingredients(self, i: int) -> list:
+        """Ingredient names of products[i], decoded from its mask."""
+        mask = self.item_masks[i]
+        return sorted(name for name, bit in self.vocabulary.items() if mask >> bit & 1)
+
+    def stats(self) -> dict:
+        return {"products": len(self.products), "matched_menu_items": self.matched,
+                "ingredients": len(self.vocabulary)}
@@ -0,0 +1,195 @@
+import os
+import random
+import threading
+import time
+
+import openai
+
+# -----------------------
+# CONFIGURATION
+# -----------------------
+LLM_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+# Point at a local stub (e.g. bench/fake_openai.py) for tests and load runs
+LLM_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+# Seconds allowed for one upstream call (connect + full response)
+LLM_TIMEOUT = float(os.getenv("AI_LLM_TIMEOUT", "15"))
+# Upstream calls allowed in flight per worker process
+LLM_MAX_CONCURRENCY = int(os.getenv("AI_LLM_MAX_CONCURRENCY", "4"))
+# Requests allowed to wait for a slot; beyond this new requests are shed with a 503
+LLM_MAX_QUEUE = int(os.getenv("AI_LLM_MAX_QUEUE", "8"))
+# Longest a queued request waits for a slot before being shed
+LLM_QUEUE_TIMEOUT = float(os.getenv("AI_LLM_QUEUE_TIMEOUT", "2"))
+LLM_RETRIES = int(os.getenv("AI_LLM_RETRIES", "2"))
+LLM_BACKOFF_BASE = 0.25
+LLM_BACKOFF_MAX = 4.0
+
+# Failures worth another attempt; anything else (bad request, auth) is raised at once
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class LLMOverloaded(Exception):
+    """Too many chatbot requests are already waiting for the upstream API."""
+
+
+class LLMTimeout(Exception):
+    """The upstream API did not answer in time, even after retries."""
+
+
+# -----------------------
+# SHARED CLIENT
+# -----------------------
+class LLMClient:
+    """
+    One long-lived OpenAI client per worker process (its HTTP pool keeps
+    connections alive between calls), guarded by a concurrency semaphore with a
+    bounded wait queue. Retries use exponential backoff with full jitter.
+    """
+
+    def __init__(self, model: str = LLM_MODEL, base_url: str = LLM_BASE_URL, timeout: float = LLM_TIMEOUT,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY, max_queue: int = LLM_MAX_QUEUE,
+                 queue_timeout: float = LLM_QUEUE_TIMEOUT, retries: int = LLM_RETRIES, on_call=None):
+        self.model = model
+        # Optional callback (mode, outcome, seconds, usage) after every call, e.g. for metrics
+        self.on_call = on_call
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retries = retries
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._in_flight = 0
+        self._client = None
+        self._pid = None
+
+    def _get_client(self):
+        # Created lazily and re-created after a fork so workers never share sockets
+        if self._client is None or self._pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._pid != os.getpid():
+                    self._client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=self.base_url,
+                                                 timeout=self.timeout, max_retries=0)
+                    self._pid = os.getpid()
+        return self._client
+
+    def _acquire(self, mode: str) -> None:
+        """Take a concurrency slot or raise LLMOverloaded without tying up the worker."""
+        if self._slots.acquire(blocking=False):
+            return
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                self._report(mode, "overloaded", 0.0)
+                raise LLMOverloaded("AI assistant is busy, please try again shortly")
+            self._waiting += 1
+        started = time.perf_counter()
+        try:
+            if not self._slots.acquire(timeout=self.queue_timeout):
+                self._report(mode, "overloaded", time.perf_counter() - started)
+                raise LLMOverloaded("AI assistant is busy, please try again shortly")
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def _report(self, mode: str, outcome: str, seconds: float, usage=None) -> None:
+        if self.on_call is not None:
+            self.on_call(mode, outcome, seconds, usage)
+
+    def chat(self, messages: list, temperature: float = 0.7, **kwargs):
+        """Run one chat completion with timeout, retries and concurrency limiting."""
+        self._acquire("chat")
+        with self._lock:
+            self._in_flight += 1
+        started = time.perf_counter()
+        outcome, usage = "error", None
+        try:
+            response = self._call_with_retries(messages, temperature, **kwargs)
+            outcome, usage = "ok", getattr(response, "usage", None)
+            return response
+        except LLMTimeout:
+            outcome = "timeout"
+            raise
+        finally:
+            self._release()
+            self._report("chat", outcome, time.perf_counter() - started, usage)
+
+    def chat_stream(self, messages: list, temperature: float = 0.7, **kwargs) -> "CompletionStream":
+        """
+        Start a streaming chat completion and return an iterator of content deltas.
+        The concurrency slot is taken here (so overload raises before any response
+        is sent) and held until the stream is exhausted or closed. Retries only
+        happen while opening the stream, never after text was produced.
+        """
+        self._acquire("stream")
+        with self._lock:
+            self._in_flight += 1
+        started = time.perf_counter()
+        try:
+            # The last chunk then carries the token counts
+            stream = self._call_with_retries(messages, temperature, stream=True,
+                                             stream_options={"include_usage": True}, **kwargs)
+        except BaseException as e:
+            self._release()
+            self._report("stream", "timeout" if isinstance(e, LLMTimeout) else "error", time.perf_counter() - started)
+            raise
+
+        def finished(outcome, usage):
+            self._release()
+            self._report("stream", outcome, time.perf_counter() - started, usage)
+        return CompletionStream(stream, finished)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _call_with_retries(self, messages, temperature, **kwargs):
+        client = self._get_client()
+        for attempt in range(self.retries + 1):
+            try:
+                return client.chat.completions.create(model=self.model, messages=messages,
+                                                      temperature=temperature, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.retries:
+                    if isinstance(e, openai.APITimeoutError):
+                        raise LLMTimeout(f"AI assistant timed out after {attempt + 1} attempts") from e
+                    raise
+                time.sleep(random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": self._in_flight, "waiting": self._waiting, "max_queue": self.max_queue}
+
+
+class CompletionStream:
+    """Iterator over the text deltas of a streamed completion; releases its slot exactly once."""
+
+    def __init__(self, stream, finished):
+        self._stream = stream
+        self._finished = finished
+        self._outcome = "error"
+        self.usage = None
+
+    def __iter__(self):
+        try:
+            for chunk in self._stream:
+                if getattr(chunk, "usage", None) is not None:
+                    self.usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            self._outcome = "ok"
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        finished, self._finished = self._finished, None
+        if finished is not None:
+            try:
+                self._stream.close()
+            finally:
+                finished(self._outcome, self.usage)
@@ -0,0 +1,136 @@
+import json
+import os
+import re
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: single trainer assumed
+    fcntl = None
+
+# -----------------------
+# CONFIGURATION
+# -----------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.getenv("NLP_MODEL_DIR", os.path.join(BASE_DIR, "online", "models"))
+# Published versions kept on disk for rollback (the current one and its parent are never pruned)
+MODEL_KEEP = int(os.getenv("NLP_MODEL_KEEP", "5"))
+
+POINTER_NAME = "CURRENT"
+META_RE = re.compile(r"^intent-v(\d+)\.json$")
+
+
+def _fsync_file(path: str) -> None:
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+
+def _atomic_write(path: str, text: str) -> None:
+    """Write to a temp file and rename over path, so readers see the old or the new content."""
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# -----------------------
+# VERSIONED ARTIFACTS
+# -----------------------
+class ModelRegistry:
+    """
+    Versioned intent model artifacts in one directory:
+        intent-v0003.npz           compact model served by the workers
+        intent-v0003.state.joblib  SGD trainer state for the next partial_fit
+        intent-v0003.json          metadata (parent, log offset, sample counts)
+        CURRENT                    version being served, replaced atomically
+    Workers poll CURRENT, so publishing or rolling back swaps the model without a restart.
+    Without CURRENT the bundled ai/menu_ai_model.npz is served.
+    """
+
+    def __init__(self, root: str = MODEL_DIR, keep: int = MODEL_KEEP):
+        self.root = root
+        self.keep = keep
+
+    def path(self, version: int, suffix: str) -> str:
+        return os.path.join(self.root, f"intent-v{version:04d}{suffix}")
+
+    @property
+    def pointer_path(self) -> str:
+        return os.path.join(self.root, POINTER_NAME)
+
+    def versions(self) -> list:
+        """Published versions, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        found = (META_RE.match(name) for name in os.listdir(self.root))
+        return sorted(int(m.group(1)) for m in found if m)
+
+    def current(self):
+        """The served version, or None for the bundled model."""
+        try:
+            with open(self.pointer_path, encoding="utf-8") as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def meta(self, version: int) -> dict:
+        with open(self.path(version, ".json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def next_version(self) -> int:
+        versions = self.versions()
+        return versions[-1] + 1 if versions else 1
+
+    @contextmanager
+    def lock(self):
+        """Serialize trainers (cron overlap, manual runs) on one host."""
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, ".lock"), "w") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def publish(self, version: int, meta: dict) -> None:
+        """Record metadata for already written artifacts, then point CURRENT at them."""
+        for suffix in (".npz", ".state.joblib"):
+            _fsync_file(self.path(version, suffix))
+        _atomic_write(self.path(version, ".json"), json.dumps(dict(meta, version=version), indent=2))
+        self.set_current(version)
+        self.prune()
+
+    def set_current(self, version) -> None:
+        """Serve version (None = bundled model)."""
+        if version is None:
+            if os.path.exists(self.pointer_path):
+                os.remove(self.pointer_path)
+            return
+        if not os.path.exists(self.path(version, ".npz")):
+            raise ValueError(f"Model version {version} does not exist")
+        _atomic_write(self.pointer_path, str(version))
+
+    def rollback(self, version=None):
+        """Serve the given version, or the parent of the current one. Returns the new current version."""
+        if version is None:
+            current = self.current()
+            if current is None:
+                raise ValueError("Already serving the bundled model")
+            version = self.meta(current).get("parent")
+        self.set_current(version)
+        return version
+
+    def prune(self) -> None:
+        current = self.current()
+        protected = {current}
+        if current is not None:
+            protected.add(self.meta(current).get("parent"))
+        versions = self.versions()
+        for version in versions[:max(0, len(versions) - self.keep)]:
+            if version in protected:
+                continue
+            for suffix in (".json", ".npz", ".state.joblib"):
+                try:
+                    os.remove(self.path(version, suffix))
+                except FileNotFoundError:
+                    pass
@@ -1,6 +1,10 @@
 ﻿import re
-import joblib
 import os
+import threading
+import time
+
+from ai.model_registry import ModelRegistry
+from ai.ingredients import negated_ingredients
 
 # -----------------------
 # PATH CONFIGURATIONS
@@ -8,18 +12,85 @@ import os
 # Ensure the model is loaded from the correct directory relative to this file
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.join(BASE_DIR, 'menu_ai_model.pkl')
+COMPACT_MODEL_PATH = os.path.join(BASE_DIR, 'menu_ai_model.npz')
+# auto: NumPy-only artifact when present, else the sklearn pickle
+MODEL_FORMAT = os.getenv("NLP_MODEL_FORMAT", "auto")
+# Seconds between checks for a newly published (or rolled back) online model
+MODEL_CHECK_INTERVAL = float(os.getenv("NLP_MODEL_CHECK_INTERVAL", "5"))
 
 # -----------------------
 # MODEL INITIALIZATION
 # -----------------------
-# Load the pre-trained AI model once at startup for performance
+# Loaded lazily on first use so workers that never classify a message never
+# import numpy/sklearn. Call preload() before forking (gunicorn --preload) to
+# load it once in the master and share the pages copy-on-write.
 AI_MODEL = None
-if os.path.exists(MODEL_PATH):
+_MODEL_LOADED = False
+_MODEL_LOCK = threading.Lock()
+# Online-trained version being served (None = bundled model), see ai/online_training.py
+_MODEL_VERSION = None
+_NEXT_CHECK = 0.0
+_REGISTRY = ModelRegistry()
+
+
+def _load_model(version=None):
+    if version is not None:
+        from ai.compact_model import CompactIntentModel
+        return CompactIntentModel.load(_REGISTRY.path(version, ".npz"))
+    use_compact = MODEL_FORMAT == "compact" or (MODEL_FORMAT == "auto" and os.path.exists(COMPACT_MODEL_PATH))
+    if use_compact:
+        from ai.compact_model import CompactIntentModel
+        return CompactIntentModel.load(COMPACT_MODEL_PATH)
+    if os.path.exists(MODEL_PATH):
+        import joblib
+        return joblib.load(MODEL_PATH)
+    return None
+
+
+def _refresh_model() -> None:
+    """Load the bundled model or switch to the published version; caller holds the lock."""
+    global AI_MODEL, _MODEL_LOADED, _MODEL_VERSION
+    wanted = None if MODEL_FORMAT == "sklearn" else _REGISTRY.current()
+    if _MODEL_LOADED and wanted == _MODEL_VERSION:
+        return
     try:
-        AI_MODEL = joblib.load(MODEL_PATH)
-        print("NLP System: AI Model loaded successfully.")
+        model = _load_model(wanted)
     except Exception as e:
         print(f"NLP System Error: Could not load model - {e}")
+        _MODEL_LOADED = True
+        return
+    # A single reference assignment: concurrent requests use the old or the new model
+    AI_MODEL, _MODEL_VERSION, _MODEL_LOADED = model, wanted, True
+    if model is not None:
+        source = f"v{wanted}" if wanted is not None else "bundled"
+        print(f"NLP System: AI Model loaded successfully ({type(model).__name__}, {source}).")
+
+
+def get_model():
+    """Return the intent classifier, loading it on the first call (None if unavailable)."""
+    global _NEXT_CHECK
+    if _MODEL_LOADED and time.monotonic() < _NEXT_CHECK:
+        return AI_MODEL
+    with _MODEL_LOCK:
+        if not _MODEL_LOADED or time.monotonic() >= _NEXT_CHECK:
+            _refresh_model()
+            _NEXT_CHECK = time.monotonic() + MODEL_CHECK_INTERVAL
+    return AI_MODEL
+
+
+def model_info() -> dict:
+    """Which intent model this worker is serving."""
+    return {
+        "loaded": _MODEL_LOADED and AI_MODEL is not None,
+        "version": _MODEL_VERSION if _MODEL_VERSION is not None else "bundled",
+        "type": type(AI_MODEL).__name__ if AI_MODEL is not None else None,
+    }
+
+
+def preload():
+    """Load the model now instead of on the first message."""
+    get_model()
+
 
 # -----------------------
 # NORMALIZATION TOOLS
@@ -35,78 +106,172 @@ def _ascii_tr(s: str) -> str:
     """Normalize text by removing Turkish specific characters."""
     return _norm(s).translate(TR_MAP)
 
-def _has_negation(text: str, ascii_text: str) -> bool:
-    """Detects if the user is asking for an exclusion (e.g., 'no', 'without')."""
-    return any(k in ascii_text for k in ["siz", "suz", "olmasin", "yok"]) or \
-           any(k in text for k in ["no ", "without", "free", "not "])
-
 # -----------------------
 # DATA DEFINITIONS
 # -----------------------
 FRUIT_LABELS = ["apple", "banana", "blueberry", "strawberry", "pineapple", "watermelon", "kiwi", "orange", "lemon"]
 NUT_LABELS = ["nuts", "almond", "peanut"]
+# Negated ingredient keys that stand for a whole label group
+GROUP_LABELS = {"fruit": FRUIT_LABELS, "nuts": NUT_LABELS}
 FRUIT_TR_MAP = {"elma": "apple", "cilek": "strawberry", "muz": "banana", "kivi": "kiwi", "ananas": "pineapple"}
 
 # -----------------------
-# MAIN ANALYSIS FUNCTION
+# COMBINED KEYWORD MATCHERS
 # -----------------------
-def analyze_text(user_input: str) -> dict:
+class KeywordMatcher:
     """
-    Analyzes user message to detect dietary intents and exclusions.
+    Finds every (possibly overlapping) keyword in a text with one compiled regex.
+    The pattern is a zero-width lookahead over a longest-first alternation, so each
+    position yields its longest keyword; shorter keywords that are prefixes of it
+    match there too, and their tags are merged in ahead of time.
     """
+
+    def __init__(self, keywords: dict):
+        ordered = sorted(keywords, key=len, reverse=True)
+        self.pattern = re.compile("(?=(" + "|".join(re.escape(k) for k in ordered) + "))")
+        self.tags = {}
+        for kw in keywords:
+            tags = set()
+            for other, other_tags in keywords.items():
+                if kw.startswith(other):
+                    tags |= other_tags
+            self.tags[kw] = tags
+
+    def match(self, text: str) -> set:
+        """Return the union of tags of all keywords occurring in text."""
+        found = set()
+        for m in self.pattern.finditer(text):
+            found |= self.tags[m.group(1)]
+        return found
+
+
+def _tag(words, tag) -> dict:
+    return {w: {tag} for w in words}
+
+
+# Substring rules on the lowercased text
+TEXT_MATCHER = KeywordMatcher({
+    **_tag(["vegan", "plant-based", "plant based", "no animal"], "vegan"),
+    **_tag(["diet", "diyet", "light", "fit", "low calorie", "low-calorie", "lose weight"], "low_calorie"),
+    **_tag(["sugar-free", "sugar free", "sekersiz", "no sugar"], "sugar_free"),
+    **_tag(["allergy", "allergic"], "allergy"),
+    **_tag(["fruit"], "fruit"),
+    **_tag(["similar", "something like", "anything like", "alternative to", "instead of"], "similar"),
+})
+
+# Substring rules on the ASCII-folded text
+ASCII_MATCHER = KeywordMatcher({
+    **_tag(["alerji"], "allergy"),
+    **_tag(["kalorisiz", "dusuk kalori", "zayifla"], "low_calorie"),
+    **_tag(["meyve"], "fruit"),
+    **_tag(["benzer", "yerine"], "similar"),
+    **_tag(["nuts", "nut", "kuruyemis", "peanut"], "nuts"),
+    **_tag(["milk", "sut", "dairy", "laktoz"], "milk"),
+    **{root: {"fruit:" + en} for root, en in FRUIT_TR_MAP.items()},
+})
+
+# Whole-word category rules, one named group per category
+CATEGORY_ORDER = ["coffee", "tea", "sweet", "cold"]
+CATEGORY_PATTERN = re.compile(
+    r"\b(?:"
+    r"(?P<coffee>coffee|kahve|espresso|latte|americano|cappuccino)"
+    r"|(?P<tea>tea|cay|çay|matcha)"
+    r"|(?P<sweet>dessert|sweet|tatli|cake|kek|pastry|cookie)"
+    r"|(?P<cold>cold|iced|soguk|lemonade|milkshake|smoothie)"
+    r")\b"
+)
+
+
+def _detect_categories(text: str) -> list:
+    found = {m.lastgroup for m in CATEGORY_PATTERN.finditer(text)}
+    return [c for c in CATEGORY_ORDER if c in found]
+
+
+# -----------------------
+# MAIN ANALYSIS FUNCTIONS
+# -----------------------
+def _predict(texts: list) -> list:
+    """Run the classifier once for the whole batch; returns (label, confidence, probabilities) per text."""
+    empty = [(None, 0.0, {})] * len(texts)
+    model = get_model()
+    if model is None or not texts:
+        return empty
+    try:
+        probas = model.predict_proba([t.lower() for t in texts])
+    except Exception:
+        return empty
+    classes = [str(c) for c in model.classes_]
+    results = []
+    for row in probas:
+        best = int(row.argmax())
+        results.append((classes[best], float(row[best]), {c: float(p) for c, p in zip(classes, row)}))
+    return results
+
+
+def _build_intent(user_input: str, ai_label, confidence: float, probabilities: dict) -> dict:
     text = _norm(user_input)
     atext = _ascii_tr(user_input)
+    tags = TEXT_MATCHER.match(text) | ASCII_MATCHER.match(atext)
 
-    # 1. AI Prediction (Machine Learning)
-    ai_label = None
-    if AI_MODEL:
-        try:
-            # Predict intent using the trained model
-            ai_label = AI_MODEL.predict([user_input.lower()])[0]
-        except:
-            pass
-
-    # 2. Build Intent Object
     intent = {
-        "categories": [],
+        "categories": _detect_categories(text),
         "exclude_labels": [],
-        "vegan": (ai_label == "vegan") or ("vegan" in text),
-        "low_calorie": (ai_label == "diet") or (any(k in text for k in ["diet", "diyet", "light", "fit"])),
-        "sugar_free": any(k in text for k in ["sugar-free", "sekersiz", "no sugar"]),
+        "vegan": (ai_label == "vegan") or ("vegan" in tags),
+        "low_calorie": (ai_label == "diet") or ("low_calorie" in tags),
+        "sugar_free": "sugar_free" in tags,
+        "similar": "similar" in tags,
+        # Diet flags named outright, as opposed to guessed by the classifier
+        "keyword_flags": [flag for flag in ("vegan", "low_calorie", "sugar_free") if flag in tags],
+        "ai_label": ai_label,
+        "confidence": confidence,
+        "probabilities": probabilities,
     }
 
-    # 3. Category Detection (Rule-based)
-    if re.search(r"\b(coffee|kahve|espresso|latte|americano|cappuccino)\b", text): 
-        intent["categories"].append("coffee")
-    if re.search(r"\b(tea|cay|çay|matcha)\b", text): 
-        intent["categories"].append("tea")
-    if re.search(r"\b(dessert|sweet|tatli|cake|kek|pastry|cookie)\b", text): 
-        intent["categories"].append("sweet")
-    if re.search(r"\b(cold|iced|soguk|lemonade|milkshake|smoothie)\b", text): 
-        intent["categories"].append("cold")
-
     # Default to all categories if no specific one is mentioned
     if not intent["categories"]:
         intent["categories"] = ["coffee", "tea", "cold", "sweet"]
 
-    # 4. Exclusion & Allergy Logic
-    is_negation = _has_negation(text, atext)
-    is_allergy = (ai_label == "allergy") or ("alerji" in atext or "allergy" in text)
-    
-    if is_negation or is_allergy:
-        if "fruit" in text or "meyve" in atext:
-            intent["exclude_labels"].extend(FRUIT_LABELS)
-        
-        for tr_root, en_label in FRUIT_TR_MAP.items():
-            if tr_root in atext:
-                intent["exclude_labels"].append(en_label)
-
-        if any(k in atext for k in ["nuts", "nut", "kuruyemis", "peanut"]):
-            intent["exclude_labels"].extend(NUT_LABELS)
-        
-        if any(k in atext for k in ["milk", "sut", "dairy", "laktoz"]):
-            intent["exclude_labels"].append("milk")
-
-    # Ensure unique values
-    intent["exclude_labels"] = list(set(intent["exclude_labels"]))
-    return intent
\ No newline at end of file
+    # Exclusion & Allergy Logic: only ingredients inside a negation's scope ("no milk",
+    # "gluten-free", "sutsuz"); ai/ingredients.py expands them to what they imply
+    negated = negated_ingredients(atext)
+    intent["negated"] = sorted(negated)
+    excludes = set()
+    for name in negated:
+        excludes.update(GROUP_LABELS.get(name, [name]))
+    if not negated and ("allergy" in tags or ai_label == "allergy"):
+        # An allergy without a clear scope ("fistiga alerjim var"): every allergen group named
+        if "fruit" in tags:
+            excludes.update(FRUIT_LABELS)
+        excludes.update(t[6:] for t in tags if t.startswith("fruit:"))
+        if "nuts" in tags:
+            excludes.update(NUT_LABELS)
+        if "milk" in tags:
+            excludes.add("milk")
+    intent["exclude_labels"] = list(excludes)
+
+    # Label backed by keywords alone, used as a training target (see online_training.py)
+    if negated:
+        intent["keyword_label"] = "allergy"
+    elif "vegan" in tags:
+        intent["keyword_label"] = "vegan"
+    elif "low_calorie" in tags or "sugar_free" in tags:
+        intent["keyword_label"] = "diet"
+    else:
+        intent["keyword_label"] = None
+    return intent
+
+
+def analyze_batch(texts: list) -> list:
+    """
+    Analyzes many user messages at once: a single predict_proba call for the
+    whole batch, then the combined keyword matchers per message.
+    Each intent also carries the class probabilities.
+    """
+    return [_build_intent(t, *pred) for t, pred in zip(texts, _predict(texts))]
+
+
+def analyze_text(user_input: str) -> dict:
+    """
+    Analyzes user message to detect dietary intents and exclusions.
+    """
+    return analyze_batch([user_input])[0]
@@ -0,0 +1,220 @@
+"""
+Online retraining of the intent classifier from real chat traffic.
+
+/api/ai-suggest appends (message, label) pairs to an append-only JSONL log.
+`python -m ai.online_training train` (run from the backend folder, e.g. from
+cron) reads only the lines added since the served version, runs one
+SGDClassifier.partial_fit over them plus the seed phrases, and publishes a new
+versioned artifact that running workers pick up without a restart.
+
+    python -m ai.online_training train [--batch N]
+    python -m ai.online_training status
+    python -m ai.online_training rollback [version | bundled]
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.model_registry import ModelRegistry
+from ai.training_data import SEED_DATA, INTENT_CLASSES
+
+# -----------------------
+# CONFIGURATION
+# -----------------------
+# JSONL file the chatbot appends labelled messages to (empty = logging off)
+INTENT_LOG_PATH = os.getenv("AI_INTENT_LOG", "")
+# Most new log lines consumed by one training run; keeps every run the same cost
+RETRAIN_BATCH = int(os.getenv("AI_RETRAIN_BATCH", "2000"))
+# A new version is only published if it still gets the seed phrases right
+MIN_SEED_ACCURACY = float(os.getenv("AI_RETRAIN_MIN_SEED_ACCURACY", "0.8"))
+HASH_FEATURES = 2 ** 14
+BOOTSTRAP_EPOCHS = 10
+MAX_TEXT_CHARS = 300
+
+
+def training_label(intent: dict):
+    """
+    Label backed by keywords in the message, not by the model's own guess (avoids
+    self-training). Diet keywords alone are loose ("light"), so those count only
+    when the classifier agrees; a negation-scoped ingredient is enough for allergy.
+    """
+    label = intent.get("keyword_label")
+    if label not in INTENT_CLASSES:
+        return None
+    if label == intent.get("ai_label") or (label == "allergy" and intent.get("negated")):
+        return label
+    return None
+
+
+# -----------------------
+# APPEND-ONLY LOG
+# -----------------------
+class IntentLog:
+    """
+    Append-only JSONL of labelled messages. Every record is one O_APPEND write,
+    so all workers can share the file; readers resume from a byte offset.
+    """
+
+    def __init__(self, path: str = INTENT_LOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def record(self, message: str, intent: dict) -> bool:
+        """Append the message if its intent has a trustworthy label; returns True when logged."""
+        label = training_label(intent)
+        if not self.enabled or label is None or not message:
+            return False
+        line = json.dumps({"ts": int(time.time()), "text": message[:MAX_TEXT_CHARS], "label": label},
+                          ensure_ascii=False, separators=(",", ":")) + "\n"
+        try:
+            with self._lock:
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, line.encode("utf-8"))
+                finally:
+                    os.close(fd)
+        except OSError as e:
+            print(f"Intent Log Error: {e}")
+            return False
+        return True
+
+    def read_from(self, offset: int, limit: int):
+        """Up to limit complete records after offset; returns (texts, labels, next_offset)."""
+        texts, labels = [], []
+        if not os.path.exists(self.path):
+            return texts, labels, offset
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            while len(texts) < limit:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break  # end of file or a record still being written
+                offset += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("label") in INTENT_CLASSES and record.get("text"):
+                    texts.append(record["text"].lower())
+                    labels.append(record["label"])
+        return texts, labels, offset
+
+
+# -----------------------
+# INCREMENTAL TRAINING
+# -----------------------
+def make_pipeline(classifier):
+    """Stateless hashing features, so partial_fit never needs the full history."""
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.pipeline import Pipeline
+    return Pipeline([
+        ('vectorizer', HashingVectorizer(n_features=HASH_FEATURES, alternate_sign=False, ngram_range=(1, 2))),
+        ('classifier', classifier),
+    ])
+
+
+def train_increment(log: IntentLog, registry: ModelRegistry, batch: int = RETRAIN_BATCH):
+    """
+    Fit the next version on the log lines added since the current one.
+    Returns the published version, or None when there was nothing to learn
+    or the candidate was rejected.
+    """
+    import joblib
+    import numpy as np
+    from sklearn.linear_model import SGDClassifier
+    from ai.compact_model import export_compact
+
+    with registry.lock():
+        current = registry.current()
+        meta = registry.meta(current) if current is not None else None
+        offset = meta["log_offset"] if meta else 0
+        texts, labels, next_offset = log.read_from(offset, batch)
+        if meta is not None and not texts:
+            print(f"Online Training: no new samples since v{current}")
+            return None
+
+        started = time.perf_counter()
+        if meta is None:
+            classifier = SGDClassifier(loss="log_loss", alpha=1e-4, random_state=0)
+            epochs = BOOTSTRAP_EPOCHS
+        else:
+            classifier = joblib.load(registry.path(current, ".state.joblib"))
+            epochs = 1
+        pipeline = make_pipeline(classifier)
+        vectorizer = pipeline.named_steps['vectorizer']
+        # Seed phrases are replayed each run (constant size) so the basics are not forgotten
+        X = vectorizer.transform(SEED_DATA["text"] + texts)
+        y = np.array(SEED_DATA["label"] + labels)
+        for _ in range(epochs):
+            classifier.partial_fit(X, y, classes=INTENT_CLASSES)
+        train_seconds = time.perf_counter() - started
+
+        seed_accuracy = float((pipeline.predict(SEED_DATA["text"]) == np.array(SEED_DATA["label"])).mean())
+        if seed_accuracy < MIN_SEED_ACCURACY:
+            print(f"Online Training: candidate rejected (seed accuracy {seed_accuracy:.2f} < {MIN_SEED_ACCURACY})")
+            return None
+
+        version = registry.next_version()
+        os.makedirs(registry.root, exist_ok=True)
+        export_compact(pipeline, registry.path(version, ".npz"), meta={"version": version})
+        joblib.dump(classifier, registry.path(version, ".state.joblib"))
+        registry.publish(version, {
+            "parent": current,
+            "log_offset": next_offset,
+            "samples": len(texts),
+            "samples_total": (meta["samples_total"] if meta else 0) + len(texts),
+            "seed_accuracy": seed_accuracy,
+            "train_seconds": round(train_seconds, 4),
+            "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        })
+        print(f"Online Training: published v{version} ({len(texts)} new samples, "
+              f"seed accuracy {seed_accuracy:.2f}, {train_seconds * 1000:.1f} ms)")
+        return version
+
+
+def main(argv: list) -> int:
+    registry = ModelRegistry()
+    command = argv[0] if argv else "status"
+    if command == "train":
+        batch = int(argv[argv.index("--batch") + 1]) if "--batch" in argv else RETRAIN_BATCH
+        log = IntentLog()
+        if not log.enabled:
+            print("Online Training: set AI_INTENT_LOG to the chatbot's intent log")
+            return 1
+        train_increment(log, registry, batch)
+    elif command == "rollback":
+        target = argv[1] if len(argv) > 1 else None
+        try:
+            version = registry.set_current(None) if target == "bundled" else registry.rollback(
+                int(target) if target else None)
+        except ValueError as e:
+            # Unknown version, not a number, or nothing older to go back to
+            print(f"Online Training: cannot roll back: {e}")
+            return 1
+        print(f"Online Training: now serving {'v' + str(version) if version else 'the bundled model'}")
+    elif command == "status":
+        current = registry.current()
+        for version in registry.versions():
+            meta = registry.meta(version)
+            marker = "*" if version == current else " "
+            print(f"{marker} v{version}  parent={meta['parent']}  samples={meta['samples']}  "
+                  f"total={meta['samples_total']}  seed_acc={meta['seed_accuracy']:.2f}  {meta['trained_at']}")
+        if current is None:
+            print("* bundled model")
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,155 @@
+import os
+import threading
+
+from ai.nlp_model import analyze_text
+from ai.recommendation import to_ai_category
+
+# -----------------------
+# CONFIGURATION
+# -----------------------
+# Upper bound for the system prompt size, in (estimated) tokens
+PROMPT_TOKEN_BUDGET = int(os.getenv("AI_PROMPT_TOKEN_BUDGET", "3000"))
+# Rough GPT tokenizer ratio for mixed English/Turkish menu text
+CHARS_PER_TOKEN = 4
+# Prompt variants kept per menu version (full menu + per-category subsets)
+MAX_CACHED_PROMPTS = 32
+
+PROMPT_TEMPLATE = """
+You are the AI Assistant for 'Caffe HUB'.
+You are friendly, helpful, and knowledgeable about the menu.
+Your goal is to recommend products based on user preferences.
+If a product does not have a specific label but you know it matches the user's request (e.g. 'Coffee' usually has caffeine, 'Fruit' is vegan), you can infer it.
+
+MENU DATA (one product per line: id|name|category|price|labels, labels separated by ','):
+{menu}
+{note}
+INSTRUCTIONS:
+1. Analyze the user's message.
+2. Recommend items from the MENU DATA that match the request.
+3. If the user has restrictions (e.g. vegan, sugar-free), STRICTLY respect them. Check 'labels' first. If labels are missing, use your general knowledge to infer safety (e.g. Black Tea is vegan).
+4. Return the response in strictly Valid JSON format with this structure:
+{{
+  "reply": "Your conversational response here...",
+  "recommendations": {{
+      "coffee": [List of product ids...],
+      "tea": [...],
+      "cold": [...],
+      "sweet": [...]
+  }}
+}}
+The 'recommendations' object keys must map to your best categorization.
+Only include ids that actually exist in the MENU DATA.
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate; good enough for budgeting without a tokenizer dependency."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _clean(value) -> str:
+    """Keep a field on one line and free of the column separator."""
+    return str(value if value is not None else "").replace("|", "/").replace("\n", " ").strip()
+
+
+def menu_line(p: dict) -> str:
+    """One compact table row for a product."""
+    price = p.get("price")
+    price = f"{price:g}" if isinstance(price, (int, float)) else _clean(price)
+    labels = ",".join(_clean(l) for l in p.get("labels", []))
+    return f"{p['id']}|{_clean(p.get('name'))}|{_clean(p.get('category'))}|{price}|{labels}"
+
+
+def render_prompt(products: list, budget: int = PROMPT_TOKEN_BUDGET, note: str = "") -> str:
+    """Render the system prompt, dropping trailing rows if the menu alone would exceed the budget."""
+    overhead = estimate_tokens(PROMPT_TEMPLATE) + estimate_tokens(note) + 16
+    lines = []
+    used = overhead
+    for p in products:
+        line = menu_line(p)
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            note += f"\n(Menu truncated: {len(products) - len(lines)} more items not shown.)\n"
+            break
+        lines.append(line)
+        used += cost
+    return PROMPT_TEMPLATE.format(menu="\n".join(lines), note=note)
+
+
+# -----------------------
+# CACHED BUILDER
+# -----------------------
+class PromptBuilder:
+    """
+    Builds the chatbot system prompt once per menu version.
+    Small menus share one full-menu prompt; when that exceeds the token budget the
+    menu is pre-filtered to the categories analyze_text() finds in the message,
+    and each category subset is cached as well.
+    """
+
+    def __init__(self, budget: int = PROMPT_TOKEN_BUDGET):
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._version = None
+        self._cache = {}
+
+    def build(self, version: int, products: list, message: str, intent: dict = None) -> str:
+        """Return the system prompt for this menu version and user message."""
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                self._cache = {}
+            full = self._cache.get(None)
+
+        if full is None:
+            full = PROMPT_TEMPLATE.format(menu="\n".join(menu_line(p) for p in products), note="")
+            self._store(version, None, full)
+        if estimate_tokens(full) <= self.budget:
+            return full
+
+        # Too large: only send the categories the user asked about
+        categories = tuple(sorted((intent or analyze_text(message))["categories"]))
+        prompt = self._cache.get(categories)
+        if prompt is None:
+            subset = [p for p in products if to_ai_category(p.get("category")) in categories]
+            prompt = render_prompt(subset, self.budget)
+            self._store(version, categories, prompt)
+        return prompt
+
+    def _store(self, version, key, prompt):
+        with self._lock:
+            if version == self._version and len(self._cache) < MAX_CACHED_PROMPTS:
+                self._cache[key] = prompt
+
+
+def hydrate_recommendations(recommendations, products: list) -> dict:
+    """
+    Replace the ids returned by the model with full product objects from the catalog.
+    Accepts ids or objects carrying an 'id'/'name'; unknown entries are dropped.
+    """
+    if not isinstance(recommendations, dict):
+        return {}
+    by_id = {p["id"]: p for p in products}
+    by_name = {str(p.get("name", "")).lower(): p for p in products}
+
+    hydrated = {}
+    for key, items in recommendations.items():
+        found = []
+        seen = set()
+        for item in items if isinstance(items, list) else []:
+            if isinstance(item, dict):
+                p = by_id.get(_as_int(item.get("id"))) or by_name.get(str(item.get("name", "")).lower())
+            else:
+                p = by_id.get(_as_int(item))
+            if p is not None and p["id"] not in seen:
+                seen.add(p["id"])
+                found.append(p)
+        hydrated[key] = found
+    return hydrated
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
@@ -1,4 +1,7 @@
-﻿def _to_ai_category(db_category: str) -> str:
+﻿from ai.ingredients import IngredientIndex, DIET_FLAGS, bitset
+
+
+def to_ai_category(db_category: str) -> str:
     """
     Maps DB category names to AI keys.
     """
@@ -10,38 +13,92 @@
     if "dessert" in c or "sweet" in c or "cake" in c: return "sweet"
     return "other"
 
-def get_recommendation(intent: dict, products: list) -> list:
+# -----------------------
+# PRECOMPUTED FILTER INDEX
+# -----------------------
+class FilterIndex:
+    """
+    Bitset index over a product list, built once per menu version.
+    Bit i stands for the i-th product in rank order, so every category, diet flag
+    and ingredient maps to one Python int and a query is a handful of AND / AND-NOT
+    operations. Top-k reads the k lowest set bits, i.e. the best-ranked matches.
+    Exclusions and diet flags go through the IngredientIndex, so avoiding "milk"
+    also drops lactose, yogurt and ice cream items.
+    """
+
+    def __init__(self, products: list, rank_key=None):
+        # Default ranking keeps catalog order, matching the original linear scan
+        self.products = sorted(products, key=rank_key) if rank_key else list(products)
+        self.all = (1 << len(self.products)) - 1
+
+        # Collect positions first; OR-ing into growing ints per product would be quadratic
+        cat_positions = {}
+        for i, p in enumerate(self.products):
+            cat_positions.setdefault(to_ai_category(p.get("category", "")), []).append(i)
+        size = len(self.products)
+        self.categories = {k: bitset(v, size) for k, v in cat_positions.items()}
+        self.ingredients = IngredientIndex(self.products)
+
+    def mask(self, intent: dict) -> int:
+        """Bitset of products matching the intent's categories, exclusions and diet flags."""
+        target_categories = intent.get("categories", [])
+        if target_categories:
+            mask = 0
+            for cat in target_categories:
+                mask |= self.categories.get(cat, 0)
+        else:
+            mask = self.all
+
+        mask &= ~self.ingredients.containing_any(intent.get("exclude_labels", []))
+        for flag in DIET_FLAGS:
+            if intent.get(flag):
+                mask &= self.ingredients.flags[flag]
+        return mask
+
+    def mask_for_ids(self, ids) -> int:
+        """Bitset of the products with the given ids (e.g. the ones a branch does not sell)."""
+        position = {p["id"]: i for i, p in enumerate(self.products)} if ids else {}
+        return bitset([position[i] for i in ids if i in position], len(self.products))
+
+    def count(self, intent: dict) -> int:
+        """Number of matching products."""
+        return bin(self.mask(intent)).count("1")
+
+    def top_k(self, intent: dict, k: int = 5, without: int = 0) -> list:
+        """The k best-ranked matching products, skipping the bitset `without`."""
+        mask = self.mask(intent) & ~without
+        result = []
+        while mask and len(result) < k:
+            low = mask & -mask
+            result.append(self.products[low.bit_length() - 1])
+            mask ^= low
+        return result
+
+
+# Index of the most recent menu version; rebuilt only when the version changes
+_INDEX_CACHE = (None, None)
+
+
+def get_filter_index(products: list, version=None) -> FilterIndex:
+    """Return the FilterIndex for this menu version, building it on first use."""
+    global _INDEX_CACHE
+    cached_version, index = _INDEX_CACHE
+    if version is not None and cached_version == version and index is not None:
+        return index
+    index = FilterIndex(products)
+    if version is not None:
+        _INDEX_CACHE = (version, index)
+    return index
+
+
+def get_recommendation(intent: dict, products: list, limit: int = 5, version=None, branch=None) -> list:
     """
     Main logic to filter products based on AI intent and exclusions.
+    Pass the menu version to reuse the cached index across requests.
+    With a branch (branches.BranchMenu) the index of the base menu is shared:
+    products the branch does not sell are masked out and its prices applied.
     """
-    recommendations = []
-    exclude_list = [x.lower() for x in intent.get("exclude_labels", [])]
-    target_categories = intent.get('categories', [])
-
-    for p in products:
-        # 1. Category Filter
-        db_cat = p.get('category', "")
-        ai_cat = _to_ai_category(db_cat)
-        
-        if target_categories and (ai_cat not in target_categories):
-            continue
-            
-        # 2. Ingredient Exclusion Check
-        product_labels = [l.lower() for l in p.get('labels', [])]
-        if any(forbidden in product_labels for forbidden in exclude_list):
-            continue
-            
-        # 3. Dietary Preferences Check
-        if intent.get("vegan") and "vegan" not in product_labels:
-            continue
-            
-        if intent.get("sugar_free"):
-            if "sugar free" not in product_labels and "sekersiz" not in product_labels:
-                continue
-
-        if intent.get("low_calorie") and "low calorie" not in product_labels:
-            continue
-
-        recommendations.append(p)
-        
-    return recommendations[:5]
\ No newline at end of file
+    index = get_filter_index(products, version)
+    if branch is None:
+        return index.top_k(intent, limit)
+    return branch.localize(index.top_k(intent, limit, without=branch.hidden_mask(index)))
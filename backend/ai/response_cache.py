@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from db import ConnectionPool
+from ai.hybrid import FAST_PATH_THRESHOLD
+
+# -----------------------
+# CONFIGURATION
+# -----------------------
+CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "512"))
+CACHE_TTL = float(os.getenv("AI_CACHE_TTL", "3600"))
+# Optional SQLite file for a tier that survives worker restarts (empty = memory only)
+CACHE_DB_PATH = os.getenv("AI_CACHE_DB", "")
+
+DEFAULT_CATEGORIES = ["coffee", "cold", "sweet", "tea"]
+
+PERSIST_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS ai_response_cache (
+        key TEXT PRIMARY KEY,
+        menu_version INTEGER NOT NULL,
+        value TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    )
+"""
+
+
+def intent_key(intent: dict):
+    """
+    Normalized cache key for an analyze_text() intent, or None when the intent is
+    too generic to share: no explicit category or exclusion, and diet flags that only
+    come from a low-confidence guess. Unrelated small talk would otherwise collide.
+    """
+    if intent.get("similar"):
+        # "Something like X": the answer depends on the product named, which is not in the key
+        return None
+    categories = sorted(intent.get("categories", []))
+    excludes = sorted(set(intent.get("exclude_labels", [])))
+    flags = [k for k in ("vegan", "low_calorie", "sugar_free") if intent.get(k)]
+    if categories == DEFAULT_CATEGORIES and not excludes:
+        if not flags or intent.get("confidence", 0.0) < FAST_PATH_THRESHOLD:
+            return None
+    return json.dumps([categories, excludes, flags], separators=(",", ":"))
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of chatbot responses keyed by normalized intent and menu version.
+    Callers pass the menu version they read before building the prompt to both
+    get() and set(), so an answer computed while the menu changed is never stored
+    under the new version. An optional SQLite tier (AI_CACHE_DB) is read on memory
+    misses and written through on every store, so warm answers survive gunicorn restarts.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL, persist_path: str = CACHE_DB_PATH):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._version = None
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+        self._pool = None
+        if persist_path:
+            self._pool = ConnectionPool(persist_path)
+            conn = self._pool.connect()
+            conn.execute(PERSIST_SCHEMA)
+            conn.commit()
+            conn.close()
+
+    @staticmethod
+    def _full_key(key: str, version) -> str:
+        return f"{version}:{key}"
+
+    def sync_version(self, version: int) -> None:
+        """Drop every entry built for an older menu; cheap when the version is unchanged."""
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            self._version = version
+            self._entries.clear()
+        if self._pool is not None:
+            conn = self._pool.connect()
+            conn.execute("DELETE FROM ai_response_cache WHERE menu_version != ? OR expires_at < ?", (version, time.time()))
+            conn.commit()
+            conn.close()
+
+    def get(self, key: str, version):
+        """Return the response cached for key on this menu version, or None."""
+        full_key = self._full_key(key, version)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(full_key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[full_key]
+
+        if self._pool is not None:
+            conn = self._pool.connect()
+            row = conn.execute("SELECT value, expires_at FROM ai_response_cache WHERE key = ? AND menu_version = ?",
+                               (full_key, version)).fetchone()
+            conn.close()
+            if row is not None and row[1] > now:
+                value = json.loads(row[0])
+                with self._lock:
+                    self._remember(full_key, row[1], value)
+                    self.persistent_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: dict, version) -> bool:
+        """
+        Store a response computed against menu `version` in memory and, when
+        configured, in the persistent tier. Returns False without storing when the
+        menu has moved on since (the answer describes the old menu).
+        """
+        full_key = self._full_key(key, version)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            if version != self._version:
+                return False
+            self._remember(full_key, expires_at, value)
+        if self._pool is not None:
+            conn = self._pool.connect()
+            conn.execute("INSERT OR REPLACE INTO ai_response_cache (key, menu_version, value, expires_at) VALUES (?, ?, ?, ?)",
+                         (full_key, version or 0, json.dumps(value, ensure_ascii=False), expires_at))
+            conn.commit()
+            conn.close()
+        return True
+
+    def _remember(self, full_key: str, expires_at: float, value: dict) -> None:
+        # Caller holds the lock
+        self._entries[full_key] = (expires_at, value)
+        self._entries.move_to_end(full_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.persistent_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.persistent_hits) / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,336 @@
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from ai.ingredients import DIET_FLAGS, expand
+from ai.recommendation import get_filter_index
+
+# -----------------------
+# CONFIGURATION
+# -----------------------
+# Neighbours kept per product; /similar answers (and filters) from these only
+SIMILAR_TOP_K = int(os.getenv("AI_SIMILAR_TOP_K", "20"))
+# Rows scored per matrix block: memory is BLOCK_ROWS x products floats
+SIMILAR_BLOCK_ROWS = int(os.getenv("AI_SIMILAR_BLOCK_ROWS", "512"))
+# Size of the description vocabulary (most frequent terms), like TfidfVectorizer(max_features=...)
+SIMILAR_MAX_TERMS = int(os.getenv("AI_SIMILAR_MAX_TERMS", "256"))
+# Description features are projected onto this many latent dimensions (LSA) when the
+# vocabulary is larger; the block matrix products scale with the feature width
+SIMILAR_TEXT_DIMS = int(os.getenv("AI_SIMILAR_TEXT_DIMS", "48"))
+# Menus up to this size build their table inside the request; bigger ones build in a
+# background thread while the previous table keeps answering
+SIMILAR_SYNC_BUILD_MAX = int(os.getenv("AI_SIMILAR_SYNC_BUILD_MAX", "2000"))
+# Columns sampled per block to find a lower bound for each row's k-th best score
+THRESHOLD_SAMPLE = 2048
+
+# How much each feature group counts in the cosine similarity
+FEATURE_WEIGHTS = {"ingredients": 1.0, "diet": 0.5, "category": 0.6, "text": 0.8}
+# TfidfVectorizer's default token_pattern
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+
+# -----------------------
+# FEATURES
+# -----------------------
+def _bits_to_array(bits: int, size: int) -> np.ndarray:
+    """A FilterIndex-style bitset as a bool array (bit i -> element i)."""
+    raw = np.frombuffer(bits.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(raw, bitorder="little")[:size].astype(bool)
+
+
+def _normalize_rows(X: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    np.divide(X, norms, out=X, where=norms > 0)
+    return X
+
+
+def tfidf_matrix(texts: list, max_terms: int = SIMILAR_MAX_TERMS) -> np.ndarray:
+    """
+    L2-normalized TF-IDF rows over the max_terms most common terms, with the
+    same tokens and smoothed IDF as TfidfVectorizer defaults (train_models.py).
+    """
+    docs = [TOKEN_PATTERN.findall(t.lower()) for t in texts]
+    df = Counter()
+    for tokens in docs:
+        df.update(set(tokens))
+    terms = sorted(df, key=lambda t: (-df[t], t))[:max_terms]
+    column = {t: j for j, t in enumerate(terms)}
+
+    rows, cols = [], []
+    for i, tokens in enumerate(docs):
+        for token in tokens:
+            j = column.get(token)
+            if j is not None:
+                rows.append(i)
+                cols.append(j)
+    X = np.zeros((len(texts), len(terms)), dtype=np.float32)
+    np.add.at(X, (rows, cols), 1.0)
+    X *= (np.log((1 + len(texts)) / (1 + np.array([df[t] for t in terms], dtype=np.float32))) + 1)
+    return _normalize_rows(X)
+
+
+def project_text(X: np.ndarray, dims: int = SIMILAR_TEXT_DIMS) -> np.ndarray:
+    """
+    Latent semantic projection of TF-IDF rows onto their top `dims` singular
+    directions (eigenvectors of the small terms x terms Gram matrix). Lossless
+    when the rows span no more than `dims` directions, as on a normal-size menu.
+    """
+    if X.shape[1] <= dims:
+        return X
+    eigenvalues, eigenvectors = np.linalg.eigh(X.T @ X)
+    top = eigenvectors[:, np.argsort(eigenvalues)[::-1][:dims]]
+    return _normalize_rows(X @ top)
+
+
+def feature_matrix(products: list, ingredients) -> np.ndarray:
+    """
+    One row per product: ingredients, diet flags, category and (projected)
+    description TF-IDF, each group normalized and weighted, then the row
+    normalized so a dot product is a cosine similarity.
+    """
+    size = len(products)
+    groups = {
+        "ingredients": np.column_stack(
+            [_bits_to_array(b, size) for b in ingredients.containing.values()] or [np.zeros(size)]),
+        "diet": np.column_stack([_bits_to_array(ingredients.flags[f], size) for f in DIET_FLAGS]),
+    }
+    names = sorted({p.get("category") or "" for p in products})
+    column = {c: j for j, c in enumerate(names)}
+    category = np.zeros((size, len(names)), dtype=np.float32)
+    category[np.arange(size), [column[p.get("category") or ""] for p in products]] = 1.0
+    groups["category"] = category
+    groups["text"] = project_text(tfidf_matrix([f"{p.get('name') or ''} {p.get('description') or ''}" for p in products]))
+
+    blocks = [_normalize_rows(groups[name].astype(np.float32)) * weight
+              for name, weight in FEATURE_WEIGHTS.items()]
+    return _normalize_rows(np.hstack(blocks))
+
+
+# -----------------------
+# BLOCKED TOP-K
+# -----------------------
+def top_k_neighbours(X: np.ndarray, k: int = SIMILAR_TOP_K, block_rows: int = SIMILAR_BLOCK_ROWS):
+    """
+    Indices and scores of each row's k most similar other rows (by dot product),
+    best first, padded with -1 when there are fewer than k other rows.
+
+    The full N x N matrix is never held: rows are scored block_rows at a time.
+    Instead of a partition over every column, each row's k-th best score among a
+    fixed column sample is a lower bound for its true k-th best, so only columns
+    at or above it are ranked. The result is exact.
+    """
+    n = X.shape[0]
+    k_eff = min(k, n - 1)
+    neighbours = np.full((n, k), -1, dtype=np.int32)
+    scores = np.zeros((n, k), dtype=np.float32)
+    if k_eff <= 0:
+        return neighbours, scores
+
+    rng = np.random.default_rng(0)
+    sample = np.sort(rng.choice(n, size=min(n, max(THRESHOLD_SAMPLE, 4 * k)), replace=False))
+    for start in range(0, n, block_rows):
+        stop = min(n, start + block_rows)
+        rows = np.arange(stop - start)
+        S = X[start:stop] @ X.T
+        S[rows, rows + start] = -np.inf  # never your own neighbour
+
+        sampled = S[:, sample]
+        floor = -np.partition(-sampled, k_eff - 1, axis=1)[:, k_eff - 1]
+        candidates = np.flatnonzero(S >= floor[:, None])
+        if len(candidates) > 64 * k * len(rows):
+            # Too many ties at the floor to be worth it; plain partition instead
+            cols = np.argpartition(-S, k_eff - 1, axis=1)[:, :k_eff]
+            r = np.repeat(rows, k_eff)
+            c = cols.ravel()
+        else:
+            r, c = np.divmod(candidates, n)
+        values = S[r, c]
+        # Best first within each row: one sort on row * span - score (span keeps rows
+        # apart); the stable sort leaves ties in column order
+        span = float(values.max() - values.min()) + 1.0
+        order = np.argsort(r * span - values, kind="stable")
+        r, c, values = r[order], c[order], values[order]
+        rank = np.arange(len(r)) - np.searchsorted(r, r)
+        keep = rank < k_eff
+        neighbours[r[keep] + start, rank[keep]] = c[keep]
+        scores[r[keep] + start, rank[keep]] = values[keep]
+    return neighbours, scores
+
+
+# -----------------------
+# SIMILARITY INDEX
+# -----------------------
+class SimilarityIndex:
+    """
+    Precomputed "you may also like" table for one menu version: the top
+    SIMILAR_TOP_K neighbours of every product. A lookup walks one product's
+    neighbour row and applies the filters per neighbour, so it costs O(k)
+    whatever the catalog size. Diet flags and ingredients come from the menu's
+    IngredientIndex, so "without milk" also drops yogurt and ice cream items.
+    """
+
+    def __init__(self, products: list, ingredients, k: int = SIMILAR_TOP_K,
+                 block_rows: int = SIMILAR_BLOCK_ROWS, version=None):
+        started = time.perf_counter()
+        self.version = version
+        self.products = products
+        self.ingredients = ingredients
+        self.position = {p["id"]: i for i, p in enumerate(products)}
+        # Product names as token strings, for spotting "something like a latte" in chat
+        self.by_name = {}
+        for p in products:
+            name = " ".join(TOKEN_PATTERN.findall((p.get("name") or "").lower()))
+            if name:
+                self.by_name.setdefault(name, p["id"])
+        self.longest_name = max((n.count(" ") + 1 for n in self.by_name), default=0)
+        self.prices = [float(p.get("price") or 0) for p in products]
+        size = len(products)
+        # Diet flags per product, bit b = DIET_FLAGS[b]
+        diet_bits = np.zeros(size, dtype=np.uint8)
+        for bit, flag in enumerate(DIET_FLAGS):
+            diet_bits |= _bits_to_array(ingredients.flags[flag], size).astype(np.uint8) << bit
+        self.diet_bits = diet_bits.tolist()
+        if size:
+            self.neighbours, self.scores = top_k_neighbours(feature_matrix(products, ingredients), k, block_rows)
+        else:
+            self.neighbours = np.zeros((0, k), dtype=np.int32)
+            self.scores = np.zeros((0, k), dtype=np.float32)
+        self.k = k
+        self.build_seconds = time.perf_counter() - started
+
+    def similar(self, product_id, limit: int = 5, categories=None, exclude=(), diet=(),
+                min_price=None, max_price=None, branch=None):
+        """
+        Up to `limit` (product, score) pairs from the product's neighbours that pass
+        the filters, best first. None when the product is not on the menu. With a
+        branch (branches.BranchMenu) its unavailable products are skipped and its
+        prices used, for filtering and in the result.
+        """
+        i = self.position.get(product_id)
+        if i is None:
+            return None
+        wanted_categories = {c.lower() for c in categories} if categories else None
+        # Avoided ingredients as one mask in IngredientIndex.item_masks' bit space
+        avoid = 0
+        for ingredient in expand(exclude):
+            bit = self.ingredients.vocabulary.get(ingredient)
+            if bit is not None:
+                avoid |= 1 << bit
+        wanted_diet = sum(1 << DIET_FLAGS.index(f) for f in diet if f in DIET_FLAGS)
+
+        results = []
+        for j, score in zip(self.neighbours[i].tolist(), self.scores[i].tolist()):
+            if j < 0:
+                break
+            p = self.products[j]
+            price = self.prices[j]
+            if branch is not None:
+                if p["id"] in branch.hidden:
+                    continue
+                price = branch.prices.get(p["id"], price)
+            if wanted_categories is not None and (p.get("category") or "").lower() not in wanted_categories:
+                continue
+            if self.ingredients.item_masks[j] & avoid:
+                continue
+            if self.diet_bits[j] & wanted_diet != wanted_diet:
+                continue
+            if (min_price is not None and price < min_price) or (max_price is not None and price > max_price):
+                continue
+            results.append((p, score))
+            if len(results) >= limit:
+                break
+        if branch is not None:
+            results = list(zip(branch.localize([p for p, _ in results]), [score for _, score in results]))
+        return results
+
+    def find_product(self, text: str):
+        """Id of the menu product named in the text (longest name wins), or None."""
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        for n in range(min(self.longest_name, len(tokens)), 0, -1):
+            for start in range(len(tokens) - n + 1):
+                product_id = self.by_name.get(" ".join(tokens[start:start + n]))
+                if product_id is not None:
+                    return product_id
+        return None
+
+    def stats(self) -> dict:
+        return {"products": len(self.products), "k": self.k, "build_ms": round(self.build_seconds * 1000, 1),
+                "menu_version": self.version}
+
+
+# Table of the most recent menu version; rebuilt only when the version changes
+_SIMILARITY_CACHE = (None, None)
+# Serializes inline builds, so concurrent requests wait for one
+_BUILD_LOCK = threading.Lock()
+# Guards _SIMILARITY_CACHE and _BUILDING
+_STATE_LOCK = threading.Lock()
+# (menu version, pid) of the background build in progress; the pid tells a forked
+# worker that the build belongs to its parent
+_BUILDING = None
+
+
+def _is_current(index, products: list, version) -> bool:
+    if index is None:
+        return False
+    if version is None:
+        return index.products is products
+    return index.version == version
+
+
+def _build(products: list, version) -> SimilarityIndex:
+    global _SIMILARITY_CACHE
+    index = SimilarityIndex(products, get_filter_index(products, version).ingredients, version=version)
+    with _STATE_LOCK:
+        _SIMILARITY_CACHE = (version, index)
+    return index
+
+
+def _build_in_background(products: list, version):
+    global _BUILDING
+    try:
+        _build(products, version)
+    except Exception as e:
+        print(f"Similarity Index: build for menu version {version} failed: {e}")
+    finally:
+        with _STATE_LOCK:
+            _BUILDING = None
+
+
+def building_version():
+    """Menu version of the table being built in the background, or None."""
+    building = _BUILDING
+    return building[0] if building is not None and building[1] == os.getpid() else None
+
+
+def get_similarity_index(products: list, version=None):
+    """
+    Return the SimilarityIndex for this menu version, building it (once) on first
+    use. Menus over SIMILAR_SYNC_BUILD_MAX products build in a background thread;
+    until it finishes this returns the previous version's table (check
+    index.version), or None when there is none yet. With version=None the table
+    is cached for this very products list.
+    """
+    global _BUILDING
+    _, index = _SIMILARITY_CACHE
+    if _is_current(index, products, version):
+        return index
+    if version is not None and len(products) > SIMILAR_SYNC_BUILD_MAX:
+        with _STATE_LOCK:
+            _, index = _SIMILARITY_CACHE
+            if _is_current(index, products, version):
+                return index
+            if building_version() is None:
+                # One build at a time; a newer version waits for the next request after it
+                _BUILDING = (version, os.getpid())
+                threading.Thread(target=_build_in_background, args=(products, version),
+                                 name="similarity-build", daemon=True).start()
+        return index
+    with _BUILD_LOCK:
+        _, index = _SIMILARITY_CACHE
+        if _is_current(index, products, version):
+            return index
+        return _build(products, version)
@@ -0,0 +1,110 @@
+import json
+import re
+
+# -----------------------
+# INCREMENTAL REPLY PARSER
+# -----------------------
+# Finds the start of the "reply" string value, wherever it appears in the object
+REPLY_KEY = re.compile(r'"reply"\s*:\s*"')
+# The four hex digits of a \uXXXX escape (int(..., 16) alone would also take " 1a" or "+1a")
+HEX4 = re.compile(r"[0-9a-fA-F]{4}")
+SIMPLE_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+# Enough characters to hold a split '"reply" :  "' marker at a chunk boundary
+KEY_OVERLAP = 32
+
+
+def strip_fences(content: str) -> str:
+    """Remove a ```json ... ``` (or bare ```) fence around the model output, if any."""
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0]
+    elif "```" in content:
+        content = content.split("```")[1].split("```")[0]
+    return content.strip()
+
+
+class ReplyStreamParser:
+    """
+    Consumes the model output chunk by chunk and yields the decoded text of the
+    "reply" field as soon as it arrives, before the JSON object is complete.
+    Code fences and any text around the object are tolerated.
+    Call finish() at the end for the fully parsed object.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0          # next unread character of the reply string
+        self._scan_from = 0    # where to resume looking for the "reply" key
+        self._state = "seek"   # seek -> string -> done
+        self.reply = ""
+
+    def feed(self, chunk: str) -> str:
+        """Add raw model output; return the newly decoded reply text (possibly empty)."""
+        self._buf += chunk
+        if self._state == "seek":
+            m = REPLY_KEY.search(self._buf, self._scan_from)
+            if m is None:
+                self._scan_from = max(0, len(self._buf) - KEY_OVERLAP)
+                return ""
+            self._pos = m.end()
+            self._state = "string"
+        if self._state != "string":
+            return ""
+
+        out = []
+        buf, i, n = self._buf, self._pos, len(self._buf)
+        while i < n:
+            ch = buf[i]
+            if ch == '"':
+                self._state = "done"
+                i += 1
+                break
+            if ch != "\\":
+                out.append(ch)
+                i += 1
+                continue
+            # Escape sequence; wait for more data if it is split across chunks
+            if i + 1 >= n:
+                break
+            esc = buf[i + 1]
+            if esc == "u":
+                if i + 6 > n:
+                    break
+                if not HEX4.fullmatch(buf, i + 2, i + 6):
+                    # Malformed escape: keep it as literal text rather than abort the stream
+                    out.append("\\u")
+                    i += 2
+                    continue
+                code = int(buf[i + 2:i + 6], 16)
+                # Surrogate pair (e.g. emoji): high half, then a \uDCxx low half
+                if 0xD800 <= code < 0xDC00:
+                    if i + 12 > n:
+                        break
+                    if buf[i + 6:i + 8] == "\\u" and HEX4.fullmatch(buf, i + 8, i + 12):
+                        low = int(buf[i + 8:i + 12], 16)
+                        if 0xDC00 <= low < 0xE000:
+                            out.append(chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)))
+                            i += 12
+                            continue
+                out.append(chr(code))
+                i += 6
+            else:
+                out.append(SIMPLE_ESCAPES.get(esc, esc))
+                i += 2
+        self._pos = i
+
+        text = "".join(out)
+        self.reply += text
+        return text
+
+    def finish(self):
+        """Parse the complete output; returns the object, or None if it is not valid JSON."""
+        try:
+            parsed = json.loads(strip_fences(self._buf))
+        except json.JSONDecodeError:
+            return None
+        return parsed if isinstance(parsed, dict) else None
+
+    @property
+    def raw(self) -> str:
+        """Everything fed so far."""
+        return self._buf
@@ -5,21 +5,15 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.pipeline import Pipeline
 import joblib
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai.compact_model import export_compact
+from ai.training_data import SEED_DATA
 
 # 1. Prepare Training Data using Pandas
-# Adding various English and Turkish phrases to make the model robust
-data = {
-    "text": [
-        "i am on a diet", "low calorie options", "i want to lose weight", "fit and healthy meals",
-        "i am vegan", "no animal products", "plant-based milk please", "vegan friendly",
-        "i have an allergy", "allergic to fruits", "strawberry allergy", "no nuts please",
-        "diyetteyim", "zayıflamak istiyorum", "kalorisiz olsun", "vegan besleniyorum",
-        "alerjim var", "meyve yemiyorum", "fıstığa alerjim var", "sugar free"
-    ],
-    "label": ["diet", "diet", "diet", "diet", "vegan", "vegan", "vegan", "vegan", "allergy", "allergy", "allergy", "allergy", "diet", "diet", "diet", "vegan", "allergy", "allergy", "allergy", "diet"]
-}
-
-df = pd.DataFrame(data)
+# The seed phrases live in training_data.py, shared with the online trainer
+df = pd.DataFrame(SEED_DATA)
 
 # 2. Build Scikit-learn Pipeline
 # Tfidf: Converts text into numerical vectors (NumPy arrays)
@@ -36,4 +30,9 @@ model_pipeline.fit(df['text'], df['label'])
 model_path = os.path.join(os.path.dirname(__file__), 'menu_ai_model.pkl')
 joblib.dump(model_pipeline, model_path)
 
-print(f"SUCCESS: AI Model trained and saved at '{model_path}'")
\ No newline at end of file
+print(f"SUCCESS: AI Model trained and saved at '{model_path}'")
+
+# 5. Export the compact NumPy-only artifact that workers load by default
+compact_path = export_compact(model_pipeline, os.path.join(os.path.dirname(__file__), 'menu_ai_model.npz'))
+
+print(f"SUCCESS: Compact model saved at '{compact_path}'")
@@ -0,0 +1,18 @@
+# -----------------------
+# SEED TRAINING DATA
+# -----------------------
+# Adding various English and Turkish phrases to make the model robust.
+# Used by train_models.py for the full fit and replayed with every online
+# update (online_training.py) so logged traffic cannot erase the basics.
+SEED_DATA = {
+    "text": [
+        "i am on a diet", "low calorie options", "i want to lose weight", "fit and healthy meals",
+        "i am vegan", "no animal products", "plant-based milk please", "vegan friendly",
+        "i have an allergy", "allergic to fruits", "strawberry allergy", "no nuts please",
+        "diyetteyim", "zayıflamak istiyorum", "kalorisiz olsun", "vegan besleniyorum",
+        "alerjim var", "meyve yemiyorum", "fıstığa alerjim var", "sugar free"
+    ],
+    "label": ["diet", "diet", "diet", "diet", "vegan", "vegan", "vegan", "vegan", "allergy", "allergy", "allergy", "allergy", "diet", "diet", "diet", "vegan", "allergy", "allergy", "allergy", "diet"]
+}
+
+INTENT_CLASSES = ["allergy", "diet", "vegan"]
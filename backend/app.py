@@ -1,8 +1,13 @@
 import os
-import sqlite3
+import atexit
 import json
+import hashlib
+import time
 import openai
-from flask import Flask, render_template, request, redirect, url_for, jsonify, abort
+from flask import Flask, Response, stream_with_context, render_template, request, redirect, url_for, jsonify, abort, g
+from flask import before_render_template, template_rendered
+from flask.json.provider import DefaultJSONProvider
+from markupsafe import Markup
 from flask_cors import CORS
 from dotenv import load_dotenv
 
@@ -10,114 +15,314 @@ from dotenv import load_dotenv
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+# Local modules read their settings (e.g. CAFE_DB_PATH) from the environment at import
+from db import DB_PATH, get_conn, query_observers
+from metrics import Metrics
+from migrations import migrate
+from catalog import CatalogCache, bump_menu_version, labels_by_product, set_product_labels, import_products
+from catalog import query_products, category_pages, FragmentCache, PAGE_SIZE, MAX_PAGE_SIZE
+from importer import rows_from_menu, rows_from_csv
+from notifications import add_notification, resolve_notification, archive_older_than
+from notifications import list_notifications, notification_counts, NOTIFICATIONS_ARCHIVE_DAYS
+from notifications import NotificationQueue, WRITE_BEHIND_ENABLED
+from images import ImageProcessor, save_upload, HASHED_NAME
+from branches import BranchCatalogs, attach_shard, find_branch, create_branch, delete_branch
+from branches import set_override, clear_override, list_branches
+from ai.prompt import PromptBuilder, hydrate_recommendations
+from ai import nlp_model
+from ai.nlp_model import analyze_text
+from ai.hybrid import PathStats, answer_locally
+from ai.recommendation import get_filter_index
+from ai.similarity import building_version, get_similarity_index, SIMILAR_TOP_K
+from ai.response_cache import ResponseCache, intent_key
+from ai.llm_client import LLMClient, LLMOverloaded, LLMTimeout
+from ai.stream_parser import ReplyStreamParser, strip_fences
+from ai.online_training import IntentLog
+
 # Path configurations
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 FRONTEND_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "frontend"))
 TEMPLATE_DIR = os.path.join(FRONTEND_DIR, "templates")
 STATIC_DIR = os.path.join(FRONTEND_DIR, "static")
-DB_PATH = os.path.join(BASE_DIR, "cafe.db")
 
 # Admin security and constants
 ADMIN_KEY = "1234"
 # Categories updated to match frontend menu buttons
-CATEGORIES = ["Coffee", "Tea", "Cold Beverages", "Desserts"]
+CATEGORIES = ["Coffee", "Tea", "Cold Drinks", "Desserts"]
 
 app = Flask(__name__, template_folder=TEMPLATE_DIR, static_folder=STATIC_DIR)
 CORS(app)
 
-def get_conn():
-    """Establish a connection to the SQLite database."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Per-worker latency, SQL and LLM metrics, see /admin/metrics
+metrics = Metrics()
+query_observers.append(metrics.observe_query)
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """jsonify() with its encoding time counted in the request's "json" phase."""
+    def dumps(self, obj, **kwargs):
+        with metrics.phase("json"):
+            return super().dumps(obj, **kwargs)
+
+app.json = TimedJSONProvider(app)
+
+# Create or upgrade the schema before serving anything
+_conn = get_conn()
+migrate(_conn)
+_conn.close()
+
+# /contact submissions are spooled and group-committed in the background;
+# spools left by a worker that died are inserted before serving
+contact_queue = NotificationQueue(get_conn) if WRITE_BEHIND_ENABLED else None
+if contact_queue is not None:
+    contact_queue.replay()
+    atexit.register(contact_queue.close)
+
+# Shared menu cache; admin CRUD bumps the menu version and invalidates it
+catalog_cache = CatalogCache(get_conn)
+# Rendered /menu category blocks for the current menu version
+menu_fragments = FragmentCache()
+# Per-branch merged menus (base menu + overrides), each with its own cache and version
+branch_catalogs = BranchCatalogs(get_conn, catalog_cache)
+# Builds resized WebP variants of uploaded images off the request thread
+image_processor = ImageProcessor(get_conn, on_change=catalog_cache.invalidate)
+prompt_builder = PromptBuilder()
+# Fast-path hit rate and latency per answer path, see /admin/ai-stats
+ai_stats = PathStats()
+# Time to the first streamed reply text, kept apart so it does not count as a request
+first_token_stats = PathStats()
+# LLM answers keyed by normalized intent + menu version
+response_cache = ResponseCache()
+# One long-lived OpenAI client per worker
+llm_client = LLMClient(on_call=metrics.observe_llm)
+# The intent model loads on the first chat message; with gunicorn --preload set
+# NLP_PRELOAD=1 to load it once in the master and share it with every worker
+if os.getenv("NLP_PRELOAD") == "1":
+    nlp_model.preload()
+# Labelled chat messages for online retraining (AI_INTENT_LOG, off by default)
+intent_log = IntentLog()
+
+# --- REQUEST METRICS ---
+@app.before_request
+def start_request_metrics():
+    g.metrics_started = time.perf_counter()
+    metrics.begin_request()
+    # Opt-in profiling (METRICS_PROFILING=1): send "X-Profile: <admin key>" or rely on sampling
+    if metrics.should_profile(request.headers.get("X-Profile") == ADMIN_KEY):
+        g.profiler = metrics.start_profile()
+
+@app.after_request
+def finish_request_metrics(response):
+    """Record route latency (to the response headers for streams) and attach the profile id."""
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        response.headers["X-Profile-Id"] = str(metrics.stop_profile(profiler, f"{request.method} {request.path}"))
+    route = request.url_rule.rule if request.url_rule else "<unmatched>"
+    metrics.end_request(route, request.method, response.status_code, time.perf_counter() - g.metrics_started)
+    return response
+
+@app.after_request
+def cache_hashed_images(response):
+    """Content-addressed uploads never change under the same name, so browsers may keep them for a year."""
+    if request.endpoint == "static" and response.status_code in (200, 304):
+        filename = request.view_args.get("filename", "")
+        if filename.startswith("images/uploads/") and HASHED_NAME.match(filename[len("images/uploads/"):]):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+@before_render_template.connect_via(app)
+def start_render_timer(sender, template, context, **extra):
+    g.render_started = time.perf_counter()
+
+@template_rendered.connect_via(app)
+def record_render_time(sender, template, context, **extra):
+    started = g.pop("render_started", None)
+    if started is not None:
+        metrics.add_phase("render", time.perf_counter() - started)
 
 # --- AI ASSISTANT API (GPT Integration) ---
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def sse_event(event, data):
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def ai_response(payload, stream):
+    """Return a finished answer either as JSON or as a complete SSE stream."""
+    if not stream:
+        return jsonify(payload)
+    events = sse_event("reply", {"text": payload.get("reply", "")}) + \
+        sse_event("recommendations", payload.get("recommendations", {})) + sse_event("done", {})
+    return Response(events, mimetype="text/event-stream", headers=SSE_HEADERS)
+
+def stream_llm_reply(deltas, products_list, cache_key, cache_version, started):
+    """Relay the reply text as it is generated, then the hydrated recommendations."""
+    parser = ReplyStreamParser()
+    first_token = True
+    try:
+        for delta in deltas:
+            text = parser.feed(delta)
+            if text:
+                if first_token:
+                    first_token_stats.record("llm_stream", time.perf_counter() - started)
+                    first_token = False
+                yield sse_event("reply", {"text": text})
+
+        parsed = parser.finish()
+        if parsed is None:
+            # Not JSON after all: the whole output is the reply
+            parsed = {"reply": parser.raw, "recommendations": {}}
+        else:
+            parsed["recommendations"] = hydrate_recommendations(parsed.get("recommendations"), products_list)
+            if cache_key:
+                response_cache.set(cache_key, parsed, cache_version)
+        if not parser.reply and parsed.get("reply"):
+            yield sse_event("reply", {"text": parsed["reply"]})
+        yield sse_event("recommendations", parsed["recommendations"])
+        yield sse_event("done", {})
+        ai_stats.record("llm_stream", time.perf_counter() - started)
+    except Exception as e:
+        print(f"AI Error: {e}")
+        yield sse_event("error", {"error": str(e)})
+    finally:
+        deltas.close()
+
 @app.route("/api/ai-suggest", methods=["POST"])
 def ai_suggest():
-    """Handle chatbot requests using OpenAI GPT."""
+    """
+    Handle chatbot requests: local intent model first, OpenAI GPT for ambiguous queries.
+    With {"stream": true} the answer is sent as Server-Sent Events:
+    'reply' text pieces, then 'recommendations', then 'done'.
+    With {"branch": slug} the answer uses that branch's products and prices.
+    """
+    branch_catalog, branch = request_branch((request.get_json(silent=True) or {}).get("branch"))
     try:
         data = request.json
         user_message = data.get("message", "")
+        stream = bool(data.get("stream"))
         
         if not user_message:
             return jsonify({"error": "No message provided"}), 400
 
-        # Fetch all products to give context to GPT
-        conn = get_conn()
-        products_raw = conn.execute("SELECT * FROM products").fetchall()
-        products_list = []
-        for p in products_raw:
-            p_dict = dict(p)
-            label_rows = conn.execute(
-                "SELECT l.name FROM product_labels pl JOIN labels l ON l.id = pl.label_id WHERE pl.product_id = ?",
-                (p_dict['id'],)
-            ).fetchall()
-            p_dict['labels'] = [row['name'] for row in label_rows]
-            products_list.append(p_dict)
-        conn.close()
+        started = time.perf_counter()
+        version, products_list = catalog_cache.get()
+        with metrics.phase("nlp"):
+            intent = analyze_text(user_message)
+        intent_log.record(user_message, intent)
+
+        # Fast path: confident local classification answers without the LLM
+        local = answer_locally(intent, products_list, version, message=user_message, branch=branch)
+        if local is not None:
+            ai_stats.record("local", time.perf_counter() - started)
+            return ai_response(local, stream)
 
-        # Construct System Prompt
-        system_prompt = f"""
-You are the AI Assistant for 'Caffe HUB'. 
-You are friendly, helpful, and knowledgeable about the menu.
-Your goal is to recommend products based on user preferences.
-If a product does not have a specific label but you know it matches the user's request (e.g. 'Coffee' usually has caffeine, 'Fruit' is vegan), you can infer it.
-
-MENU DATA:
-{json.dumps(products_list, ensure_ascii=False)}
-
-INSTRUCTIONS:
-1. Analyze the user's message.
-2. Recommend items from the MENU DATA that match the request.
-3. If the user has restrictions (e.g. vegan, sugar-free), STRICTLY respect them. Check 'labels' first. If labels are missing, use your general knowledge to infer safety (e.g. Black Tea is vegan).
-4. Return the response in strictly Valid JSON format with this structure:
-{{
-  "reply": "Your conversational response here...",
-  "recommendations": {{
-      "coffee": [List of match objects...],
-      "tea": [...],
-      "cold": [...],
-      "sweet": [...]
-  }}
-}}
-The 'recommendations' object keys must map to your best categorization.
-Only include products that actually exist in the MENU DATA.
-"""
-
-        # New OpenAI API (v1.0+)
-        from openai import OpenAI
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            temperature=0.7
-        )
+        # Near-identical requests on the same menu reuse an earlier LLM answer. The version
+        # is the one the prompt is built from, so an answer is never cached for a newer menu
+        cache_version = version
+        response_cache.sync_version(cache_version)
+        cache_key = intent_key(intent)
+        if cache_key and branch is not None:
+            # Same intent, different products and prices: one entry per branch version
+            cache_key = f"{branch.tag}:{cache_key}"
+        cached = response_cache.get(cache_key, cache_version) if cache_key else None
+        if cached is not None:
+            ai_stats.record("cache", time.perf_counter() - started)
+            return ai_response(cached, stream)
 
+        # Compact, per-version cached menu context for GPT (each branch keeps its own)
+        if branch is not None:
+            builder = branch_catalog.extras.setdefault("prompt_builder", PromptBuilder())
+            version, products_list = branch.version, branch.products
+        else:
+            builder = prompt_builder
+        system_prompt = builder.build(version, products_list, user_message, intent)
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ]
+
+        if stream:
+            # Overload/timeout while opening the stream still surface as 503/504 below
+            deltas = llm_client.chat_stream(messages=messages, temperature=0.7)
+            return Response(stream_with_context(stream_llm_reply(deltas, products_list, cache_key, cache_version, started)),
+                            mimetype="text/event-stream", headers=SSE_HEADERS)
+
+        # Shared client: keep-alive, timeout, retries and concurrency limiting
+        response = llm_client.chat(messages=messages, temperature=0.7)
         content = response.choices[0].message.content
         
         # Attempt to parse JSON from GPT response
         try:
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0]
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0]
-            
-            parsed_response = json.loads(content.strip())
-            return jsonify(parsed_response)
+            parsed_response = json.loads(strip_fences(content))
         except json.JSONDecodeError:
-            return jsonify({
+            parsed_response = None
+        if isinstance(parsed_response, dict):
+            # The model answers with product ids; send full products to the widget
+            parsed_response["recommendations"] = hydrate_recommendations(parsed_response.get("recommendations"), products_list)
+            if cache_key:
+                response_cache.set(cache_key, parsed_response, cache_version)
+        else:
+            # Not JSON, or JSON but not an object (a list, a bare string): the whole output is the reply
+            parsed_response = {
                 "reply": content,
                 "recommendations": {}
-            })
+            }
+        ai_stats.record("llm", time.perf_counter() - started)
+        return jsonify(parsed_response)
 
+    except LLMOverloaded as e:
+        # Shed load fast instead of queueing behind a slow upstream
+        resp = jsonify({"error": str(e)})
+        resp.headers["Retry-After"] = "2"
+        return resp, 503
+    except LLMTimeout as e:
+        print(f"AI Error: {e}")
+        return jsonify({"error": str(e)}), 504
     except Exception as e:
         print(f"AI Error: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route("/admin/ai-stats")
+def admin_ai_stats():
+    """Report the chatbot fast-path hit rate, p50/p99 latency per path and response cache counters."""
+    key = request.args.get("key")
+    if key != ADMIN_KEY: abort(403)
+    stats = ai_stats.snapshot()
+    stats["stream_first_token"] = first_token_stats.snapshot()["paths"]
+    stats["response_cache"] = response_cache.stats()
+    stats["llm"] = llm_client.stats()
+    stats["intent_model"] = nlp_model.model_info()
+    version, products = catalog_cache.get()
+    stats["ingredient_index"] = dict(get_filter_index(products, version).ingredients.stats(), menu_version=version)
+    similarity = get_similarity_index(products, version)
+    stats["similarity_index"] = dict(similarity.stats() if similarity is not None else {},
+                                     building_version=building_version())
+    return jsonify(stats)
+
+@app.route("/admin/metrics")
+def admin_metrics():
+    """
+    This worker's route latency histograms, phase breakdown, SQL statement timings
+    (with likely N+1 patterns) and LLM calls. JSON by default, ?format=prometheus for text.
+    """
+    key = request.args.get("key")
+    if key != ADMIN_KEY: abort(403)
+    if request.args.get("format") == "prometheus":
+        return Response(metrics.prometheus(), mimetype="text/plain; version=0.0.4")
+    snapshot = metrics.snapshot()
+    if contact_queue is not None:
+        snapshot["contact_queue"] = dict(contact_queue.stats, pending=contact_queue.pending())
+    snapshot["branches"] = branch_catalogs.stats()
+    return jsonify(snapshot)
+
+@app.route("/admin/metrics/profiles/<int:profile_id>")
+def admin_metrics_profile(profile_id):
+    """cProfile report (top functions by cumulative time) of one profiled request."""
+    key = request.args.get("key")
+    if key != ADMIN_KEY: abort(403)
+    profile = metrics.profile(profile_id)
+    if profile is None: abort(404)
+    return Response(f"{profile['request']} at {profile['at']}\n\n{profile['report']}", mimetype="text/plain")
+
 # --- ADMIN DASHBOARD ---
 @app.route("/admin")
 def admin_panel():
@@ -126,25 +331,21 @@ def admin_panel():
     if key != ADMIN_KEY: abort(403)
     conn = get_conn()
     labels = conn.execute("SELECT * FROM labels ORDER BY name").fetchall()
-    products = conn.execute("SELECT * FROM products ORDER BY id DESC").fetchall()
-    notifications = conn.execute("SELECT * FROM notifications ORDER BY id DESC").fetchall()
-    
-    # We also need product_labels for the view
-    product_labels = {}
-    all_pl = conn.execute("SELECT p.name as p_name, p.id as p_id, l.name as l_name FROM product_labels pl JOIN products p ON p.id = pl.product_id JOIN labels l ON l.id = pl.label_id").fetchall()
-    
-    # Organize labels by product id for easier template rendering
-    # The template uses product_labels.get(p["id"], [])
-    product_labels_map = {}
-    for row in all_pl:
-        pid = row['p_id']
-        if pid not in product_labels_map:
-            product_labels_map[pid] = []
-        product_labels_map[pid].append(row['l_name'])
-        
-    conn.close()
+    # One keyset page of messages plus counter rows, however many messages exist
+    notif_view = request.args.get("notif_view", "open")
+    notif_before = request.args.get("notif_before", type=int)
+    notifications, notif_next = list_notifications(conn, notif_view, notif_before)
+    notif_counts = notification_counts(conn)
+    branches = list_branches(conn)
+
+    # Newest products first; the template uses product_labels.get(p["id"], [])
+    products = catalog_cache.products()[::-1]
+    product_labels_map = labels_by_product(products)
     conn.close()
-    return render_template("admin.html", labels=labels, products=products, notifications=notifications, product_labels=product_labels_map, admin_key=ADMIN_KEY)
+    return render_template("admin.html", labels=labels, products=products, notifications=notifications,
+                           notif_view=notif_view, notif_before=notif_before, notif_next=notif_next,
+                           notif_counts=notif_counts, archive_days=NOTIFICATIONS_ARCHIVE_DAYS,
+                           branches=branches, product_labels=product_labels_map, admin_key=ADMIN_KEY)
 
 # --- PRODUCT CRUD OPERATIONS ---
 @app.route("/admin/products/new")
@@ -164,25 +365,26 @@ def admin_create_product():
     if key != ADMIN_KEY: abort(403)
     conn = get_conn()
     
-    # Handle Image Upload (basic implementation)
+    # Stored under its content hash; thumbnails are built in the background after commit
     image_file = request.files.get("image_file")
     image_path = ""
     if image_file and image_file.filename:
-        filename = image_file.filename
-        save_path = os.path.join(STATIC_DIR, "images", "uploads", filename)
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
-        image_file.save(save_path)
-        image_path = f"/static/images/uploads/{filename}"
+        try:
+            image_path = save_upload(image_file)
+        except ValueError as e:
+            conn.close()
+            abort(400, description=str(e))
 
     cursor = conn.execute("INSERT INTO products (name, price, category, description, image) VALUES (?, ?, ?, ?, ?)",
                          (request.form.get("name"), request.form.get("price"), request.form.get("category"), request.form.get("description"), image_path))
     product_id = cursor.lastrowid
-    
-    for lname in request.form.getlist("labels"):
-        lrow = conn.execute("SELECT id FROM labels WHERE name = ?", (lname,)).fetchone()
-        if lrow: conn.execute("INSERT INTO product_labels (product_id, label_id) VALUES (?, ?)", (product_id, lrow['id']))
+    set_product_labels(conn, product_id, request.form.getlist("labels"))
+    bump_menu_version(conn)
     conn.commit()
     conn.close()
+    catalog_cache.invalidate()
+    if image_path:
+        image_processor.submit(image_path)
     return redirect(url_for('admin_panel', key=ADMIN_KEY))
 
 @app.route("/admin/products/edit/<int:product_id>")
@@ -204,26 +406,29 @@ def admin_update_product(product_id):
     if key != ADMIN_KEY: abort(403)
     conn = get_conn()
     
-    # Handle Image Upload
+    # Handle Image Upload; the old variants are dropped until the worker has built the new ones
     image_file = request.files.get("image_file")
+    image_path = ""
     if image_file and image_file.filename:
-        filename = image_file.filename
-        save_path = os.path.join(STATIC_DIR, "images", "uploads", filename)
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
-        image_file.save(save_path)
-        image_path = f"/static/images/uploads/{filename}"
-        conn.execute("UPDATE products SET name=?, price=?, category=?, description=?, image=? WHERE id=?",
+        try:
+            image_path = save_upload(image_file)
+        except ValueError as e:
+            conn.close()
+            abort(400, description=str(e))
+        conn.execute("UPDATE products SET name=?, price=?, category=?, description=?, image=?, image_variants=NULL WHERE id=?",
                     (request.form.get("name"), request.form.get("price"), request.form.get("category"), request.form.get("description"), image_path, product_id))
     else:
         conn.execute("UPDATE products SET name=?, price=?, category=?, description=? WHERE id=?",
                     (request.form.get("name"), request.form.get("price"), request.form.get("category"), request.form.get("description"), product_id))
 
-    conn.execute("DELETE FROM product_labels WHERE product_id = ?", (product_id,))
-    for lname in request.form.getlist("labels"):
-        lrow = conn.execute("SELECT id FROM labels WHERE name = ?", (lname,)).fetchone()
-        if lrow: conn.execute("INSERT INTO product_labels (product_id, label_id) VALUES (?, ?)", (product_id, lrow['id']))
+    # Only the labels that changed are written
+    set_product_labels(conn, product_id, request.form.getlist("labels"))
+    bump_menu_version(conn)
     conn.commit()
     conn.close()
+    catalog_cache.invalidate()
+    if image_path:
+        image_processor.submit(image_path)
     return redirect(url_for('admin_panel', key=ADMIN_KEY))
 
 @app.route("/admin/products/delete/<int:product_id>", methods=["POST"])
@@ -234,8 +439,34 @@ def admin_delete_product(product_id):
     conn = get_conn()
     conn.execute("DELETE FROM product_labels WHERE product_id = ?", (product_id,))
     conn.execute("DELETE FROM products WHERE id = ?", (product_id,))
+    bump_menu_version(conn)
+    conn.commit()
+    conn.close()
+    catalog_cache.invalidate()
+    return redirect(url_for('admin_panel', key=ADMIN_KEY))
+
+@app.route("/admin/products/import", methods=["POST"])
+def admin_import_products():
+    """Bulk-load products from ai/menu.py (source=menu) or an uploaded CSV in one transaction."""
+    key = request.args.get("key")
+    if key != ADMIN_KEY: abort(403)
+    try:
+        if request.form.get("source") == "menu":
+            rows = rows_from_menu()
+        else:
+            csv_file = request.files.get("csv_file")
+            if not csv_file or not csv_file.filename:
+                return jsonify({"error": "No CSV file provided"}), 400
+            rows = rows_from_csv(csv_file.read().decode("utf-8-sig"))
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    conn = get_conn()
+    import_products(conn, rows, create_labels=bool(request.form.get("create_labels")))
+    bump_menu_version(conn)
     conn.commit()
     conn.close()
+    catalog_cache.invalidate()
     return redirect(url_for('admin_panel', key=ADMIN_KEY))
 
 # --- SYSTEM ACTIONS ---
@@ -248,8 +479,10 @@ def admin_add_label():
     if label_name:
         conn = get_conn()
         conn.execute("INSERT OR IGNORE INTO labels (name) VALUES (?)", (label_name,))
+        bump_menu_version(conn)
         conn.commit()
         conn.close()
+        catalog_cache.invalidate()
     return redirect(url_for('admin_panel', key=ADMIN_KEY))
 
 @app.route("/admin/delete_label/<int:label_id>", methods=["POST"])
@@ -259,8 +492,94 @@ def admin_delete_label(label_id):
     if key != ADMIN_KEY: abort(403)
     conn = get_conn()
     conn.execute("DELETE FROM labels WHERE id = ?", (label_id,))
+    bump_menu_version(conn)
+    conn.commit()
+    conn.close()
+    catalog_cache.invalidate()
+    return redirect(url_for('admin_panel', key=ADMIN_KEY))
+
+# --- BRANCHES ---
+def request_branch(slug):
+    """(BranchCatalog, BranchMenu) for a ?branch= slug, (None, None) for the base menu; 404 if unknown."""
+    if not slug:
+        return None, None
+    catalog = branch_catalogs.get(slug)
+    menu = catalog.menu() if catalog is not None else None
+    if menu is None:
+        branch_catalogs.forget(slug)
+        abort(404, description=f"Unknown branch {slug!r}")
+    return catalog, menu
+
+def _admin_branch(conn, slug):
+    """The branches row for slug with its shard attached to conn (before any write), or 404."""
+    branch = find_branch(conn, slug)
+    if branch is None:
+        conn.close()
+        abort(404)
+    attach_shard(conn, branch["shard"])
+    return branch
+
+@app.route("/admin/branches")
+def admin_branches():
+    """Every branch with its override count and shard, plus this worker's branch cache usage."""
+    key = request.args.get("key")
+    if key != ADMIN_KEY: abort(403)
+    conn = get_conn()
+    branches = list_branches(conn)
+    conn.close()
+    return jsonify({"branches": branches, "cache": branch_catalogs.stats()})
+
+@app.route("/admin/branches/create", methods=["POST"])
+def admin_create_branch():
+    """Add a branch (slug, name, optional shard and comma-separated category order)."""
+    key = request.args.get("key")
+    if key != ADMIN_KEY: abort(403)
+    categories = [c.strip() for c in (request.form.get("categories") or "").split(",") if c.strip()]
+    conn = get_conn()
+    try:
+        create_branch(conn, (request.form.get("slug") or "").strip().lower(), (request.form.get("name") or "").strip(),
+                      shard=(request.form.get("shard") or "").strip() or None, categories=categories or None)
+        conn.commit()
+    except ValueError as e:
+        conn.close()
+        abort(400, description=str(e))
+    conn.close()
+    return redirect(url_for('admin_panel', key=ADMIN_KEY))
+
+@app.route("/admin/branches/<slug>/override", methods=["POST"])
+def admin_branch_override(slug):
+    """
+    Set a product's price and availability in one branch (empty price keeps the
+    base price); reset=1 drops the override so the base menu applies again.
+    """
+    key = request.args.get("key")
+    if key != ADMIN_KEY: abort(403)
+    try:
+        product_id = int(request.form.get("product_id") or "")
+        price = float(request.form["price"]) if request.form.get("price") else None
+    except ValueError:
+        abort(400, description="product_id and price must be numbers")
+    conn = get_conn()
+    branch = _admin_branch(conn, slug)
+    if request.form.get("reset"):
+        clear_override(conn, branch, product_id)
+    else:
+        set_override(conn, branch, product_id, price, available=request.form.get("available") == "1")
+    conn.commit()
+    conn.close()
+    branch_catalogs.invalidate(slug)
+    return redirect(url_for('admin_panel', key=ADMIN_KEY))
+
+@app.route("/admin/branches/<slug>/delete", methods=["POST"])
+def admin_delete_branch(slug):
+    """Remove a branch and its overrides."""
+    key = request.args.get("key")
+    if key != ADMIN_KEY: abort(403)
+    conn = get_conn()
+    delete_branch(conn, _admin_branch(conn, slug))
     conn.commit()
     conn.close()
+    branch_catalogs.forget(slug)
     return redirect(url_for('admin_panel', key=ADMIN_KEY))
 
 # --- FRONTEND ROUTES ---
@@ -273,11 +592,14 @@ def contact_page():
         message = request.form.get("message")
         
         if name and message:
-            conn = get_conn()
-            conn.execute("INSERT INTO notifications (full_name, email, category, message) VALUES (?, ?, ?, ?)",
-                         (name, email, category, message))
-            conn.commit()
-            conn.close()
+            if contact_queue is None:
+                conn = get_conn()
+                add_notification(conn, name, email, category, message)
+                conn.commit()
+                conn.close()
+            elif not contact_queue.submit(name, email, category, message):
+                # Backpressure: the writer is behind, ask the client to retry shortly
+                return render_template("contact.html", error="We are receiving a lot of messages right now, please try again in a moment."), 503, {"Retry-After": "2"}
             # Redirect to home or show success (simple redirect for now)
             return redirect(url_for('home'))
             
@@ -285,15 +607,27 @@ def contact_page():
     
 @app.route("/admin/notifications/resolve/<int:msg_id>", methods=["POST"])
 def admin_resolve_notification(msg_id):
-    """Delete a notification."""
+    """Move a notification to the archive as resolved."""
     key = request.args.get("key")
     if key != ADMIN_KEY: abort(403)
     conn = get_conn()
-    conn.execute("DELETE FROM notifications WHERE id = ?", (msg_id,))
+    resolve_notification(conn, msg_id)
     conn.commit()
     conn.close()
     return redirect(url_for('admin_panel', key=ADMIN_KEY))
 
+@app.route("/admin/notifications/archive", methods=["POST"])
+def admin_archive_notifications():
+    """Archive open notifications older than ?days= (default NOTIFICATIONS_ARCHIVE_DAYS)."""
+    key = request.args.get("key")
+    if key != ADMIN_KEY: abort(403)
+    days = request.args.get("days", NOTIFICATIONS_ARCHIVE_DAYS, type=int)
+    conn = get_conn()
+    moved = archive_older_than(conn, max(days, 0))
+    conn.close()
+    print(f"Notifications: archived {moved} messages older than {days} days")
+    return redirect(url_for('admin_panel', key=ADMIN_KEY))
+
 @app.route("/")
 def home():
     """Render landing page."""
@@ -301,19 +635,164 @@ def home():
 
 @app.route("/menu")
 def menu_page():
-    """Render menu display page."""
-    return render_template("menu.html")
+    """
+    Render the menu with the first page of every category already in the HTML.
+    Each category block is rendered once per menu version; Server-Timing reports the cost.
+    ?branch=<slug> shows that branch's menu, cached separately per branch.
+    """
+    started = time.perf_counter()
+    catalog, branch = request_branch(request.args.get("branch"))
+    if branch is not None:
+        version, products, fragment_cache = branch.version, branch.products, catalog.fragments
+        categories = branch.categories or CATEGORIES
+    else:
+        version, products = catalog_cache.get()
+        fragment_cache, categories = menu_fragments, CATEGORIES
+    catalog_done = time.perf_counter()
+    # Grouping the catalog by category is cached alongside the fragments built from it
+    pages, _ = fragment_cache.get(version, "pages", lambda: category_pages(products, categories))
+    fragments, hits = [], 0
+    for i, (category, items, next_cursor) in enumerate(pages):
+        html, hit = fragment_cache.get(version, f"category:{category}", lambda: Markup(render_template(
+            "menu_category.html", category=category, products=items, next_cursor=next_cursor, eager=i == 0)))
+        fragments.append(html)
+        hits += hit
+    fragments_done = time.perf_counter()
+    body = render_template("menu.html", categories=[page[0] for page in pages], fragments=fragments, branch=branch)
+    finished = time.perf_counter()
+    resp = Response(body, mimetype="text/html")
+    resp.headers["Server-Timing"] = (
+        f"catalog;dur={(catalog_done - started) * 1000:.2f}, "
+        f'fragments;dur={(fragments_done - catalog_done) * 1000:.2f};desc="{hits}/{len(fragments)} cached", '
+        f"page;dur={(finished - fragments_done) * 1000:.2f}")
+    return resp
+
+# Page timings the browser may report; anything else is ignored
+RUM_PAGES = {"menu"}
+RUM_METRICS = {"fcp", "ttfb"}
+
+@app.route("/api/rum", methods=["POST"])
+def api_rum():
+    """Collect first-contentful-paint and TTFB beacons (milliseconds) for /admin/metrics."""
+    data = request.get_json(force=True, silent=True) or {}
+    page = data.get("page")
+    if page in RUM_PAGES:
+        for metric in RUM_METRICS:
+            value = data.get(metric)
+            if isinstance(value, (int, float)) and 0 <= value < 120000:
+                metrics.observe_client(page, metric, value / 1000)
+    return "", 204
+
+# Any of these switches /api/products from the full menu to one filtered page
+PRODUCT_QUERY_PARAMS = {"category", "labels", "exclude_labels", "min_price", "max_price", "q", "cursor", "limit"}
+
+def _list_arg(name):
+    """Values of a repeatable, comma-separated query parameter."""
+    return [v.strip() for raw in request.args.getlist(name) for v in raw.split(",") if v.strip()]
+
+def _float_arg(name):
+    value = request.args.get(name)
+    return float(value) if value not in (None, "") else None
 
 @app.route("/api/products")
 def api_products():
-    """API endpoint to fetch all products for the frontend menu."""
-    conn = get_conn()
-    products = [dict(p) for p in conn.execute("SELECT * FROM products").fetchall()]
-    for p in products:
-        labels = conn.execute("SELECT l.name FROM product_labels pl JOIN labels l ON l.id = pl.label_id WHERE pl.product_id = ?", (p['id'],)).fetchall()
-        p['labels'] = [row['name'] for row in labels]
-    conn.close()
-    return jsonify(products)
+    """
+    API endpoint to fetch all products for the frontend menu.
+    With query parameters (category, labels, exclude_labels, min_price, max_price,
+    q, cursor, limit) it returns one page: {"items", "next_cursor", "version"}.
+    ?branch=<slug> serves that branch's prices and availability.
+    """
+    catalog, branch = request_branch(request.args.get("branch"))
+    if PRODUCT_QUERY_PARAMS.intersection(request.args):
+        return api_products_page(branch)
+    payload = (catalog or catalog_cache).payload()
+    use_gzip = payload.gzip_body is not None and "gzip" in request.accept_encodings
+    etag = payload.gzip_etag if use_gzip else payload.etag
+
+    # Conditional GET: the client already has this version of the menu
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(payload.gzip_body if use_gzip else payload.body, mimetype="application/json")
+        if use_gzip:
+            resp.headers["Content-Encoding"] = "gzip"
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.vary.add("Accept-Encoding")
+    return resp
+
+def api_products_page(branch=None):
+    """One keyset-paginated page of the catalog (or of a branch's menu), filtered in SQL."""
+    try:
+        after_id = int(request.args.get("cursor") or 0)
+        limit = min(MAX_PAGE_SIZE, max(1, int(request.args.get("limit") or PAGE_SIZE)))
+        min_price, max_price = _float_arg("min_price"), _float_arg("max_price")
+    except ValueError:
+        return jsonify({"error": "cursor, limit and prices must be numbers"}), 400
+
+    # A page only changes with the menu, so version + query identify it
+    version = branch.tag if branch is not None else catalog_cache.version()
+    etag = f"menu-{version}-" + hashlib.sha1(request.query_string).hexdigest()[:16]
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        conn = get_conn()
+        overrides = (attach_shard(conn, branch.shard), branch.branch_id) if branch is not None else None
+        items, next_cursor = query_products(
+            conn, categories=_list_arg("category"), labels=_list_arg("labels"),
+            exclude_labels=_list_arg("exclude_labels"), min_price=min_price, max_price=max_price,
+            search=request.args.get("q"), after_id=after_id, limit=limit, overrides=overrides)
+        conn.close()
+        resp = jsonify({"items": items, "next_cursor": next_cursor, "version": version})
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+@app.route("/api/products/<int:product_id>/similar")
+def api_similar_products(product_id):
+    """
+    "You may also like": the product's nearest neighbours from the precomputed
+    similarity table, filtered by category, exclude_labels (ingredients, with
+    what they imply), diet (vegan, sugar_free, low_calorie) and min/max_price.
+    Returns {"items", "version"}; each item carries its similarity score.
+    ?branch=<slug> leaves out what the branch does not sell and uses its prices.
+    While a big menu's new table builds, answers come from the previous one (or
+    are empty) and carry "building": true.
+    """
+    try:
+        limit = min(SIMILAR_TOP_K, max(1, int(request.args.get("limit") or 5)))
+        min_price, max_price = _float_arg("min_price"), _float_arg("max_price")
+    except ValueError:
+        return jsonify({"error": "limit and prices must be numbers"}), 400
+
+    _, branch = request_branch(request.args.get("branch"))
+    version, products = catalog_cache.get()
+    tag = branch.tag if branch is not None else version
+    index = get_similarity_index(products, version)
+    if index is None:
+        resp = jsonify({"items": [], "version": tag, "building": True})
+        resp.headers["Cache-Control"] = "no-store"
+        return resp
+    # A previous version's table answers until the new one is built; its version is in the ETag
+    stale = index.version != version
+    etag = f"similar-{tag}-{index.version}-{product_id}-" + hashlib.sha1(request.query_string).hexdigest()[:16]
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        with metrics.phase("similarity"):
+            pairs = index.similar(
+                product_id, limit=limit, categories=_list_arg("category"),
+                exclude=_list_arg("exclude_labels"), diet=_list_arg("diet"),
+                min_price=min_price, max_price=max_price, branch=branch)
+        if pairs is None and not stale:
+            return jsonify({"error": "Product not found"}), 404
+        body = {"items": [dict(p, score=round(score, 4)) for p, score in pairs or []], "version": tag}
+        if stale:
+            body["building"] = True
+        resp = jsonify(body)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
 
 if __name__ == "__main__":
     app.run(debug=True, port=5001)
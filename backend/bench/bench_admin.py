@@ -0,0 +1,67 @@
+"""
+Benchmark: GET /admin render time as the notifications table grows, for the
+first page and a deep keyset page, plus the cost of archiving old messages.
+Render time should stay flat however many messages have piled up.
+
+Usage (from the backend folder):
+    python -m bench.bench_admin [sizes...]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.synthetic import create_catalog_db, add_notifications
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+PRODUCTS = 200
+REPEAT = 20
+
+
+def _median_ms(client, url):
+    times = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        resp = client.get(url)
+        times.append(time.perf_counter() - started)
+        assert resp.status_code == 200, resp.status_code
+    times.sort()
+    return times[len(times) // 2] * 1000
+
+
+def main(sizes):
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = []
+        for n in sizes:
+            path = create_catalog_db(os.path.join(tmp, f"admin_{n}.db"), PRODUCTS)
+            add_notifications(path, n, max_age_days=90)
+            # Fresh app per database: its modules read CAFE_DB_PATH at import
+            os.environ["CAFE_DB_PATH"] = path
+            for name in [m for m in sys.modules if m in ("app", "db", "catalog", "metrics", "notifications")]:
+                del sys.modules[name]
+            import app
+            client = app.app.test_client()
+            key = app.ADMIN_KEY
+
+            first = _median_ms(client, f"/admin?key={key}")
+            deep = _median_ms(client, f"/admin?key={key}&notif_before={n // 10}")
+
+            started = time.perf_counter()
+            client.post(f"/admin/notifications/archive?key={key}&days=30")
+            archive_ms = (time.perf_counter() - started) * 1000
+            conn = sqlite3.connect(path)
+            counts = dict(conn.execute("SELECT scope, count FROM notification_counts"))
+            conn.close()
+            after = _median_ms(client, f"/admin?key={key}&notif_view=archived")
+            rows.append((n, first, deep, archive_ms, counts["archived"], after))
+
+        print(f"{'messages':>9} {'page 1 ms':>10} {'deep ms':>8} {'archive ms':>11} {'archived':>9} {'archive view ms':>16}")
+        for n, first, deep, archive_ms, archived, after in rows:
+            print(f"{n:>9} {first:>10.2f} {deep:>8.2f} {archive_ms:>11.1f} {archived:>9} {after:>16.2f}")
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or DEFAULT_SIZES)
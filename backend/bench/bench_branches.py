@@ -0,0 +1,77 @@
+"""
+Benchmark: branch-aware requests as the number of branches grows, with the
+overrides in the main database and spread over shard files. A warm branch
+request should cost the same with 1 branch or hundreds; the first request to
+a branch pays for building its merged menu once.
+
+Usage (from the backend folder):
+    python -m bench.bench_branches [branch counts...]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.synthetic import add_branches, create_catalog_db
+
+DEFAULT_COUNTS = [1, 10, 100, 300]
+PRODUCTS = 2000
+SHARDS = 4
+REQUESTS = 300
+
+
+def _median_ms(client, urls):
+    times = []
+    for url in urls:
+        started = time.perf_counter()
+        resp = client.get(url)
+        times.append(time.perf_counter() - started)
+        assert resp.status_code == 200, f"{url}: {resp.status_code}"
+    times.sort()
+    return times[len(times) // 2] * 1000
+
+
+def main(counts):
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = []
+        for shards in (0, SHARDS):
+            for n in counts:
+                path = create_catalog_db(os.path.join(tmp, f"branches_{n}_{shards}.db"), PRODUCTS)
+                add_branches(path, n, shards=shards)
+                # Fresh app per database: its modules read CAFE_DB_PATH at import
+                os.environ["CAFE_DB_PATH"] = path
+                os.environ["CAFE_SHARD_DIR"] = tmp
+                for name in [m for m in sys.modules if m in ("app", "db", "catalog", "metrics", "branches")]:
+                    del sys.modules[name]
+                import app
+                client = app.app.test_client()
+                client.get("/api/products")
+
+                slugs = [f"branch-{i}" for i in range(1, n + 1)]
+                started = time.perf_counter()
+                for slug in slugs:
+                    client.get(f"/api/products?branch={slug}")
+                cold = (time.perf_counter() - started) / n * 1000
+                for slug in slugs:
+                    client.get(f"/menu?branch={slug}")  # render each branch's fragments once
+
+                picks = [rng.choice(slugs) for _ in range(REQUESTS)]
+                cases = [
+                    ("full payload", [f"/api/products?branch={s}" for s in picks]),
+                    ("filtered page", [f"/api/products?branch={s}&category=Tea&limit=24" for s in picks]),
+                    ("menu page", [f"/menu?branch={s}" for s in picks]),
+                ]
+                for label, urls in cases:
+                    rows.append((shards, n, label, cold, _median_ms(client, urls)))
+
+        print(f"{'shards':>6} {'branches':>9} {'request':<14} {'first (ms)':>11} {'median ms':>10}")
+        for shards, n, label, cold, ms in rows:
+            print(f"{shards:>6} {n:>9} {label:<14} {cold:>11.2f} {ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or DEFAULT_COUNTS)
@@ -0,0 +1,55 @@
+"""
+Benchmark: per-product label queries (N+1) vs. the bulk catalog loader.
+
+Usage (from the backend folder):
+    python -m bench.bench_catalog [sizes...]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import load_catalog
+from bench.synthetic import create_catalog_db
+
+DEFAULT_SIZES = [30, 1000, 10000]
+
+
+def load_catalog_n_plus_one(conn):
+    """The original /api/products implementation, kept here as the baseline."""
+    products = [dict(p) for p in conn.execute("SELECT * FROM products").fetchall()]
+    for p in products:
+        labels = conn.execute("SELECT l.name FROM product_labels pl JOIN labels l ON l.id = pl.label_id WHERE pl.product_id = ?", (p['id'],)).fetchall()
+        p['labels'] = [row['name'] for row in labels]
+    return products
+
+
+def _time(fn, path, repeat):
+    """Return the best wall time (ms) of opening a connection and loading the catalog."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        fn(conn)
+        conn.close()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main(sizes):
+    print(f"{'products':>10} {'n+1 (ms)':>12} {'bulk (ms)':>12} {'speedup':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = create_catalog_db(os.path.join(tmp, f"cafe_{n}.db"), n)
+            repeat = 20 if n <= 1000 else 5
+            old = _time(load_catalog_n_plus_one, path, repeat)
+            new = _time(load_catalog, path, repeat)
+            print(f"{n:>10} {old:>12.2f} {new:>12.2f} {old / new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or DEFAULT_SIZES)
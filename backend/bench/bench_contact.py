@@ -0,0 +1,88 @@
+"""
+Benchmark: sustained POST /contact throughput under a burst, with synchronous
+inserts (CONTACT_WRITE_BEHIND=0) and with the write-behind queue, against a
+real multi-worker gunicorn server. Also times an admin write (resolving a
+message) issued during the burst, which competes for the same SQLite writer.
+
+Usage (from the backend folder):
+    python -m bench.bench_contact [requests] [concurrency] [workers]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.load_test import HTTPTarget, run_endpoint, ADMIN_KEY
+from bench.synthetic import create_catalog_db, add_notifications
+
+
+def _count(path: str) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM notifications").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def run_mode(tmp: str, write_behind: bool, n: int, concurrency: int, workers: int) -> dict:
+    mode = "write-behind" if write_behind else "synchronous"
+    path = create_catalog_db(os.path.join(tmp, f"contact_{mode}.db"), 200)
+    add_notifications(path, 1000)
+    before = _count(path)
+    env = dict(os.environ, CAFE_DB_PATH=path, CONTACT_WRITE_BEHIND="1" if write_behind else "0",
+               CONTACT_SPOOL_DIR=os.path.join(tmp, f"spool_{mode}"))
+    target = HTTPTarget(workers, 1, env)
+    try:
+        # Admin writes running alongside the burst
+        admin_ms, stop = [], threading.Event()
+
+        def admin_loop():
+            msg_id = 1
+            while not stop.is_set():
+                started = time.perf_counter()
+                target.request("POST", f"/admin/notifications/resolve/{msg_id}?key={ADMIN_KEY}", {}, None, {})
+                admin_ms.append((time.perf_counter() - started) * 1000)
+                msg_id += 1
+                time.sleep(0.05)
+
+        admin = threading.Thread(target=admin_loop)
+        admin.start()
+        form = lambda i: ("POST", "/contact", {"name": f"Burst {i}", "email": "b@example.com",
+                                              "category": "allergy", "message": f"Burst message {i}"}, None, {})
+        result = run_endpoint(target, form, n, concurrency)
+        stop.set()
+        admin.join()
+
+        # Wait for the queue to drain before counting what reached the database
+        expected = before + result["status"].get("302", 0) - len(admin_ms)
+        deadline = time.time() + 30
+        while _count(path) < expected and time.time() < deadline:
+            time.sleep(0.1)
+        stored = _count(path) - before + len(admin_ms)
+    finally:
+        target.close()
+    admin_ms.sort()
+    return dict(result, mode=mode, stored=stored,
+                admin_p50_ms=admin_ms[len(admin_ms) // 2] if admin_ms else 0,
+                admin_max_ms=admin_ms[-1] if admin_ms else 0)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = [run_mode(tmp, wb, n, concurrency, workers) for wb in (False, True)]
+    print(f"\n{n} submissions, {concurrency} concurrent clients, {workers} gunicorn workers")
+    print(f"{'mode':<13} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'stored':>7} {'503s':>6} {'admin p50':>10} {'admin max':>10}")
+    for r in rows:
+        print(f"{r['mode']:<13} {r['throughput_rps']:>8} {r['p50_ms']:>8} {r['p99_ms']:>8} {r['stored']:>7} "
+              f"{r['status'].get('503', 0):>6} {r['admin_p50_ms']:>10.2f} {r['admin_max_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: mixed read/write throughput with a fresh connection per operation
+(the original get_conn) vs. the pooled WAL connections from db.py.
+
+Usage (from the backend folder):
+    python -m bench.bench_db [--products N] [--readers R] [--writers W] [--seconds S]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import load_catalog
+from db import ConnectionPool
+from bench.synthetic import create_catalog_db
+
+
+def legacy_connect(path):
+    """The original get_conn(): a brand-new rollback-journal connection every time."""
+    def connect():
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        return conn
+    return connect
+
+
+def run(connect, readers, writers, seconds):
+    """Hammer the database from several threads; return (reads, writes, lock errors)."""
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def reader():
+        n = e = 0
+        while time.perf_counter() < stop:
+            try:
+                conn = connect()
+                load_catalog(conn)
+                conn.close()
+                n += 1
+            except sqlite3.OperationalError:
+                e += 1
+        with lock:
+            counts["reads"] += n
+            counts["errors"] += e
+
+    def writer():
+        n = e = 0
+        while time.perf_counter() < stop:
+            try:
+                conn = connect()
+                conn.execute("INSERT INTO notifications (full_name, email, category, message) VALUES (?, ?, ?, ?)",
+                             ("Bench", "bench@example.com", "Feedback", "hello"))
+                conn.commit()
+                conn.close()
+                n += 1
+            except sqlite3.OperationalError:
+                e += 1
+        with lock:
+            counts["writes"] += n
+            counts["errors"] += e
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = create_catalog_db(os.path.join(tmp, "legacy.db"), args.products)
+        pooled_path = create_catalog_db(os.path.join(tmp, "pooled.db"), args.products)
+        pool = ConnectionPool(pooled_path)
+
+        print(f"{args.products} products, {args.readers} readers, {args.writers} writers, {args.seconds}s each")
+        print(f"{'mode':>8} {'reads/s':>10} {'writes/s':>10} {'locked':>8}")
+        for name, connect in (("legacy", legacy_connect(legacy_path)), ("pooled", pool.connect)):
+            c = run(connect, args.readers, args.writers, args.seconds)
+            print(f"{name:>8} {c['reads'] / args.seconds:>10.1f} {c['writes'] / args.seconds:>10.1f} {c['errors']:>8}")
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: server cost of the server-rendered /menu for growing synthetic
+catalogs, right after a menu change (fragments rebuilt) and warm (fragments
+cached), next to the old client-rendered path (empty shell, then a second
+request for the first /api/products page before anything is visible).
+
+Usage (from the backend folder):
+    python -m bench.bench_menu_render [sizes...]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.synthetic import create_catalog_db
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+REPEAT = 30
+
+
+def _timed(client, url):
+    started = time.perf_counter()
+    resp = client.get(url)
+    return (time.perf_counter() - started) * 1000, resp
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main(sizes):
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = []
+        for n in sizes:
+            path = create_catalog_db(os.path.join(tmp, f"menu_{n}.db"), n)
+            # Fresh app per catalog: its modules read CAFE_DB_PATH at import
+            os.environ["CAFE_DB_PATH"] = path
+            for name in [m for m in sys.modules if m in ("app", "db", "catalog", "metrics", "images", "notifications")]:
+                del sys.modules[name]
+            import app
+            client = app.app.test_client()
+            client.get("/menu")  # compile templates, load the catalog
+
+            cold, cold_fragments = [], []
+            for _ in range(5):
+                # A menu change: new version, so every fragment is rendered again
+                conn = sqlite3.connect(path)
+                conn.execute("UPDATE menu_version SET version = version + 1 WHERE id = 1")
+                conn.commit()
+                conn.close()
+                app.catalog_cache.invalidate()
+                app.catalog_cache.get()  # reloading the catalog is not part of the render
+                ms, resp = _timed(client, "/menu")
+                cold.append(ms)
+                cold_fragments.append(resp.headers["Server-Timing"])
+            warm = [_timed(client, "/menu")[0] for _ in range(REPEAT)]
+            html_bytes = len(client.get("/menu").data)
+
+            # Old path: shell (/contact has the same layout and no products), then the first page menu.js fetched
+            shell = [_timed(client, "/contact")[0] for _ in range(REPEAT)]
+            first_page = [_timed(client, "/api/products?limit=24")[0] for _ in range(REPEAT)]
+            rows.append((n, _median(cold), _median(warm), html_bytes, _median(shell), _median(first_page)))
+            print(f"{n} products, last cold Server-Timing: {cold_fragments[-1]}")
+
+        print(f"{'products':>9} {'cold ms':>8} {'warm ms':>8} {'html KB':>8} {'old: shell + page ms':>21}")
+        for n, cold, warm, size, shell, page in rows:
+            print(f"{n:>9} {cold:>8.2f} {warm:>8.2f} {size / 1024:>8.1f} {shell:>9.2f} + {page:.2f} (2 round-trips)")
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,90 @@
+"""
+Benchmark: intent analysis throughput, one analyze_text() call per message
+with the original per-rule scans vs. analyze_batch() over the whole batch.
+
+Usage (from the backend folder):
+    python -m bench.bench_nlp [batch sizes...]
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai import nlp_model
+from ai.nlp_model import analyze_batch, _norm, _ascii_tr, FRUIT_LABELS, NUT_LABELS, FRUIT_TR_MAP
+
+DEFAULT_SIZES = [1, 64, 1024]
+MESSAGES = [
+    "vegan coffee?", "something without nuts", "i am on a diet", "sugar-free tea please",
+    "fıstığa alerjim var tatlı öner", "no sugar, no milk", "meyvesiz soğuk bir şey", "iced latte",
+    "çilek alerjim var", "light dessert", "hello", "what do you recommend for a rainy day",
+]
+
+
+def legacy_analyze_text(user_input):
+    """The original analyze_text(): one predict and ~10 separate scans per message."""
+    text = _norm(user_input)
+    atext = _ascii_tr(user_input)
+    ai_label = None
+    model = nlp_model.get_model()
+    if model is not None:
+        ai_label = model.predict([user_input.lower()])[0]
+    intent = {
+        "categories": [], "exclude_labels": [],
+        "vegan": (ai_label == "vegan") or ("vegan" in text),
+        "low_calorie": (ai_label == "diet") or (any(k in text for k in ["diet", "diyet", "light", "fit"])),
+        "sugar_free": any(k in text for k in ["sugar-free", "sekersiz", "no sugar"]),
+    }
+    if re.search(r"\b(coffee|kahve|espresso|latte|americano|cappuccino)\b", text): intent["categories"].append("coffee")
+    if re.search(r"\b(tea|cay|çay|matcha)\b", text): intent["categories"].append("tea")
+    if re.search(r"\b(dessert|sweet|tatli|cake|kek|pastry|cookie)\b", text): intent["categories"].append("sweet")
+    if re.search(r"\b(cold|iced|soguk|lemonade|milkshake|smoothie)\b", text): intent["categories"].append("cold")
+    if not intent["categories"]:
+        intent["categories"] = ["coffee", "tea", "cold", "sweet"]
+    is_negation = any(k in atext for k in ["siz", "suz", "olmasin", "yok"]) or any(k in text for k in ["no ", "without", "free", "not "])
+    is_allergy = (ai_label == "allergy") or ("alerji" in atext or "allergy" in text)
+    if is_negation or is_allergy:
+        if "fruit" in text or "meyve" in atext:
+            intent["exclude_labels"].extend(FRUIT_LABELS)
+        for tr_root, en_label in FRUIT_TR_MAP.items():
+            if tr_root in atext:
+                intent["exclude_labels"].append(en_label)
+        if any(k in atext for k in ["nuts", "nut", "kuruyemis", "peanut"]):
+            intent["exclude_labels"].extend(NUT_LABELS)
+        if any(k in atext for k in ["milk", "sut", "dairy", "laktoz"]):
+            intent["exclude_labels"].append("milk")
+    intent["exclude_labels"] = list(set(intent["exclude_labels"]))
+    return intent
+
+
+def _same(old, new):
+    keys = ["categories", "vegan", "low_calorie", "sugar_free"]
+    return all(old[k] == new[k] for k in keys) and sorted(old["exclude_labels"]) == sorted(new["exclude_labels"])
+
+
+def main(sizes):
+    for msg, new in zip(MESSAGES, analyze_batch(MESSAGES)):
+        assert _same(legacy_analyze_text(msg), new), msg
+
+    rng = random.Random(3)
+    print(f"{'batch':>6} {'legacy msg/s':>13} {'batch msg/s':>12} {'speedup':>8}")
+    for n in sizes:
+        texts = [rng.choice(MESSAGES) for _ in range(n)]
+        repeat = max(1, 2048 // n)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for t in texts:
+                legacy_analyze_text(t)
+        old = n * repeat / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            analyze_batch(texts)
+        new = n * repeat / (time.perf_counter() - start)
+        print(f"{n:>6} {old:>13.0f} {new:>12.0f} {new / old:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,61 @@
+"""
+Benchmark: image bytes a menu visitor downloads, originals vs. the resized
+WebP variants from images.py, for the products in a database (default: the
+bundled cafe.db). Variants are written to a temporary folder; nothing in
+static/ is touched.
+
+Usage (from the backend folder):
+    python -m bench.bench_page_weight [db_path]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import PAGE_SIZE
+from images import image_path, make_variants, VARIANT_WIDTHS
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cafe.db")
+
+
+def main(db_path):
+    conn = sqlite3.connect(db_path)
+    images = [row[0] for row in conn.execute("SELECT image FROM products WHERE image != '' ORDER BY id")]
+    conn.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        original = {w: 0 for w in VARIANT_WIDTHS}
+        resized = {w: 0 for w in VARIANT_WIDTHS}
+        first_page = {"original": 0, "resized": 0}
+        counted = 0
+        for i, image in enumerate(images):
+            path = image_path(image)
+            if path is None or not os.path.exists(path):
+                continue
+            variants = make_variants(path, dest_dir=tmp)
+            if not variants:
+                print("Pillow is required for this benchmark")
+                return
+            size = os.path.getsize(path)
+            counted += 1
+            for w in VARIANT_WIDTHS:
+                original[w] += size
+                resized[w] += os.path.getsize(os.path.join(tmp, os.path.basename(variants[str(w)])))
+            if i < PAGE_SIZE:
+                first_page["original"] += size
+                first_page["resized"] += os.path.getsize(
+                    os.path.join(tmp, os.path.basename(variants[str(VARIANT_WIDTHS[0])])))
+
+    print(f"{counted} product images found")
+    print(f"{'view':<28} {'original KB':>12} {'resized KB':>11} {'saved':>7}")
+    rows = [(f"first page ({PAGE_SIZE}), 1x", first_page["original"], first_page["resized"])]
+    rows += [(f"whole menu, {w}px variant", original[w], resized[w]) for w in VARIANT_WIDTHS]
+    for label, before, after in rows:
+        saved = 1 - after / before if before else 0
+        print(f"{label:<28} {before / 1024:>12.0f} {after / 1024:>11.0f} {saved:>7.0%}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB)
@@ -0,0 +1,68 @@
+"""
+Benchmark: GET /api/products full catalog vs. filtered keyset pages, for
+growing synthetic catalogs. The page rows should stay flat in size and latency
+however many products there are, and however deep the cursor goes.
+
+Usage (from the backend folder):
+    python -m bench.bench_products_page [sizes...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.synthetic import create_catalog_db
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+REPEAT = 50
+
+
+def _request(client, url):
+    """Median latency (ms) and body size of a URL, plus the last JSON body."""
+    times, resp = [], None
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        resp = client.get(url)
+        times.append(time.perf_counter() - started)
+    times.sort()
+    return times[len(times) // 2] * 1000, len(resp.data), resp.get_json()
+
+
+def main(sizes):
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = []
+        for n in sizes:
+            path = create_catalog_db(os.path.join(tmp, f"catalog_{n}.db"), n)
+            # Fresh app per catalog: its modules read CAFE_DB_PATH at import
+            os.environ["CAFE_DB_PATH"] = path
+            for name in [m for m in sys.modules if m in ("app", "db", "catalog", "metrics")]:
+                del sys.modules[name]
+            import app
+            client = app.app.test_client()
+            client.get("/api/products")  # build the cached full payload once
+
+            deep = client.get(f"/api/products?cursor={n - 100}&limit=24").get_json()
+            assert deep["items"], "deep cursor returned nothing"
+            cases = [
+                ("full catalog", "/api/products"),
+                ("page 1", "/api/products?limit=24"),
+                ("deep page", f"/api/products?cursor={n - 100}&limit=24"),
+                ("category", "/api/products?category=Coffee&limit=24"),
+                ("category+labels", "/api/products?category=Tea&labels=Vegan&exclude_labels=Nuts&limit=24"),
+                ("price range", "/api/products?min_price=100&max_price=120&limit=24"),
+                ("search", "/api/products?q=item&category=Desserts&limit=24"),
+            ]
+            for label, url in cases:
+                # Vary the query string so ETag revalidation cannot short-circuit the page
+                ms, size, _ = _request(client, url)
+                rows.append((n, label, ms, size))
+
+        print(f"{'products':>9} {'request':<16} {'median ms':>10} {'bytes':>10}")
+        for n, label, ms, size in rows:
+            print(f"{n:>9} {label:<16} {ms:>10.3f} {size:>10}")
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,60 @@
+"""
+Benchmark: size and build time of the chatbot system prompt, comparing the
+original json.dumps of every product column with the compact cached builder.
+
+Usage (from the backend folder):
+    python -m bench.bench_prompt [sizes...]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.prompt import PromptBuilder, estimate_tokens
+from bench.synthetic import CATEGORIES, LABELS
+
+DEFAULT_SIZES = [30, 300, 1000, 5000]
+MESSAGE = "vegan coffee without nuts please"
+
+
+def synthetic_products(n):
+    """In-memory catalog shaped like load_catalog() output."""
+    return [{
+        "id": i, "name": f"{CATEGORIES[i % 4]} Item {i}", "price": 40.0 + i % 160,
+        "category": CATEGORIES[i % 4], "description": f"Synthetic {CATEGORIES[i % 4].lower()} product number {i}.",
+        "image": f"/static/images/uploads/{i}_item.jpg", "labels": [LABELS[i % 16], LABELS[(i * 7) % 16]],
+    } for i in range(1, n + 1)]
+
+
+def legacy_prompt(products):
+    """Menu part of the original prompt: every column of every product."""
+    return json.dumps(products, ensure_ascii=False)
+
+
+def _ms(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main(sizes):
+    print(f"{'products':>9} {'json bytes':>11} {'json ms':>8} {'new bytes':>10} {'~tokens':>8} {'cold ms':>8} {'cached ms':>10}")
+    for n in sizes:
+        products = synthetic_products(n)
+        old_ms = _ms(lambda: legacy_prompt(products))
+        old_bytes = len(legacy_prompt(products).encode())
+
+        cold_ms = _ms(lambda: PromptBuilder().build(1, products, MESSAGE))
+        builder = PromptBuilder()
+        prompt = builder.build(1, products, MESSAGE)
+        cached_ms = _ms(lambda: builder.build(1, products, MESSAGE), repeat=50)
+        print(f"{n:>9} {old_bytes:>11} {old_ms:>8.2f} {len(prompt.encode()):>10} {estimate_tokens(prompt):>8} {cold_ms:>8.2f} {cached_ms:>10.4f}")
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,79 @@
+"""
+Benchmark: the original linear get_recommendation() scan vs. the bitset
+FilterIndex, on a large synthetic catalog.
+
+Usage (from the backend folder):
+    python -m bench.bench_recommendation [products]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.ingredients import expand
+from ai.recommendation import FilterIndex, to_ai_category
+from bench.synthetic import CATEGORIES, LABELS
+
+INTENTS = [
+    {"categories": ["coffee"], "exclude_labels": [], "vegan": True},
+    {"categories": ["coffee", "tea", "cold", "sweet"], "exclude_labels": ["nuts", "almond", "peanut"]},
+    {"categories": ["sweet"], "exclude_labels": ["milk"], "sugar_free": True, "low_calorie": True},
+    {"categories": ["tea"], "exclude_labels": ["lemon", "orange"], "vegan": True, "sugar_free": True},
+]
+
+
+def linear_recommendation(intent, products):
+    """The original implementation, kept as the baseline (exclusions pre-expanded by the allergen closure)."""
+    recommendations = []
+    exclude_list = [x.replace("_", " ") for x in expand(intent.get("exclude_labels", []))]
+    target_categories = intent.get('categories', [])
+    for p in products:
+        ai_cat = to_ai_category(p.get('category', ""))
+        if target_categories and (ai_cat not in target_categories):
+            continue
+        product_labels = [l.lower() for l in p.get('labels', [])]
+        if any(forbidden in product_labels for forbidden in exclude_list):
+            continue
+        if intent.get("vegan") and "vegan" not in product_labels:
+            continue
+        if intent.get("sugar_free"):
+            if "sugar free" not in product_labels and "sekersiz" not in product_labels:
+                continue
+        if intent.get("low_calorie") and "low calorie" not in product_labels:
+            continue
+        recommendations.append(p)
+    return recommendations[:5]
+
+
+def synthetic_products(n, seed=7):
+    rng = random.Random(seed)
+    return [{"id": i, "name": f"Item {i}", "category": rng.choice(CATEGORIES), "price": 50.0,
+             "labels": rng.sample(LABELS, 4)} for i in range(1, n + 1)]
+
+
+def _us(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6
+
+
+def main(n):
+    products = synthetic_products(n)
+    start = time.perf_counter()
+    index = FilterIndex(products)
+    print(f"{n} products, index build {(time.perf_counter() - start) * 1000:.1f} ms")
+    print(f"{'intent':>6} {'matches':>8} {'linear (us)':>12} {'index (us)':>11} {'speedup':>8}")
+    for i, intent in enumerate(INTENTS):
+        assert index.top_k(intent, 5) == linear_recommendation(intent, products)
+        old = _us(lambda: linear_recommendation(intent, products), 3)
+        new = _us(lambda: index.top_k(intent, 5), 50)
+        print(f"{i:>6} {index.count(intent):>8} {old:>12.1f} {new:>11.1f} {old / new:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,53 @@
+"""
+Benchmark: online retraining cost as the intent log grows. Appends one batch
+of synthetic labelled messages per round and times train_increment(); the
+cost should stay flat because only the new lines are read and fitted.
+
+Usage (from the backend folder):
+    python -m bench.bench_retrain [rounds] [batch]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.model_registry import ModelRegistry
+from ai.nlp_model import analyze_batch
+from ai.online_training import IntentLog, train_increment
+
+TEMPLATES = [
+    "{cat} without {item} please", "i am allergic to {item}, any {cat}?", "vegan {cat} options",
+    "something vegan and {cat}", "light {cat} for my diet", "sugar-free {cat}", "{item} alerjim var",
+    "diyet {cat} öner", "no {item} in my {cat}", "low calorie {cat} please",
+]
+CATS = ["coffee", "tea", "dessert", "iced latte", "cake", "smoothie", "matcha", "cookie"]
+ITEMS = ["nuts", "milk", "strawberry", "banana", "peanut", "fruit", "almond"]
+
+
+def synthetic_messages(n: int, rng: random.Random) -> list:
+    return [rng.choice(TEMPLATES).format(cat=rng.choice(CATS), item=rng.choice(ITEMS)) for _ in range(n)]
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    batch = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        log = IntentLog(os.path.join(tmp, "intent_log.jsonl"))
+        registry = ModelRegistry(os.path.join(tmp, "models"), keep=3)
+        print(f"{'round':>5} {'log lines':>10} {'train ms':>9}")
+        for r in range(1, rounds + 1):
+            messages = synthetic_messages(batch, rng)
+            logged = sum(log.record(m, intent) for m, intent in zip(messages, analyze_batch(messages)))
+            started = time.perf_counter()
+            train_increment(log, registry, batch)
+            elapsed = (time.perf_counter() - started) * 1000
+            lines = registry.meta(registry.current())["samples_total"]
+            print(f"{r:>5} {lines:>10} {elapsed:>9.1f}   (+{logged} logged)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark: building the item-item similarity table, and answering "similar
+to X" from it vs. scoring X against the whole catalog on every request.
+
+Usage (from the backend folder):
+    python -m bench.bench_similarity [sizes...]
+"""
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.ingredients import IngredientIndex
+from ai.similarity import SimilarityIndex, SIMILAR_BLOCK_ROWS, feature_matrix
+from bench.synthetic import CATEGORIES, LABELS
+
+DEFAULT_SIZES = [1000, 10000, 50000]
+WORDS = ["creamy", "light", "bold", "fresh", "iced", "warm", "sweet", "bitter", "fruity", "rich",
+         "smooth", "foam", "espresso", "steamed", "milk", "syrup", "vanilla", "caramel", "mint", "spice"]
+LOOKUPS = 200
+
+
+def synthetic_products(n, seed=7):
+    rng = random.Random(seed)
+    return [{"id": i, "name": f"Item {i}", "category": rng.choice(CATEGORIES), "price": rng.uniform(40, 200),
+             "description": " ".join(rng.sample(WORDS, 6)), "labels": rng.sample(LABELS, 3)}
+            for i in range(1, n + 1)]
+
+
+def brute_force(X, i, k):
+    """Per-request scoring: one row against every product, then a partition."""
+    scores = X @ X[i]
+    scores[i] = -np.inf
+    top = np.argpartition(-scores, k)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def main(sizes):
+    print(f"{'products':>9} {'build (s)':>10} {'block MB':>9} {'per-request (us)':>17} {'table (us)':>11}")
+    for n in sizes:
+        products = synthetic_products(n)
+        ingredients = IngredientIndex(products)
+        start = time.perf_counter()
+        index = SimilarityIndex(products, ingredients)
+        build = time.perf_counter() - start
+
+        X = feature_matrix(products, ingredients)
+        # The table must agree with scoring everything (scores; ties may swap order)
+        for i in range(0, n, max(1, n // 20)):
+            expected = X[brute_force(X, i, index.k)] @ X[i]
+            assert np.allclose(index.scores[i], expected, atol=1e-5), f"row {i} differs"
+
+        ids = [products[i]["id"] for i in random.Random(1).sample(range(n), LOOKUPS)]
+        start = time.perf_counter()
+        for product_id in ids:
+            brute_force(X, index.position[product_id], 5)
+        scan = (time.perf_counter() - start) / LOOKUPS
+        start = time.perf_counter()
+        for product_id in ids:
+            index.similar(product_id, 5, exclude=["milk"], diet=["vegan"])
+        table = (time.perf_counter() - start) / LOOKUPS
+
+        block_mb = SIMILAR_BLOCK_ROWS * n * 4 / 1e6
+        print(f"{n:>9} {build:>10.2f} {block_mb:>9.1f} {scan * 1e6:>17.1f} {table * 1e6:>11.1f}")
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or DEFAULT_SIZES)
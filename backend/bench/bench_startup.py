@@ -0,0 +1,62 @@
+"""
+Benchmark: intent model startup cost. Each scenario runs in a fresh Python
+process and reports import time, time to the first classified message and
+peak RSS, for the sklearn pickle vs. the compact NumPy artifact.
+
+Usage (from the backend folder):
+    python -m bench.bench_startup [runs]
+"""
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, resource, sys, time, warnings
+warnings.simplefilter("ignore")
+sys.path.insert(0, ".")
+t0 = time.perf_counter()
+from ai import nlp_model
+t1 = time.perf_counter()
+first = None
+if sys.argv[1] != "import-only":
+    nlp_model.analyze_text("vegan coffee please")
+    first = time.perf_counter() - t1
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "first_inference_ms": first * 1000 if first is not None else None,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "sklearn_loaded": "sklearn" in sys.modules,
+}))
+"""
+
+SCENARIOS = [
+    ("import-only", "auto"),
+    ("sklearn", "sklearn"),
+    ("compact", "compact"),
+]
+
+
+def run(scenario: str, model_format: str) -> dict:
+    env = dict(os.environ, NLP_MODEL_FORMAT=model_format)
+    out = subprocess.run([sys.executable, "-c", CHILD, scenario], cwd=BACKEND_DIR, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'scenario':<12} {'import ms':>10} {'first msg ms':>13} {'max RSS MB':>11}  sklearn")
+    for scenario, model_format in SCENARIOS:
+        results = [run(scenario, model_format) for _ in range(runs)]
+        import_ms = sorted(r["import_ms"] for r in results)[runs // 2]
+        firsts = [r["first_inference_ms"] for r in results if r["first_inference_ms"] is not None]
+        first = f"{sorted(firsts)[len(firsts) // 2]:.1f}" if firsts else "-"
+        rss = max(r["max_rss_mb"] for r in results)
+        print(f"{scenario:<12} {import_ms:>10.1f} {first:>13} {rss:>11.1f}  {results[0]['sklearn_loaded']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Minimal stand-in for the OpenAI chat completions API, for tests and load runs.
+
+It answers POST /v1/chat/completions after a configurable delay with a canned
+chatbot reply, either as one JSON body or, for "stream": true, as
+Server-Sent Event chunks. Point the app at it with:
+
+    python -m bench.fake_openai --port 8089 --latency 0.8
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=test python app.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_CONTENT = json.dumps({
+    "reply": "Here are a few favourites from our menu you might enjoy!",
+    "recommendations": {"coffee": [1, 2], "tea": [], "cold": [], "sweet": []},
+})
+
+
+# Characters per streamed chunk and delay between chunks (simulated generation speed)
+STREAM_CHUNK_CHARS = 8
+STREAM_CHUNK_DELAY = 0.02
+
+
+def make_handler(latency: float, fail_every: int = 0, fail_status: int = 500):
+    """Build a request handler class bound to the given latency and failure rate."""
+    state = {"calls": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                return self._send_json(404, {"error": {"message": "not found"}})
+
+            with lock:
+                state["calls"] += 1
+                failing = fail_every and state["calls"] % fail_every == 0
+            time.sleep(latency)
+            if failing:
+                kind = "rate_limit_exceeded" if fail_status == 429 else "server_error"
+                return self._send_json(fail_status, {"error": {"message": "stub failure", "type": kind}})
+
+            if request.get("stream"):
+                try:
+                    return self._stream(request)
+                except (BrokenPipeError, ConnectionResetError):
+                    return  # the client gave up (timeout) or closed the stream early
+
+            prompt_chars = sum(len(m.get("content", "")) for m in request.get("messages", []))
+            self._send_json(200, {
+                "id": f"chatcmpl-stub-{state['calls']}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "stub"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": CANNED_CONTENT}}],
+                "usage": {"prompt_tokens": prompt_chars // 4, "completion_tokens": len(CANNED_CONTENT) // 4,
+                          "total_tokens": (prompt_chars + len(CANNED_CONTENT)) // 4},
+            })
+
+        def _stream(self, request):
+            # Unknown length: stream until the connection closes, like the real API
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            base = {"id": "chatcmpl-stub-stream", "object": "chat.completion.chunk",
+                    "created": int(time.time()), "model": request.get("model", "stub")}
+            for i in range(0, len(CANNED_CONTENT), STREAM_CHUNK_CHARS):
+                piece = CANNED_CONTENT[i:i + STREAM_CHUNK_CHARS]
+                chunk = dict(base, choices=[{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(STREAM_CHUNK_DELAY)
+            done = dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            self.wfile.write(f"data: {json.dumps(done)}\n\n".encode())
+            if (request.get("stream_options") or {}).get("include_usage"):
+                prompt_chars = sum(len(m.get("content", "")) for m in request.get("messages", []))
+                usage = dict(base, choices=[], usage={"prompt_tokens": prompt_chars // 4,
+                                                      "completion_tokens": len(CANNED_CONTENT) // 4,
+                                                      "total_tokens": (prompt_chars + len(CANNED_CONTENT)) // 4})
+                self.wfile.write(f"data: {json.dumps(usage)}\n\n".encode())
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+    # Calls answered so far, for tests: server.RequestHandlerClass.state["calls"]
+    Handler.state = state
+    return Handler
+
+
+def start_server(port: int = 0, latency: float = 0.5, fail_every: int = 0,
+                 fail_status: int = 500) -> ThreadingHTTPServer:
+    """Start the stub in a background thread; returns the server (see server.server_address)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency, fail_every, fail_status))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before each response")
+    parser.add_argument("--fail-every", type=int, default=0, help="answer every Nth call with an error")
+    parser.add_argument("--fail-status", type=int, default=500, help="HTTP status of those errors (e.g. 429)")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port),
+                                 make_handler(args.latency, args.fail_every, args.fail_status))
+    print(f"Fake OpenAI API on http://127.0.0.1:{args.port}/v1 (latency {args.latency}s)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""
+Load test: every route in app.py against a synthetic catalog in a temp
+database, through the Flask test client (in-process) and/or a real gunicorn
+with N workers. The OpenAI call goes to bench/fake_openai.py at a configurable
+latency. Reports throughput and p50/p95/p99 per endpoint and writes them to a
+JSON file; --compare prints the change against an earlier run.
+
+Usage (from the backend folder):
+    python -m bench.load_test [--target testclient|gunicorn|both] [--products 1000]
+                              [--requests 200] [--llm-requests 40] [--concurrency 8]
+                              [--workers 4] [--threads 4] [--llm-latency 0.3]
+                              [--output bench_results.json] [--compare old.json]
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bench.fake_openai import start_server
+from bench.synthetic import add_branches, add_notifications, create_catalog_db
+
+ADMIN_KEY = "1234"
+N_NOTIFICATIONS = 2000
+# Synthetic messages are spread over this many days, so archiving by age has work to do
+NOTIFICATION_DAYS = 60
+# Branches in the synthetic database, their overrides spread over BRANCH_SHARDS shard files
+N_BRANCHES = 20
+BRANCH_SHARDS = 2
+
+
+# -----------------------
+# SCENARIOS
+# -----------------------
+# name -> (method, path, form, json body, headers) for the i-th request.
+# Reads come first; writes and deletes run last so earlier results see the full catalog.
+def scenarios(products: int, etag: str, names: list) -> list:
+    k = ADMIN_KEY
+    branch = lambda i: f"branch-{i % N_BRANCHES + 1}"
+    product_form = {"key": k, "name": "Bench Latte", "price": "99", "category": "Coffee",
+                    "description": "Load test product", "labels": "Vegan"}
+    return [
+        ("GET /", False, lambda i: ("GET", "/", None, None, {})),
+        ("GET /menu", False, lambda i: ("GET", "/menu", None, None, {})),
+        ("GET /api/products", False, lambda i: ("GET", "/api/products", None, None, {})),
+        ("GET /api/products (gzip)", False,
+         lambda i: ("GET", "/api/products", None, None, {"Accept-Encoding": "gzip"})),
+        ("GET /api/products (304)", False,
+         lambda i: ("GET", "/api/products", None, None, {"If-None-Match": etag})),
+        ("GET /api/products?category&limit", False,
+         lambda i: ("GET", "/api/products?category=Coffee&labels=Vegan&limit=24", None, None, {})),
+        ("GET /api/products?category&cursor", False,
+         lambda i: ("GET", f"/api/products?category=Tea&cursor={(i * 37) % products}&limit=24", None, None, {})),
+        ("GET /api/products?q&price", False,
+         lambda i: ("GET", "/api/products?q=item&min_price=60&max_price=120&limit=24", None, None, {})),
+        ("GET /api/products/<id>/similar", False,
+         lambda i: ("GET", f"/api/products/{i % products + 1}/similar?limit=5&exclude_labels=Milk", None, None, {})),
+        ("GET /api/products?branch", False, lambda i: ("GET", f"/api/products?branch={branch(i)}", None, None, {})),
+        ("GET /api/products?branch&category", False,
+         lambda i: ("GET", f"/api/products?branch={branch(i)}&category=Tea&limit=24", None, None, {})),
+        ("GET /menu?branch", False, lambda i: ("GET", f"/menu?branch={branch(i)}", None, None, {})),
+        ("GET /contact", False, lambda i: ("GET", "/contact", None, None, {})),
+        ("POST /api/rum", False,
+         lambda i: ("POST", "/api/rum", None, {"page": "menu", "fcp": 400 + i % 900, "ttfb": 40 + i % 200}, {})),
+        ("POST /api/ai-suggest (local)", True,
+         lambda i: ("POST", "/api/ai-suggest", None, {"message": "vegan coffee please"}, {})),
+        ("POST /api/ai-suggest (similar)", True,
+         lambda i: ("POST", "/api/ai-suggest", None,
+                    {"message": f"something like the {names[i % len(names)]} but without nuts"}, {})),
+        ("POST /api/ai-suggest (branch)", True,
+         lambda i: ("POST", "/api/ai-suggest", None, {"message": "vegan coffee please", "branch": branch(i)}, {})),
+        ("POST /api/ai-suggest (llm)", True,
+         lambda i: ("POST", "/api/ai-suggest", None, {"message": f"what goes with a rainy afternoon {i}"}, {})),
+        ("POST /api/ai-suggest (stream)", True,
+         lambda i: ("POST", "/api/ai-suggest", None,
+                    {"message": f"surprise me with something {i}", "stream": True}, {})),
+        ("GET /admin", False, lambda i: ("GET", f"/admin?key={k}", None, None, {})),
+        ("GET /admin (archived page)", False,
+         lambda i: ("GET", f"/admin?key={k}&notif_view=archived&notif_before={N_NOTIFICATIONS - i % 100}",
+                    None, None, {})),
+        ("GET /admin/products/new", False, lambda i: ("GET", f"/admin/products/new?key={k}", None, None, {})),
+        ("GET /admin/products/edit/<id>", False,
+         lambda i: ("GET", f"/admin/products/edit/{i % products + 1}?key={k}", None, None, {})),
+        ("GET /admin/branches", False, lambda i: ("GET", f"/admin/branches?key={k}", None, None, {})),
+        ("GET /admin/ai-stats", False, lambda i: ("GET", f"/admin/ai-stats?key={k}", None, None, {})),
+        ("GET /admin/metrics", False, lambda i: ("GET", f"/admin/metrics?key={k}", None, None, {})),
+        ("POST /contact", False,
+         lambda i: ("POST", "/contact", {"name": f"Guest {i}", "email": "g@example.com",
+                                         "category": "Feedback", "message": "Load test"}, None, {})),
+        ("POST /admin/products/create", False,
+         lambda i: ("POST", "/admin/products/create", product_form, None, {})),
+        ("POST /admin/products/update/<id>", False,
+         lambda i: ("POST", f"/admin/products/update/{i % products + 1}", product_form, None, {})),
+        ("POST /admin/add_label", False,
+         lambda i: ("POST", f"/admin/add_label?key={k}", {"label_name": f"Bench {i}"}, None, {})),
+        ("POST /admin/delete_label/<id>", False,
+         lambda i: ("POST", f"/admin/delete_label/{100000 + i}?key={k}", {}, None, {})),
+        ("POST /admin/products/import", False,
+         lambda i: ("POST", f"/admin/products/import?key={k}", {"source": "menu"}, None, {})),
+        ("POST /admin/branches/create", False,
+         lambda i: ("POST", f"/admin/branches/create?key={k}", {"slug": f"bench-{i}", "name": f"Bench {i}"}, None, {})),
+        ("POST /admin/branches/<slug>/override", False,
+         lambda i: ("POST", f"/admin/branches/{branch(i)}/override?key={k}",
+                    {"product_id": str(i % products + 1), "price": str(50 + i % 100), "available": "1"}, None, {})),
+        ("POST /admin/branches/<slug>/delete", False,
+         lambda i: ("POST", f"/admin/branches/bench-{i}/delete?key={k}", {}, None, {})),
+        ("POST /admin/notifications/resolve/<id>", False,
+         lambda i: ("POST", f"/admin/notifications/resolve/{i % N_NOTIFICATIONS + 1}?key={k}", {}, None, {})),
+        ("POST /admin/notifications/archive", False,
+         lambda i: ("POST", f"/admin/notifications/archive?key={k}&days={max(1, NOTIFICATION_DAYS - i)}",
+                    {}, None, {})),
+        ("POST /admin/products/delete/<id>", False,
+         lambda i: ("POST", f"/admin/products/delete/{products - i}?key={k}", {}, None, {})),
+    ]
+
+
+# -----------------------
+# TARGETS
+# -----------------------
+class TestClientTarget:
+    """In-process Flask test client: app cost only, no sockets or HTTP parsing."""
+    name = "testclient"
+
+    def __init__(self):
+        import app as app_module
+        self.app = app_module.app
+        self._local = threading.local()
+
+    def request(self, method, path, form, body, headers):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        resp = client.open(path, method=method, data=form, json=body, headers=headers)
+        resp.get_data()  # drain streamed bodies
+        return resp.status_code, resp.headers.get("ETag")
+
+    def close(self):
+        pass
+
+
+class HTTPTarget:
+    """Real gunicorn server on a free local port."""
+    name = "gunicorn"
+
+    def __init__(self, workers: int, threads: int, env: dict):
+        self.port = _free_port()
+        worker_class = "gthread" if threads > 1 else "sync"
+        cmd = [sys.executable, "-m", "gunicorn", "--chdir", BACKEND_DIR, "-w", str(workers), "-k", worker_class,
+               "--threads", str(threads), "-b", f"127.0.0.1:{self.port}", "--log-level", "warning", "app:app"]
+        self.proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL)
+        deadline = time.time() + 30
+        while time.time() < deadline and self.proc.poll() is None:
+            try:
+                if self.request("GET", "/", None, None, {})[0] == 200:
+                    return
+            except OSError:
+                time.sleep(0.2)
+        self.close()
+        raise RuntimeError("gunicorn did not start (see its output above)")
+
+    def request(self, method, path, form, body, headers):
+        headers = dict(headers)
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        elif form is not None:
+            payload = urlencode(form).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+        try:
+            conn.request(method, path, body=payload, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            return resp.status, resp.getheader("ETag")
+        finally:
+            conn.close()
+
+    def close(self):
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+
+def _product_names(db_path: str, limit: int = 50) -> list:
+    """A few product names, for chat messages that name a product."""
+    conn = sqlite3.connect(db_path)
+    names = [row[0] for row in conn.execute("SELECT name FROM products ORDER BY id LIMIT ?", (limit,))]
+    conn.close()
+    return names
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# -----------------------
+# RUNNER
+# -----------------------
+def _percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def run_endpoint(target, make_request, n: int, concurrency: int) -> dict:
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+
+    def one(i):
+        started = time.perf_counter()
+        try:
+            status = target.request(*make_request(i))[0]
+        except Exception:
+            status = "error"
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    wall = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, range(n)))
+    wall = time.perf_counter() - wall
+
+    latencies.sort()
+    errors = sum(c for s, c in statuses.items() if s == "error" or int(s) >= 400)
+    return {
+        "requests": n,
+        "errors": errors,
+        "status": statuses,
+        "throughput_rps": round(n / wall, 1),
+        "mean_ms": round(sum(latencies) / n * 1000, 3),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+    }
+
+
+def run_target(target, args, names: list) -> dict:
+    etag = target.request("GET", "/api/products", None, None, {})[1] or ""
+    results = {}
+    print(f"\n[{target.name}] {'endpoint':<42} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    for name, uses_llm, make_request in scenarios(args.products, etag, names):
+        n = args.llm_requests if uses_llm else args.requests
+        # Warm caches and lazy imports so the first sample is not an outlier
+        target.request(*make_request(n + 1))
+        r = results[name] = run_endpoint(target, make_request, n, args.concurrency)
+        print(f"[{target.name}] {name:<42} {r['throughput_rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} "
+              f"{r['p99_ms']:>8} {r['errors']:>6}")
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(current: dict, path: str) -> None:
+    with open(path, encoding="utf-8") as f:
+        previous = json.load(f)
+    print(f"\nChange vs {path} (commit {previous['meta'].get('commit') or '?'}), p50 / p95:")
+    for target, results in current["results"].items():
+        old_results = previous["results"].get(target, {})
+        for name, r in results.items():
+            old = old_results.get(name)
+            if old:
+                d50 = (r["p50_ms"] / old["p50_ms"] - 1) * 100 if old["p50_ms"] else 0.0
+                d95 = (r["p95_ms"] / old["p95_ms"] - 1) * 100 if old["p95_ms"] else 0.0
+                print(f"[{target}] {name:<42} {d50:>+7.1f}% {d95:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["testclient", "gunicorn", "both"], default="testclient")
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--llm-requests", type=int, default=40, help="requests per chatbot endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="fake OpenAI latency in seconds")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+    args = parser.parse_args()
+
+    fake = start_server(latency=args.llm_latency)
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   OPENAI_BASE_URL=f"http://127.0.0.1:{fake.server_address[1]}/v1",
+                   OPENAI_API_KEY="bench", AI_INTENT_LOG="", AI_CACHE_DB="",
+                   NLP_MODEL_DIR=os.path.join(tmp, "models"),
+                   AI_LLM_MAX_CONCURRENCY=str(max(4, args.concurrency)),
+                   AI_LLM_MAX_QUEUE=str(args.concurrency * 2))
+        results = {"meta": {
+            "commit": _git_commit(), "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(), "products": args.products, "requests": args.requests,
+            "llm_requests": args.llm_requests, "concurrency": args.concurrency,
+            "llm_latency": args.llm_latency, "workers": args.workers, "threads": args.threads,
+        }, "results": {}}
+
+        targets = ["testclient", "gunicorn"] if args.target == "both" else [args.target]
+        for name in targets:
+            # Each target gets a fresh copy of the same synthetic catalog
+            db_path = create_catalog_db(os.path.join(tmp, f"{name}.db"), args.products)
+            add_notifications(db_path, N_NOTIFICATIONS, max_age_days=NOTIFICATION_DAYS)
+            add_branches(db_path, N_BRANCHES, shards=BRANCH_SHARDS)
+            env["CAFE_DB_PATH"] = db_path
+            if name == "testclient":
+                os.environ.update(env)
+                # Modules read CAFE_DB_PATH at import, and add_branches() has imported some already
+                for module in [m for m in sys.modules if m in ("app", "db", "catalog", "metrics", "branches")]:
+                    del sys.modules[module]
+                target = TestClientTarget()
+            else:
+                try:
+                    import gunicorn  # noqa: F401
+                except ImportError:
+                    print("\n[gunicorn] skipped: gunicorn is not installed")
+                    results["results"]["gunicorn"] = {}
+                    continue
+                target = HTTPTarget(args.workers, args.threads, env)
+            try:
+                results["results"][name] = run_target(target, args, _product_names(db_path))
+            finally:
+                target.close()
+    fake.shutdown()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
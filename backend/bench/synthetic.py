@@ -0,0 +1,83 @@
+import os
+import random
+import sqlite3
+import time
+
+from migrations import migrate
+
+# -----------------------
+# SYNTHETIC CATALOGS
+# -----------------------
+# Shared by the benchmark scripts to build throwaway databases of any size
+CATEGORIES = ["Coffee", "Tea", "Cold Drinks", "Desserts"]
+LABELS = [
+    "Vegan", "Sugar Free", "Low Calorie", "Milk", "Lactose", "Nuts", "Almond", "Peanut",
+    "Gluten", "Egg", "Chocolate", "Banana", "Strawberry", "Apple", "Lemon", "Orange",
+]
+
+
+def create_catalog_db(path: str, n_products: int, labels_per_product: int = 3, seed: int = 42) -> str:
+    """Create (or replace) a cafe database at 'path' holding n_products random products."""
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.executemany("INSERT INTO labels (name) VALUES (?)", [(l,) for l in LABELS])
+
+    products = []
+    for i in range(1, n_products + 1):
+        cat = rng.choice(CATEGORIES)
+        products.append((i, f"{cat} Item {i}", round(rng.uniform(40, 200), 1),
+                         f"Synthetic {cat.lower()} product number {i}.", "", cat))
+    conn.executemany("INSERT INTO products (id, name, price, description, image, category) VALUES (?, ?, ?, ?, ?, ?)", products)
+
+    label_ids = list(range(1, len(LABELS) + 1))
+    pairs = []
+    for i in range(1, n_products + 1):
+        for lid in rng.sample(label_ids, labels_per_product):
+            pairs.append((i, lid))
+    conn.executemany("INSERT INTO product_labels (product_id, label_id) VALUES (?, ?)", pairs)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def add_branches(path: str, n_branches: int, overrides_per_branch: int = 20, shards: int = 0, seed: int = 42) -> str:
+    """
+    Add n_branches branches to the database at 'path', each repricing or hiding
+    overrides_per_branch random products; with shards > 0 their overrides go to
+    that many shard files next to the database.
+    """
+    from branches import attach_shard, create_branch, find_branch, set_override
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    product_ids = [row[0] for row in conn.execute("SELECT id FROM products")]
+    for s in range(shards):
+        attach_shard(conn, f"s{s}", shard_dir=os.path.dirname(os.path.abspath(path)))
+    for i in range(1, n_branches + 1):
+        create_branch(conn, f"branch-{i}", f"Branch {i}", shard=f"s{i % shards}" if shards else None)
+        branch = find_branch(conn, f"branch-{i}")
+        for product_id in rng.sample(product_ids, min(overrides_per_branch, len(product_ids))):
+            hidden = rng.random() < 0.2
+            set_override(conn, branch, product_id, None if hidden else round(rng.uniform(40, 200), 1), not hidden)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def add_notifications(path: str, n: int, seed: int = 42, max_age_days: int = 0) -> str:
+    """Append n random contact messages to the database at 'path', aged up to max_age_days, oldest first."""
+    rng = random.Random(seed)
+    now = int(time.time())
+    ages = sorted((int(rng.uniform(0, max_age_days * 86400)) for _ in range(n)), reverse=True)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO notifications (full_name, email, category, message, created_at) VALUES (?, ?, ?, ?, ?)",
+        [(f"Guest {i}", f"guest{i}@example.com", rng.choice(["Feedback", "Complaint", "Reservation"]),
+          f"Synthetic message number {i}.", now - ages[i - 1]) for i in range(1, n + 1)],
+    )
+    conn.commit()
+    conn.close()
+    return path
@@ -0,0 +1,327 @@
+"""
+Branch catalogs: every branch serves the base menu with its own prices and
+availability, stored as per-branch overrides.
+
+A branch's merged menu is built once per (menu version, branch version) and
+kept in that branch's own cache, so a request costs the same however many
+branches exist. Overrides live in the main database, or in a shard file
+(branches-<shard>.db next to it) that is ATTACHed to a connection the first
+time one of its branches is read.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from catalog import CatalogPayload, FragmentCache, VERSION_CHECK_INTERVAL
+from db import DB_PATH
+
+# -----------------------
+# CONFIGURATION
+# -----------------------
+# Where shard files are created (defaults to the folder of the main database)
+SHARD_DIR = os.getenv("CAFE_SHARD_DIR", os.path.dirname(os.path.abspath(DB_PATH)))
+# New branches are spread over this many shard files; 0 keeps their overrides in the main database
+BRANCH_SHARDS = int(os.getenv("CAFE_BRANCH_SHARDS", "0"))
+# Shards attached per connection at once (SQLite allows 10 attached databases by default)
+MAX_ATTACHED_SHARDS = int(os.getenv("CAFE_MAX_ATTACHED_SHARDS", "8"))
+# Branch menus kept in memory per worker, least recently used dropped first
+BRANCH_CACHE_SIZE = int(os.getenv("BRANCH_CACHE_SIZE", "512"))
+
+SLUG = re.compile(r"^[a-z0-9][a-z0-9-]{0,63}$")
+SHARD_NAME = re.compile(r"^[A-Za-z0-9_]{1,32}$")
+
+BRANCH_SQL = "SELECT id, slug, name, shard, categories, version FROM branches WHERE slug = ?"
+OVERRIDES_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS {schema}.branch_overrides (
+        branch_id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL,
+        price REAL,
+        available INTEGER NOT NULL DEFAULT 1,
+        PRIMARY KEY (branch_id, product_id)
+    ) WITHOUT ROWID
+"""
+
+
+# -----------------------
+# SHARD FILES
+# -----------------------
+def shard_path(shard: str, shard_dir: str = SHARD_DIR) -> str:
+    return os.path.join(shard_dir, f"branches-{shard}.db")
+
+
+def attach_shard(conn, shard, shard_dir: str = SHARD_DIR) -> str:
+    """
+    Make the overrides table of `shard` reachable on this connection and return
+    its schema name ("main" for branches without a shard). Must be called
+    outside a transaction; the oldest attached shard is detached at the limit.
+    """
+    if not shard:
+        return "main"
+    if not SHARD_NAME.match(shard):
+        raise ValueError(f"Invalid shard name: {shard!r}")
+    schema = f"shard_{shard}"
+    attached = [row[1] for row in conn.execute("PRAGMA database_list")]
+    if schema in attached:
+        return schema
+    shards = [name for name in attached if name.startswith("shard_")]
+    if len(shards) >= MAX_ATTACHED_SHARDS:
+        conn.execute(f"DETACH DATABASE {shards[0]}")
+    conn.execute(f"ATTACH DATABASE ? AS {schema}", (shard_path(shard, shard_dir),))
+    conn.execute(f"PRAGMA {schema}.journal_mode = WAL")
+    conn.execute(f"PRAGMA {schema}.synchronous = NORMAL")
+    conn.execute(OVERRIDES_SCHEMA.format(schema=schema))
+    return schema
+
+
+# -----------------------
+# WRITES
+# -----------------------
+def create_branch(conn, slug: str, name: str, shard=None, categories=None) -> int:
+    """
+    Add a branch and return its id. Without an explicit shard, CAFE_BRANCH_SHARDS
+    picks one by id (the choice is stored, so changing the setting never moves a
+    branch). Raises ValueError for bad slugs or shard names. Caller commits.
+    """
+    if not SLUG.match(slug or ""):
+        raise ValueError("Branch slug must be lowercase letters, digits and dashes")
+    if shard and not SHARD_NAME.match(shard):
+        raise ValueError("Shard name must be letters, digits and underscores")
+    try:
+        cursor = conn.execute("INSERT INTO branches (slug, name, categories) VALUES (?, ?, ?)",
+                              (slug, name or slug, json.dumps(categories) if categories else None))
+    except sqlite3.IntegrityError:
+        raise ValueError(f"Branch {slug!r} already exists")
+    branch_id = cursor.lastrowid
+    if not shard and BRANCH_SHARDS > 0:
+        shard = f"s{branch_id % BRANCH_SHARDS}"
+    if shard:
+        conn.execute("UPDATE branches SET shard = ? WHERE id = ?", (shard, branch_id))
+    return branch_id
+
+
+def find_branch(conn, slug: str):
+    return conn.execute(BRANCH_SQL, (slug,)).fetchone()
+
+
+def set_override(conn, branch, product_id: int, price=None, available: bool = True) -> None:
+    """
+    Set one product's price (None keeps the base price) and availability in a
+    branch, then bump the branch version. `branch` is a branches row; attach its
+    shard (attach_shard) before the transaction starts. Caller commits.
+    """
+    schema = "main" if not branch["shard"] else f"shard_{branch['shard']}"
+    conn.execute(f"INSERT OR REPLACE INTO {schema}.branch_overrides (branch_id, product_id, price, available) "
+                 "VALUES (?, ?, ?, ?)", (branch["id"], product_id, price, 1 if available else 0))
+    bump_branch_version(conn, branch["id"])
+
+
+def clear_override(conn, branch, product_id: int) -> None:
+    """Back to the base menu for one product. Caller attaches the shard and commits."""
+    schema = "main" if not branch["shard"] else f"shard_{branch['shard']}"
+    conn.execute(f"DELETE FROM {schema}.branch_overrides WHERE branch_id = ? AND product_id = ?",
+                 (branch["id"], product_id))
+    bump_branch_version(conn, branch["id"])
+
+
+def delete_branch(conn, branch) -> None:
+    """Remove a branch and its overrides. Caller attaches the shard and commits."""
+    schema = "main" if not branch["shard"] else f"shard_{branch['shard']}"
+    conn.execute(f"DELETE FROM {schema}.branch_overrides WHERE branch_id = ?", (branch["id"],))
+    conn.execute("DELETE FROM branches WHERE id = ?", (branch["id"],))
+
+
+def bump_branch_version(conn, branch_id: int) -> None:
+    """Mark one branch's menu as changed. Call before commit(), like bump_menu_version()."""
+    conn.execute("UPDATE branches SET version = version + 1 WHERE id = ?", (branch_id,))
+
+
+# -----------------------
+# MERGED MENU
+# -----------------------
+class BranchMenu:
+    """
+    One branch's menu for a (menu version, branch version) pair; never mutated.
+    Products without overrides are the base menu's own dicts, so a branch costs
+    one list of references plus a copy of each repriced product.
+    """
+
+    def __init__(self, row, base_version: int, base_products: list, overrides: dict):
+        self.branch_id = row["id"]
+        self.slug = row["slug"]
+        self.name = row["name"]
+        self.shard = row["shard"]
+        self.categories = json.loads(row["categories"]) if row["categories"] else None
+        self.base_version = base_version
+        self.version = (base_version, row["version"])
+        # ETag/cache-key friendly form of the version
+        self.tag = f"{self.slug}-{base_version}.{row['version']}"
+
+        self.hidden = frozenset(pid for pid, (_, available) in overrides.items() if not available)
+        self.prices = {pid: price for pid, (price, available) in overrides.items()
+                       if available and price is not None}
+        self._repriced = {}
+        products = []
+        for p in base_products:
+            pid = p["id"]
+            if pid in self.hidden:
+                continue
+            if pid in self.prices:
+                p = self._repriced[pid] = dict(p, price=self.prices[pid])
+            products.append(p)
+        self.products = products
+        self._hidden_mask = None
+
+    def localize(self, products: list) -> list:
+        """Base-menu products as this branch sells them: unavailable ones dropped, prices swapped."""
+        return [self._repriced.get(p["id"], p) for p in products if p["id"] not in self.hidden]
+
+    def hidden_mask(self, index) -> int:
+        """Bitset of the hidden products in a FilterIndex of the same base menu (built once)."""
+        if self._hidden_mask is None:
+            self._hidden_mask = index.mask_for_ids(self.hidden)
+        return self._hidden_mask
+
+
+class BranchCatalog:
+    """
+    Per-branch cache with the CatalogCache interface (get, products, version,
+    payload, invalidate). The branch version row is re-read at most once per
+    check_interval; a base menu change is noticed through the base cache.
+    Also holds the branch's rendered fragments and helpers the app attaches.
+    """
+
+    def __init__(self, connect, base, slug: str, check_interval: float = VERSION_CHECK_INTERVAL):
+        self._connect = connect
+        self._base = base
+        self.slug = slug
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        self._menu = None
+        self._payload = None
+        self._next_check = 0.0
+        self.fragments = FragmentCache()
+        # Per-branch objects the app keeps alongside the menu (e.g. its PromptBuilder)
+        self.extras = {}
+
+    def menu(self):
+        """The current BranchMenu, or None once the branch has been deleted."""
+        base_version, base_products = self._base.get()
+        menu = self._menu
+        if menu is not None and menu.base_version == base_version and time.monotonic() < self._next_check:
+            return menu
+
+        with self._lock:
+            menu = self._menu
+            if menu is not None and menu.base_version == base_version and time.monotonic() < self._next_check:
+                return menu
+            conn = self._connect()
+            try:
+                # The version is read before the overrides: a write in between is caught on the next check
+                row = find_branch(conn, self.slug)
+                if row is None:
+                    self._menu = None
+                    return None
+                if menu is None or menu.version != (base_version, row["version"]):
+                    schema = attach_shard(conn, row["shard"])
+                    overrides = {pid: (price, available) for pid, price, available in conn.execute(
+                        f"SELECT product_id, price, available FROM {schema}.branch_overrides WHERE branch_id = ?",
+                        (row["id"],))}
+                    menu = BranchMenu(row, base_version, base_products, overrides)
+            finally:
+                conn.close()
+            self._menu = menu
+            self._next_check = time.monotonic() + self._check_interval
+            return menu
+
+    def get(self) -> tuple:
+        menu = self.menu()
+        return (menu.version, menu.products) if menu else (None, [])
+
+    def products(self) -> list:
+        return self.get()[1]
+
+    def version(self):
+        return self.get()[0]
+
+    def payload(self) -> CatalogPayload:
+        """The pre-encoded /api/products body for this branch's current menu."""
+        menu = self.menu()
+        payload = self._payload
+        if payload is None or payload.version != menu.tag:
+            payload = self._payload = CatalogPayload(menu.tag, menu.products)
+        return payload
+
+    def invalidate(self) -> None:
+        self._next_check = 0.0
+
+
+class BranchCatalogs:
+    """
+    Registry of BranchCatalog objects by slug, LRU-bounded to max_cached per
+    worker. Looking a branch up is a dict access; unknown slugs cost one
+    indexed query.
+    """
+
+    def __init__(self, connect, base, max_cached: int = BRANCH_CACHE_SIZE):
+        self._connect = connect
+        self._base = base
+        self._max_cached = max_cached
+        self._lock = threading.Lock()
+        self._catalogs = OrderedDict()
+
+    def get(self, slug: str):
+        """The BranchCatalog for slug, or None when no such branch exists."""
+        with self._lock:
+            catalog = self._catalogs.get(slug)
+            if catalog is not None:
+                self._catalogs.move_to_end(slug)
+                return catalog
+        conn = self._connect()
+        try:
+            exists = find_branch(conn, slug) is not None
+        finally:
+            conn.close()
+        if not exists:
+            return None
+        with self._lock:
+            catalog = self._catalogs.get(slug)
+            if catalog is None:
+                catalog = self._catalogs[slug] = BranchCatalog(self._connect, self._base, slug)
+                while len(self._catalogs) > self._max_cached:
+                    self._catalogs.popitem(last=False)
+            return catalog
+
+    def invalidate(self, slug: str = None) -> None:
+        """Re-check one branch (or every cached one) on its next read; deleted branches are dropped."""
+        with self._lock:
+            if slug is None:
+                for catalog in self._catalogs.values():
+                    catalog.invalidate()
+            elif slug in self._catalogs:
+                self._catalogs[slug].invalidate()
+
+    def forget(self, slug: str) -> None:
+        with self._lock:
+            self._catalogs.pop(slug, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"cached": len(self._catalogs), "max_cached": self._max_cached}
+
+
+def list_branches(conn) -> list:
+    """Every branch with its override count (admin views; one query per shard)."""
+    branches = [dict(row) for row in conn.execute(
+        "SELECT id, slug, name, shard, categories, version FROM branches ORDER BY slug")]
+    counts = {}
+    for shard in {b["shard"] for b in branches}:
+        schema = attach_shard(conn, shard)
+        counts.update(conn.execute(f"SELECT branch_id, COUNT(*) FROM {schema}.branch_overrides GROUP BY branch_id"))
+    for b in branches:
+        b["categories"] = json.loads(b["categories"]) if b["categories"] else None
+        b["overrides"] = counts.get(b["id"], 0)
+    return branches
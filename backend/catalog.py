@@ -0,0 +1,358 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# -----------------------
+# CATALOG QUERIES
+# -----------------------
+# The whole menu is read with two bulk queries instead of one label query per product
+PRODUCTS_SQL = "SELECT * FROM products ORDER BY id"
+PRODUCT_LABELS_SQL = """
+    SELECT pl.product_id, l.name
+    FROM product_labels pl JOIN labels l ON l.id = pl.label_id
+    ORDER BY pl.product_id, pl.label_id
+"""
+
+
+def product_dict(row) -> dict:
+    """A products row as a dict with an empty 'labels' list and decoded 'image_variants' ({} until generated)."""
+    p = dict(row)
+    p["labels"] = []
+    variants = p.get("image_variants")
+    p["image_variants"] = json.loads(variants) if variants else {}
+    return p
+
+
+def load_catalog(conn: sqlite3.Connection) -> list:
+    """
+    Build the full products-with-labels payload.
+    Products come back in id order, each with a 'labels' list of label names.
+    """
+    products = []
+    by_id = {}
+    for row in conn.execute(PRODUCTS_SQL):
+        p = product_dict(row)
+        products.append(p)
+        by_id[p["id"]] = p
+
+    # Group label rows in Python; orphaned associations are simply skipped
+    for product_id, label_name in conn.execute(PRODUCT_LABELS_SQL):
+        p = by_id.get(product_id)
+        if p is not None:
+            p["labels"].append(label_name)
+
+    return products
+
+
+def labels_by_product(products: list) -> dict:
+    """Map product id to its label names, as the admin templates expect."""
+    return {p["id"]: p["labels"] for p in products if p["labels"]}
+
+
+# -----------------------
+# FILTERED PAGES
+# -----------------------
+PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+SEARCH_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_query(text: str):
+    """Turn free text into an FTS5 query: every word must match as a prefix. None if no words."""
+    tokens = SEARCH_TOKEN.findall(text or "")
+    return " ".join(f'"{t}"*' for t in tokens) or None
+
+
+def query_products(conn: sqlite3.Connection, categories=(), labels=(), exclude_labels=(), min_price=None,
+                   max_price=None, search=None, after_id: int = 0, limit: int = PAGE_SIZE, overrides=None) -> tuple:
+    """
+    One page of products (with labels) matching every given filter, in id order.
+    Keyset pagination: pass the returned cursor (the last id) as after_id for the
+    next page, so each page costs the same however deep it is.
+    overrides=(schema, branch_id) applies one branch's prices and availability
+    (see branches.py; the schema's shard must already be attached).
+    Returns (products, next_cursor); next_cursor is None on the last page.
+    """
+    match = fts_query(search) if search else None
+    if match:
+        # Walk the full-text index in rowid order so LIMIT stops it early, even for common words
+        source, order = "products_fts JOIN products p ON p.id = products_fts.rowid", "products_fts.rowid"
+        where, params = ["products_fts MATCH ?", "products_fts.rowid > ?"], [match, after_id]
+    else:
+        source, order = "products p", "p.id"
+        where, params = ["p.id > ?"], [after_id]
+    columns, price = "p.*", "p.price"
+    if overrides:
+        # One primary-key lookup per row, whichever branch it is
+        schema, branch_id = overrides
+        source += f" LEFT JOIN {schema}.branch_overrides o ON o.branch_id = ? AND o.product_id = p.id"
+        params.insert(0, branch_id)
+        where.append("(o.available IS NULL OR o.available = 1)")
+        columns, price = "p.*, o.price AS branch_price", "COALESCE(o.price, p.price)"
+    if categories:
+        where.append(f"p.category IN ({','.join('?' * len(categories))})")
+        params.extend(categories)
+    if min_price is not None:
+        where.append(f"{price} >= ?")
+        params.append(min_price)
+    if max_price is not None:
+        where.append(f"{price} <= ?")
+        params.append(max_price)
+    if labels:
+        wanted = resolve_label_ids(conn, labels)
+        if len(wanted) < len(set(labels)):
+            return [], None  # an unknown label can never match
+        for label_id in wanted.values():
+            where.append("EXISTS (SELECT 1 FROM product_labels pl WHERE pl.product_id = p.id AND pl.label_id = ?)")
+            params.append(label_id)
+    if exclude_labels:
+        unwanted = list(resolve_label_ids(conn, exclude_labels).values())
+        if unwanted:
+            where.append("NOT EXISTS (SELECT 1 FROM product_labels pl WHERE pl.product_id = p.id "
+                         f"AND pl.label_id IN ({','.join('?' * len(unwanted))}))")
+            params.extend(unwanted)
+
+    # One extra row tells whether another page exists
+    rows = conn.execute(f"SELECT {columns} FROM {source} WHERE {' AND '.join(where)} ORDER BY {order} LIMIT ?",
+                        params + [limit + 1]).fetchall()
+    has_more = len(rows) > limit
+    products = [product_dict(r) for r in rows[:limit]]
+    if overrides:
+        for p in products:
+            branch_price = p.pop("branch_price")
+            if branch_price is not None:
+                p["price"] = branch_price
+    if products:
+        by_id = {p["id"]: p for p in products}
+        marks = ",".join("?" * len(by_id))
+        for product_id, label_name in conn.execute(
+                "SELECT pl.product_id, l.name FROM product_labels pl JOIN labels l ON l.id = pl.label_id "
+                f"WHERE pl.product_id IN ({marks}) ORDER BY pl.product_id, pl.label_id", list(by_id)):
+            by_id[product_id]["labels"].append(label_name)
+    next_cursor = str(products[-1]["id"]) if has_more else None
+    return products, next_cursor
+
+
+# -----------------------
+# LABEL ASSIGNMENT
+# -----------------------
+# SQLite caps bound parameters per statement; stay well below the old 999 default
+MAX_IN_PARAMS = 500
+
+
+def resolve_label_ids(conn: sqlite3.Connection, names) -> dict:
+    """Map label names to ids with one IN (...) query per 500 names; unknown names are left out."""
+    names = list(dict.fromkeys(n for n in names if n))
+    ids = {}
+    for i in range(0, len(names), MAX_IN_PARAMS):
+        chunk = names[i:i + MAX_IN_PARAMS]
+        marks = ",".join("?" * len(chunk))
+        for row in conn.execute(f"SELECT id, name FROM labels WHERE name IN ({marks})", chunk):
+            ids[row[1]] = row[0]
+    return ids
+
+
+def set_product_labels(conn: sqlite3.Connection, product_id: int, names) -> None:
+    """
+    Make the product's labels exactly 'names', writing only the difference
+    between the stored and the requested set. Does not commit.
+    """
+    wanted = set(resolve_label_ids(conn, names).values())
+    current = {row[0] for row in conn.execute("SELECT label_id FROM product_labels WHERE product_id = ?", (product_id,))}
+
+    removed = current - wanted
+    added = wanted - current
+    if removed:
+        conn.executemany("DELETE FROM product_labels WHERE product_id = ? AND label_id = ?",
+                         [(product_id, lid) for lid in removed])
+    if added:
+        conn.executemany("INSERT OR IGNORE INTO product_labels (product_id, label_id) VALUES (?, ?)",
+                         [(product_id, lid) for lid in added])
+
+
+def import_products(conn: sqlite3.Connection, rows: list, create_labels: bool = False) -> int:
+    """
+    Insert many products and their labels in the caller's transaction; returns the count.
+    Each row is a dict with name, price, category and optional description, image and labels.
+    Unknown labels are ignored unless create_labels is set.
+    """
+    if create_labels:
+        names = {l for r in rows for l in r.get("labels", [])}
+        conn.executemany("INSERT OR IGNORE INTO labels (name) VALUES (?)", [(n,) for n in names])
+    label_ids = resolve_label_ids(conn, (l for r in rows for l in r.get("labels", [])))
+
+    pairs = []
+    for r in rows:
+        cursor = conn.execute("INSERT INTO products (name, price, category, description, image) VALUES (?, ?, ?, ?, ?)",
+                              (r["name"], r["price"], r["category"], r.get("description", ""), r.get("image", "")))
+        for l in r.get("labels", []):
+            if l in label_ids:
+                pairs.append((cursor.lastrowid, label_ids[l]))
+    conn.executemany("INSERT OR IGNORE INTO product_labels (product_id, label_id) VALUES (?, ?)", pairs)
+    return len(rows)
+
+
+# -----------------------
+# MENU VERSION
+# -----------------------
+# A single-row table (created by migrations.py) shared by every gunicorn worker;
+# admin writes bump it inside their own transaction so readers can tell when their copy is stale
+def read_menu_version(conn: sqlite3.Connection) -> int:
+    """Return the current menu version stored in the database."""
+    row = conn.execute("SELECT version FROM menu_version WHERE id = 1").fetchone()
+    return row[0] if row else 0
+
+
+def bump_menu_version(conn: sqlite3.Connection) -> None:
+    """Mark the menu as changed. Call before commit() so it lands in the same transaction."""
+    conn.execute("UPDATE menu_version SET version = version + 1 WHERE id = 1")
+
+
+# -----------------------
+# IN-PROCESS CACHE
+# -----------------------
+# How often (seconds) a worker re-reads menu_version to notice writes made by other workers
+VERSION_CHECK_INTERVAL = float(os.getenv("CATALOG_VERSION_CHECK_INTERVAL", "1.0"))
+
+
+class CatalogCache:
+    """
+    Keeps the products-with-labels payload in memory, keyed by menu version.
+    Reads are served without touching SQLite; the version row is checked at most
+    once per check_interval, and immediately after invalidate().
+    The returned list is shared between requests and must not be mutated.
+    """
+
+    def __init__(self, connect, check_interval: float = VERSION_CHECK_INTERVAL):
+        self._connect = connect
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot = None  # (version, products)
+        self._payload = None  # CatalogPayload for the snapshot above
+        self._next_check = 0.0
+
+    def get(self) -> tuple:
+        """Return (version, products), reloading from the database only when the version moved."""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() < self._next_check:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() < self._next_check:
+                return snapshot
+
+            conn = self._connect()
+            try:
+                # Read the version and the catalog from one consistent snapshot
+                conn.execute("BEGIN")
+                version = read_menu_version(conn)
+                if snapshot is None or snapshot[0] != version:
+                    snapshot = (version, load_catalog(conn))
+                conn.rollback()
+            finally:
+                conn.close()
+
+            self._snapshot = snapshot
+            self._next_check = time.monotonic() + self._check_interval
+            return snapshot
+
+    def products(self) -> list:
+        """Shortcut for the cached product list."""
+        return self.get()[1]
+
+    def version(self) -> int:
+        """Shortcut for the menu version of the cached snapshot."""
+        return self.get()[0]
+
+    def payload(self) -> "CatalogPayload":
+        """Return the pre-encoded /api/products body for the current version, building it once."""
+        snapshot = self.get()
+        payload = self._payload
+        if payload is None or payload.version != snapshot[0]:
+            payload = CatalogPayload(snapshot[0], snapshot[1])
+            self._payload = payload
+        return payload
+
+    def invalidate(self) -> None:
+        """Force the next read to re-check the menu version (write-through after admin CRUD)."""
+        self._next_check = 0.0
+
+
+# -----------------------
+# SERIALIZED PAYLOAD
+# -----------------------
+GZIP_MIN_BYTES = 1024
+
+
+class CatalogPayload:
+    """
+    The products list encoded once per menu version: JSON bytes, an optional gzip
+    copy and a strong ETag per representation (identity and gzip differ).
+    """
+
+    def __init__(self, version: int, products: list):
+        self.version = version
+        # Same encoding as jsonify(): sorted keys, compact separators, ASCII-safe
+        self.body = json.dumps(products, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha1(self.body).hexdigest()[:20]
+        self.etag = f"menu-{version}-{digest}"
+        self.gzip_body = None
+        self.gzip_etag = None
+        if len(self.body) >= GZIP_MIN_BYTES:
+            self.gzip_body = gzip.compress(self.body, compresslevel=6, mtime=0)
+            self.gzip_etag = self.etag + "-gz"
+
+
+# -----------------------
+# RENDERED FRAGMENTS
+# -----------------------
+def category_pages(products: list, categories, limit: int = PAGE_SIZE) -> list:
+    """
+    First page of every category in the catalog, in the given order (unknown
+    categories last): [(category, products, next_cursor)]. The cursor is the same
+    keyset cursor /api/products?category=... expects.
+    """
+    grouped = {}
+    for p in products:
+        grouped.setdefault(p["category"], []).append(p)
+    order = [c for c in categories if c in grouped] + [c for c in grouped if c not in categories]
+    pages = []
+    for category in order:
+        items = grouped[category]
+        next_cursor = str(items[limit - 1]["id"]) if len(items) > limit else None
+        pages.append((category, items[:limit], next_cursor))
+    return pages
+
+
+class FragmentCache:
+    """
+    Rendered HTML fragments (and the data they are built from) keyed by name for
+    one menu version. A request for a newer version drops everything cached for
+    the older one, so memory stays bounded by one menu's worth of HTML.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._current = (None, {})  # (version, {name: html}), swapped as one object
+
+    def get(self, version: int, name: str, render) -> tuple:
+        """Return (value, hit); render() normally runs once per (version, name)."""
+        current_version, fragments = self._current
+        if current_version == version and name in fragments:
+            return fragments[name], True
+        value = render()
+        with self._lock:
+            current_version, fragments = self._current
+            if current_version != version:
+                if current_version is not None and version < current_version:
+                    return value, False  # a slow request still on an old snapshot; do not evict
+                fragments = {}
+                self._current = (version, fragments)
+            fragments[name] = value
+        return value, False
@@ -0,0 +1,189 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+import weakref
+
+# -----------------------
+# CONFIGURATION
+# -----------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.getenv("CAFE_DB_PATH", os.path.join(BASE_DIR, "cafe.db"))
+
+# Seconds a writer waits for the lock before raising "database is locked"
+BUSY_TIMEOUT = float(os.getenv("CAFE_DB_BUSY_TIMEOUT", "5.0"))
+# Idle connections kept per thread; extra ones are really closed on release
+MAX_IDLE_PER_THREAD = 4
+# Per-connection prepared statement cache (sqlite3's LRU of compiled statements)
+CACHED_STATEMENTS = 256
+
+# Applied to every new connection. WAL lets readers run alongside the single writer;
+# synchronous=NORMAL is durable across application crashes in WAL mode.
+PRAGMAS = [
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -8000),       # ~8 MB page cache per connection
+    ("mmap_size", 67108864),     # 64 MB memory-mapped reads
+    ("temp_store", "MEMORY"),
+]
+
+
+# Callables (sql, seconds) told about every statement run through a pooled
+# connection, e.g. metrics.Metrics.observe_query; empty means no timing overhead
+query_observers = []
+
+
+def _observe(sql: str, started: float) -> None:
+    elapsed = time.perf_counter() - started
+    for observer in query_observers:
+        observer(sql, elapsed)
+
+
+# -----------------------
+# POOLED CONNECTIONS
+# -----------------------
+class _Connection(sqlite3.Connection):
+    """sqlite3.Connection that can be weakly referenced (by the pool's registry)."""
+
+
+def _close_quietly(conns: list) -> None:
+    for conn in conns:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    conns.clear()
+
+
+class _ThreadIdle:
+    """One thread's idle connections, closed once the thread has exited and its locals are freed."""
+
+    def __init__(self):
+        self.conns = []
+        weakref.finalize(self, _close_quietly, self.conns)
+
+
+class PooledConnection:
+    """
+    Thin wrapper around sqlite3.Connection handed out by the pool.
+    It behaves like the raw connection, except close() returns it to the pool
+    (rolling back anything left uncommitted) instead of closing it.
+    """
+
+    def __init__(self, pool, conn: sqlite3.Connection):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def execute(self, sql, params=()):
+        if not query_observers:
+            return self._conn.execute(sql, params)
+        started = time.perf_counter()
+        try:
+            return self._conn.execute(sql, params)
+        finally:
+            _observe(sql, started)
+
+    def executemany(self, sql, seq):
+        if not query_observers:
+            return self._conn.executemany(sql, seq)
+        started = time.perf_counter()
+        try:
+            return self._conn.executemany(sql, seq)
+        finally:
+            _observe(sql, started)
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(conn)
+
+
+class ConnectionPool:
+    """
+    Per-thread pool of long-lived SQLite connections.
+    Each thread keeps its own small stack of idle connections, so nested
+    checkouts get separate connections and nothing is shared across threads.
+    A thread's idle connections are closed when the thread exits (threaded
+    Werkzeug runs each request on a new thread), and the registry used by
+    close_all() holds them weakly. Forked gunicorn workers detect the new pid
+    and start with an empty pool.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = BUSY_TIMEOUT):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = weakref.WeakSet()
+        self._pid = os.getpid()
+
+    def _idle(self) -> list:
+        if self._pid != os.getpid():
+            # Connections must never cross a fork; drop the parent's without closing them
+            with self._lock:
+                self._all = weakref.WeakSet()
+                self._local = threading.local()
+                self._pid = os.getpid()
+        idle = getattr(self._local, "idle", None)
+        if idle is None:
+            idle = self._local.idle = _ThreadIdle()
+        return idle.conns
+
+    def _open(self) -> sqlite3.Connection:
+        # A connection is only used by the thread that checked it out; check_same_thread=False
+        # lets a finished thread's connections be closed wherever its locals are freed
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, cached_statements=CACHED_STATEMENTS,
+                               factory=_Connection, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for name, value in PRAGMAS:
+            conn.execute(f"PRAGMA {name} = {value}")
+        with self._lock:
+            self._all.add(conn)
+        return conn
+
+    def connect(self) -> PooledConnection:
+        """Check out a connection for the current thread."""
+        idle = self._idle()
+        conn = idle.pop() if idle else self._open()
+        return PooledConnection(self, conn)
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Return a connection to the current thread's idle stack."""
+        if conn.in_transaction:
+            conn.rollback()
+        idle = self._idle()
+        if len(idle) < MAX_IDLE_PER_THREAD:
+            idle.append(conn)
+        else:
+            self._discard(conn)
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            self._all.discard(conn)
+        conn.close()
+
+    def close_all(self) -> None:
+        """Close every connection this process opened (used at shutdown)."""
+        with self._lock:
+            conns, self._all = list(self._all), weakref.WeakSet()
+            self._local = threading.local()
+        _close_quietly(conns)
+
+
+pool = ConnectionPool(DB_PATH)
+atexit.register(pool.close_all)
+
+
+def get_conn():
+    """Check out a pooled connection to the SQLite database; close() returns it to the pool."""
+    return pool.connect()
@@ -0,0 +1,245 @@
+"""
+Product image uploads: content-addressed originals plus resized WebP variants.
+
+Uploads are stored as <sha256>.<ext>, so the same picture uploaded twice is
+kept once and a file name never changes meaning (it can be cached forever).
+Variants (<sha256>-w320.webp, ...) are produced by a small background pool
+after the product row is committed, then recorded in products.image_variants.
+
+Existing images can be processed from the backend folder with:
+
+    python images.py backfill
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from catalog import bump_menu_version
+
+# -----------------------
+# CONFIGURATION
+# -----------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "frontend", "static"))
+UPLOAD_DIR = os.path.join(STATIC_DIR, "images", "uploads")
+UPLOAD_URL = "/static/images/uploads"
+# Widths generated for the menu cards (1x and 2x screens)
+VARIANT_WIDTHS = (320, 640)
+WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+MAX_UPLOAD_BYTES = int(float(os.getenv("IMAGE_MAX_UPLOAD_MB", "8")) * 1024 * 1024)
+DIGEST_CHARS = 32
+CHUNK = 64 * 1024
+
+# Hash-named files (originals and variants) are safe to cache as immutable
+HASHED_NAME = re.compile(r"^[0-9a-f]{%d}(-w\d+)?\.(jpg|png|gif|webp)$" % DIGEST_CHARS)
+
+
+def _sniff(header: bytes):
+    """File extension from the magic bytes; None for anything that is not an image we accept."""
+    if header.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if header.startswith(b"GIF8"):
+        return ".gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+# -----------------------
+# CONTENT-ADDRESSED STORAGE
+# -----------------------
+def save_upload(file_storage, dest_dir: str = UPLOAD_DIR) -> str:
+    """
+    Stream an uploaded image to dest_dir under its content hash and return its URL.
+    The client filename is ignored; raises ValueError for non-images or oversized files.
+    """
+    stream = file_storage.stream
+    header = stream.read(16)
+    ext = _sniff(header)
+    if ext is None:
+        raise ValueError("Unsupported image type (use JPEG, PNG, GIF or WebP)")
+
+    os.makedirs(dest_dir, exist_ok=True)
+    sha = hashlib.sha256(header)
+    size = len(header)
+    fd, tmp_path = tempfile.mkstemp(dir=dest_dir, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(header)
+            for chunk in iter(lambda: stream.read(CHUNK), b""):
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise ValueError(f"Image is larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+                sha.update(chunk)
+                out.write(chunk)
+        name = sha.hexdigest()[:DIGEST_CHARS] + ext
+        final_path = os.path.join(dest_dir, name)
+        if os.path.exists(final_path):
+            os.remove(tmp_path)  # same picture already stored
+        else:
+            os.replace(tmp_path, final_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return f"{UPLOAD_URL}/{name}"
+
+
+def image_path(image: str):
+    """Filesystem path of a products.image value ("/static/..." URL or a bare file name)."""
+    if not image:
+        return None
+    if image.startswith("/static/"):
+        path = os.path.join(STATIC_DIR, image[len("/static/"):])
+    else:
+        path = os.path.join(STATIC_DIR, "images", image)
+    path = os.path.normpath(path)
+    # Never follow a stored value outside the static folder
+    return path if path.startswith(STATIC_DIR + os.sep) else None
+
+
+def file_digest(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            sha.update(chunk)
+    return sha.hexdigest()[:DIGEST_CHARS]
+
+
+# -----------------------
+# VARIANTS
+# -----------------------
+_warned_no_pillow = False
+
+
+def make_variants(src_path: str, dest_dir: str = UPLOAD_DIR, widths=VARIANT_WIDTHS) -> dict:
+    """
+    Write resized WebP copies of src_path (never upscaled) and return {width: url}.
+    Existing variants are reused. Returns {} when Pillow is missing or the file is unreadable.
+    """
+    global _warned_no_pillow
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        if not _warned_no_pillow:
+            print("Image Worker: Pillow is not installed; serving original images only")
+            _warned_no_pillow = True
+        return {}
+
+    digest = file_digest(src_path)
+    variants = {}
+    missing = []
+    for width in widths:
+        name = f"{digest}-w{width}.webp"
+        variants[str(width)] = f"{UPLOAD_URL}/{name}"
+        if not os.path.exists(os.path.join(dest_dir, name)):
+            missing.append((width, name))
+    if not missing:
+        return variants
+
+    os.makedirs(dest_dir, exist_ok=True)
+    try:
+        with Image.open(src_path) as im:
+            im = ImageOps.exif_transpose(im)
+            if im.mode not in ("RGB", "RGBA"):
+                im = im.convert("RGBA" if "A" in im.getbands() or "transparency" in im.info else "RGB")
+            for width, name in missing:
+                copy = im.copy()
+                copy.thumbnail((width, width * 4), Image.LANCZOS)
+                # Write then rename, so a concurrent reader never sees half a file
+                fd, tmp_path = tempfile.mkstemp(dir=dest_dir, prefix=".variant-")
+                with os.fdopen(fd, "wb") as out:
+                    copy.save(out, "WEBP", quality=WEBP_QUALITY, method=4)
+                os.replace(tmp_path, os.path.join(dest_dir, name))
+    except (OSError, ValueError) as e:
+        print(f"Image Worker Error: {src_path}: {e}")
+        return {}
+    return variants
+
+
+class ImageProcessor:
+    """
+    Background pool that builds variants and records them on every product using
+    the image. The pool is created lazily (and again after a fork), so gunicorn
+    workers never inherit dead threads from the master.
+    """
+
+    def __init__(self, connect, on_change=None, workers: int = IMAGE_WORKERS):
+        self._connect = connect
+        self._on_change = on_change
+        self._workers = workers
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="image")
+                self._pid = os.getpid()
+            return self._pool
+
+    def submit(self, image: str):
+        """Queue variant generation for a products.image value. Call after the row is committed."""
+        return self._executor().submit(self.process, image)
+
+    def process(self, image: str) -> dict:
+        """Build the variants for one image and store them; returns {width: url}."""
+        path = image_path(image)
+        if path is None or not os.path.exists(path):
+            return {}
+        variants = make_variants(path)
+        if not variants:
+            return {}
+        conn = self._connect()
+        try:
+            changed = conn.execute("UPDATE products SET image_variants = ? WHERE image = ?",
+                                   (json.dumps(variants, sort_keys=True), image)).rowcount
+            if changed:
+                bump_menu_version(conn)
+            conn.commit()
+        finally:
+            conn.close()
+        if changed and self._on_change is not None:
+            self._on_change()
+        return variants
+
+    def wait(self) -> None:
+        """Block until every queued job has finished (tests, benchmarks, shutdown)."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+def backfill(conn: sqlite3.Connection, processor: ImageProcessor) -> int:
+    """Generate variants for every product image that has none yet; returns images processed."""
+    images = [row[0] for row in conn.execute(
+        "SELECT DISTINCT image FROM products WHERE image != '' AND image_variants IS NULL")]
+    done = 0
+    for image in images:
+        if processor.process(image):
+            done += 1
+        else:
+            print(f"Image Worker: skipped {image}")
+    return done
+
+
+if __name__ == "__main__":
+    from db import get_conn
+    if sys.argv[1:] != ["backfill"]:
+        print(__doc__)
+        sys.exit(1)
+    conn = get_conn()
+    count = backfill(conn, ImageProcessor(get_conn))
+    conn.close()
+    print(f"Image Worker: processed {count} images")
@@ -0,0 +1,70 @@
+import csv
+import io
+
+from ai.menu import MENU, MENU_META
+
+# -----------------------
+# BULK IMPORT SOURCES
+# -----------------------
+# Turn external menu data into rows for catalog.import_products()
+
+# ai/menu.py groups items by AI category; map them to the names used in the products table
+# (app.CATEGORIES, which also orders /menu)
+MENU_CATEGORY_MAP = {"coffee": "Coffee", "tea": "Tea", "cold": "Cold Drinks", "sweet": "Desserts"}
+DIET_FLAG_LABELS = {"vegan": "Vegan", "low_calorie": "Low Calorie", "sugar_free": "Sugar Free"}
+CSV_FIELDS = ["name", "price", "category", "description", "image", "labels"]
+
+
+def _label_name(key: str) -> str:
+    """'ice_cream' -> 'Ice Cream', matching how labels are written in the admin panel."""
+    return key.replace("_", " ").title()
+
+
+def rows_from_menu() -> list:
+    """Build import rows from MENU (ingredients, diet flags) and MENU_META (name, price, image, text)."""
+    rows = []
+    for ai_cat, items in MENU.items():
+        for key, info in items.items():
+            meta = MENU_META.get(key, {})
+            labels = [label for flag, label in DIET_FLAG_LABELS.items() if info.get(flag)]
+            labels += [_label_name(i) for i in info.get("ingredients", [])]
+            rows.append({
+                "name": meta.get("name", key.title()),
+                "price": meta.get("price", 0.0),
+                "category": MENU_CATEGORY_MAP.get(ai_cat, ai_cat.title()),
+                "description": meta.get("desc", ""),
+                "image": f"/static/images/{meta['img']}" if meta.get("img") else "",
+                "labels": labels,
+            })
+    return rows
+
+
+def rows_from_csv(text: str) -> list:
+    """
+    Parse CSV text with a header row of name, price, category[, description, image, labels].
+    Multiple labels are separated by ';'. Raises ValueError on a malformed row.
+    """
+    rows = []
+    reader = csv.DictReader(io.StringIO(text))
+    missing = {"name", "price", "category"} - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(sorted(missing))}")
+
+    for line_no, r in enumerate(reader, start=2):
+        name = (r.get("name") or "").strip()
+        category = (r.get("category") or "").strip()
+        if not name or not category:
+            raise ValueError(f"Line {line_no}: name and category are required")
+        try:
+            price = float(r.get("price") or 0)
+        except ValueError:
+            raise ValueError(f"Line {line_no}: invalid price {r.get('price')!r}")
+        rows.append({
+            "name": name,
+            "price": price,
+            "category": category,
+            "description": (r.get("description") or "").strip(),
+            "image": (r.get("image") or "").strip(),
+            "labels": [l.strip() for l in (r.get("labels") or "").split(";") if l.strip()],
+        })
+    return rows
@@ -0,0 +1,338 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+
+# -----------------------
+# CONFIGURATION
+# -----------------------
+# Hooks stay installed but record nothing when disabled
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# cProfile is only ever started when this is on (per request via X-Profile, or sampled)
+PROFILING_ENABLED = os.getenv("METRICS_PROFILING", "0") == "1"
+# Fraction of requests profiled without asking, e.g. 0.01
+PROFILE_SAMPLE_RATE = float(os.getenv("METRICS_PROFILE_SAMPLE_RATE", "0"))
+# Same statement this many times in one request is reported as a likely N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("METRICS_N_PLUS_ONE_THRESHOLD", "10"))
+
+# Histogram upper bounds in seconds (Prometheus style, plus an implicit +Inf)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+MAX_SQL_STATEMENTS = 300
+MAX_PROFILES = 20
+PROFILE_TOP_FUNCTIONS = 40
+
+WHITESPACE = re.compile(r"\s+")
+# IN (?, ?, ?) lists of any length count as one statement
+PARAM_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    return PARAM_LIST.sub("?, ...", WHITESPACE.sub(" ", sql).strip())[:300]
+
+
+# -----------------------
+# HISTOGRAM
+# -----------------------
+class Histogram:
+    """Fixed-bucket latency histogram; constant memory however many samples arrive."""
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        i = 0
+        while i < len(self.bounds) and value > self.bounds[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Estimate by linear interpolation inside the bucket holding the q-th sample."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative, lower = 0, 0.0
+        for bound, n in zip(self.bounds, self.counts):
+            if n and cumulative + n >= rank:
+                return min(self.max, lower + (bound - lower) * (rank - cumulative) / n)
+            cumulative += n
+            lower = bound
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.50) * 1000, 3),
+            "p95_ms": round(self.quantile(0.95) * 1000, 3),
+            "p99_ms": round(self.quantile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+# -----------------------
+# METRICS REGISTRY
+# -----------------------
+class Metrics:
+    """
+    Per-process request metrics: route latency histograms, time per phase
+    (sql / render / json / nlp / llm), per-statement SQL timings with N+1
+    detection, LLM call durations and token counts, and saved cProfile reports.
+    Request-scoped state is thread-local, which matches sync and gthread workers.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._histograms = {}    # (name, labels) -> Histogram
+        self._counters = {}      # (name, labels) -> number
+        self._sql = {}           # statement -> [calls, total seconds, max seconds]
+        self._n_plus_one = {}    # (route, statement) -> [requests, max repeats]
+        self._profiles = deque(maxlen=MAX_PROFILES)
+        self._profile_lock = threading.Lock()
+        self._profile_seq = 0
+
+    # --- recording helpers (caller holds the lock) ---
+    def _observe(self, name: str, labels: tuple, value: float) -> None:
+        hist = self._histograms.get((name, labels))
+        if hist is None:
+            hist = self._histograms[(name, labels)] = Histogram()
+        hist.observe(value)
+
+    def _inc(self, name: str, labels: tuple, value: float = 1) -> None:
+        self._counters[(name, labels)] = self._counters.get((name, labels), 0) + value
+
+    # --- request lifecycle ---
+    def begin_request(self) -> None:
+        self._local.queries = {}
+        self._local.phases = {}
+
+    def end_request(self, route: str, method: str, status: int, seconds: float) -> None:
+        queries = getattr(self._local, "queries", None) or {}
+        phases = getattr(self._local, "phases", None) or {}
+        self._local.queries = self._local.phases = None
+        if not self.enabled:
+            return
+        suspects = [(stmt, n) for stmt, n in queries.items() if n >= N_PLUS_ONE_THRESHOLD]
+        with self._lock:
+            self._observe("http_request_duration_seconds", (("route", route), ("method", method)), seconds)
+            self._inc("http_requests_total", (("route", route), ("method", method), ("status", str(status))))
+            for phase, total in phases.items():
+                self._observe("request_phase_seconds", (("route", route), ("phase", phase)), total)
+            new_suspects = []
+            for stmt, n in suspects:
+                entry = self._n_plus_one.get((route, stmt))
+                if entry is None:
+                    entry = self._n_plus_one[(route, stmt)] = [0, 0]
+                    new_suspects.append((stmt, n))
+                entry[0] += 1
+                entry[1] = max(entry[1], n)
+        for stmt, n in new_suspects:
+            print(f"Metrics: possible N+1 on {method} {route}: {n}x {stmt[:120]}")
+
+    def add_phase(self, phase: str, seconds: float) -> None:
+        phases = getattr(self._local, "phases", None)
+        if phases is not None:
+            phases[phase] = phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a block and add it to the current request's phase breakdown."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - started)
+
+    # --- hooks for db.py and ai/llm_client.py ---
+    def observe_query(self, sql: str, seconds: float) -> None:
+        """Query observer for db.py; execute() time only (rows fetched later are not included)."""
+        if not self.enabled:
+            return
+        stmt = normalize_sql(sql)
+        queries = getattr(self._local, "queries", None)
+        if queries is not None:
+            queries[stmt] = queries.get(stmt, 0) + 1
+            self.add_phase("sql", seconds)
+        with self._lock:
+            entry = self._sql.get(stmt)
+            if entry is None:
+                if len(self._sql) >= MAX_SQL_STATEMENTS:
+                    stmt = "<other>"
+                entry = self._sql.setdefault(stmt, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def observe_llm(self, mode: str, outcome: str, seconds: float, usage=None) -> None:
+        """LLM client callback: one finished (or failed) upstream call."""
+        if not self.enabled:
+            return
+        if outcome != "overloaded":
+            self.add_phase("llm", seconds)
+        with self._lock:
+            self._observe("llm_call_duration_seconds", (("mode", mode), ("outcome", outcome)), seconds)
+            if usage is not None:
+                self._inc("llm_tokens_total", (("kind", "prompt"),), getattr(usage, "prompt_tokens", 0) or 0)
+                self._inc("llm_tokens_total", (("kind", "completion"),), getattr(usage, "completion_tokens", 0) or 0)
+
+    def observe_client(self, page: str, metric: str, seconds: float) -> None:
+        """Browser-reported page timing (first contentful paint, TTFB) from /api/rum."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._observe("client_timing_seconds", (("page", page), ("metric", metric)), seconds)
+
+    # --- profiling ---
+    def should_profile(self, requested: bool) -> bool:
+        if not PROFILING_ENABLED:
+            return False
+        return requested or (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE)
+
+    def start_profile(self):
+        """Start cProfile for this request, or None if another request is being profiled."""
+        if not self._profile_lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool is active in this process
+            self._profile_lock.release()
+            return None
+        return profiler
+
+    def stop_profile(self, profiler, label: str) -> int:
+        """Stop the profiler, keep its top functions by cumulative time; returns the profile id."""
+        try:
+            profiler.disable()
+        finally:
+            self._profile_lock.release()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        with self._lock:
+            self._profile_seq += 1
+            self._profiles.append({"id": self._profile_seq, "request": label,
+                                   "at": time.strftime("%Y-%m-%d %H:%M:%S"), "report": out.getvalue()})
+            return self._profile_seq
+
+    def profile(self, profile_id: int):
+        with self._lock:
+            return next((p for p in self._profiles if p["id"] == profile_id), None)
+
+    # --- export ---
+    def snapshot(self) -> dict:
+        """JSON view: summaries per route, phase, SQL statement and LLM call."""
+        with self._lock:
+            histograms = {k: h.summary() for k, h in self._histograms.items()}
+            counters = dict(self._counters)
+            sql = {stmt: list(v) for stmt, v in self._sql.items()}
+            n_plus_one = {k: list(v) for k, v in self._n_plus_one.items()}
+            profiles = [{k: p[k] for k in ("id", "request", "at")} for p in self._profiles]
+
+        routes, phases, llm, client = {}, {}, {}, {}
+        for (name, labels), summary in histograms.items():
+            lab = dict(labels)
+            if name == "http_request_duration_seconds":
+                routes[f"{lab['method']} {lab['route']}"] = dict(summary, status={})
+            elif name == "request_phase_seconds":
+                phases.setdefault(lab["route"], {})[lab["phase"]] = summary
+            elif name == "llm_call_duration_seconds":
+                llm[f"{lab['mode']}:{lab['outcome']}"] = summary
+            elif name == "client_timing_seconds":
+                client.setdefault(lab["page"], {})[lab["metric"]] = summary
+        tokens = {}
+        for (name, labels), value in counters.items():
+            lab = dict(labels)
+            if name == "http_requests_total":
+                route = routes.get(f"{lab['method']} {lab['route']}")
+                if route is not None:
+                    route["status"][lab["status"]] = value
+            elif name == "llm_tokens_total":
+                tokens[lab["kind"]] = value
+
+        top_sql = sorted(sql.items(), key=lambda kv: kv[1][1], reverse=True)
+        return {
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "routes": routes,
+            "phases": phases,
+            "sql": [
+                {"statement": stmt, "calls": calls, "total_ms": round(total * 1000, 3),
+                 "mean_ms": round(total / calls * 1000, 4), "max_ms": round(worst * 1000, 3)}
+                for stmt, (calls, total, worst) in top_sql
+            ],
+            "n_plus_one": [
+                {"route": route, "statement": stmt, "requests": requests, "max_repeats": repeats}
+                for (route, stmt), (requests, repeats) in n_plus_one.items()
+            ],
+            "llm": {"calls": llm, "tokens": tokens},
+            "client": client,
+            "profiles": profiles,
+        }
+
+    def prometheus(self, prefix: str = "cafe") -> str:
+        """Prometheus text exposition format (this worker only)."""
+        with self._lock:
+            histograms = {k: (h.bounds, list(h.counts), h.sum, h.count) for k, h in self._histograms.items()}
+            counters = dict(self._counters)
+            sql = {stmt: list(v) for stmt, v in self._sql.items()}
+            n_plus_one = {k: list(v) for k, v in self._n_plus_one.items()}
+
+        lines = []
+        typed = set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), (bounds, counts, total, count) in sorted(histograms.items()):
+            metric = f"{prefix}_{name}"
+            header(metric, "histogram")
+            cumulative = 0
+            for bound, n in zip(list(bounds) + ["+Inf"], counts):
+                cumulative += n
+                lines.append(f"{metric}_bucket{_labels(labels + (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{metric}_sum{_labels(labels)} {total}")
+            lines.append(f"{metric}_count{_labels(labels)} {count}")
+        for (name, labels), value in sorted(counters.items()):
+            metric = f"{prefix}_{name}"
+            header(metric, "counter")
+            lines.append(f"{metric}{_labels(labels)} {value}")
+        # One contiguous block per metric family, as the text format requires
+        for family, column in (("sql_calls_total", 0), ("sql_seconds_total", 1)):
+            for stmt, entry in sorted(sql.items()):
+                header(f"{prefix}_{family}", "counter")
+                lines.append(f"{prefix}_{family}{_labels((('statement', stmt),))} {entry[column]}")
+        for (route, stmt), (requests, _) in sorted(n_plus_one.items()):
+            header(f"{prefix}_sql_n_plus_one_total", "counter")
+            lines.append(f"{prefix}_sql_n_plus_one_total{_labels((('route', route), ('statement', stmt)))} {requests}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
@@ -0,0 +1,252 @@
+import sqlite3
+
+# -----------------------
+# SCHEMA MIGRATIONS
+# -----------------------
+# Each entry is (version, description, statements). The database remembers the
+# last applied version in PRAGMA user_version; pending migrations run in order,
+# each inside its own write transaction. Never edit a released migration: append a new one.
+MIGRATIONS = [
+    (1, "base schema", [
+        """
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            price REAL NOT NULL,
+            description TEXT DEFAULT '',
+            image TEXT DEFAULT '',
+            category TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS labels (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS product_labels (
+            product_id INTEGER NOT NULL,
+            label_id INTEGER NOT NULL,
+            UNIQUE(product_id, label_id),
+            FOREIGN KEY(product_id) REFERENCES products(id) ON DELETE CASCADE,
+            FOREIGN KEY(label_id) REFERENCES labels(id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            full_name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            category TEXT,
+            message TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS menu_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+        """,
+        "INSERT OR IGNORE INTO menu_version (id, version) VALUES (1, 0)",
+    ]),
+
+    # product_labels becomes a clustered (product_id, label_id) primary key, so
+    # "labels of product X" is a range scan with no rowid lookups, plus a reverse
+    # index for "products with label Y". labels.name is already indexed by its
+    # UNIQUE constraint and notifications.id is the rowid, so ORDER BY id needs no index.
+    (2, "product_labels composite primary key and label index", [
+        """
+        CREATE TABLE product_labels_new (
+            product_id INTEGER NOT NULL,
+            label_id INTEGER NOT NULL,
+            PRIMARY KEY (product_id, label_id),
+            FOREIGN KEY(product_id) REFERENCES products(id) ON DELETE CASCADE,
+            FOREIGN KEY(label_id) REFERENCES labels(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+        """,
+        "INSERT OR IGNORE INTO product_labels_new (product_id, label_id) SELECT product_id, label_id FROM product_labels",
+        "DROP TABLE product_labels",
+        "ALTER TABLE product_labels_new RENAME TO product_labels",
+        "CREATE INDEX IF NOT EXISTS idx_product_labels_label ON product_labels(label_id, product_id)",
+    ]),
+
+    # Filtered /api/products pages: (category, id) serves "category X after id N"
+    # as one index range, price has its own index, and an external-content FTS5
+    # table (kept in sync by triggers) backs name/description search.
+    (3, "product filter indexes and full-text search", [
+        "CREATE INDEX IF NOT EXISTS idx_products_category ON products(category, id)",
+        "CREATE INDEX IF NOT EXISTS idx_products_price ON products(price)",
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+            name, description,
+            content='products', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        "INSERT INTO products_fts(products_fts) VALUES ('rebuild')",
+        """
+        CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, description ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+        END
+        """,
+    ]),
+
+    # Notifications get a timestamp, an archive table that resolved and expired
+    # messages move to, and trigger-maintained counts so the dashboard never runs COUNT(*).
+    (4, "notification timestamps, archive and counters", [
+        "ALTER TABLE notifications ADD COLUMN created_at INTEGER NOT NULL DEFAULT 0",
+        "UPDATE notifications SET created_at = CAST(strftime('%s', 'now') AS INTEGER)",
+        "CREATE INDEX IF NOT EXISTS idx_notifications_created ON notifications(created_at)",
+        """
+        CREATE TRIGGER IF NOT EXISTS notifications_created_at AFTER INSERT ON notifications
+        WHEN new.created_at = 0 BEGIN
+            UPDATE notifications SET created_at = CAST(strftime('%s', 'now') AS INTEGER) WHERE id = new.id;
+        END
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS notifications_archive (
+            id INTEGER PRIMARY KEY,
+            full_name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            category TEXT,
+            message TEXT NOT NULL,
+            created_at INTEGER NOT NULL,
+            archived_at INTEGER NOT NULL,
+            reason TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS notification_counts (
+            scope TEXT PRIMARY KEY,
+            count INTEGER NOT NULL
+        ) WITHOUT ROWID
+        """,
+        "INSERT OR REPLACE INTO notification_counts (scope, count) VALUES ('open', (SELECT COUNT(*) FROM notifications))",
+        "INSERT OR REPLACE INTO notification_counts (scope, count) VALUES ('archived', (SELECT COUNT(*) FROM notifications_archive))",
+        """
+        CREATE TRIGGER IF NOT EXISTS notifications_count_insert AFTER INSERT ON notifications BEGIN
+            UPDATE notification_counts SET count = count + 1 WHERE scope = 'open';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS notifications_count_delete AFTER DELETE ON notifications BEGIN
+            UPDATE notification_counts SET count = count - 1 WHERE scope = 'open';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS notifications_archive_count_insert AFTER INSERT ON notifications_archive BEGIN
+            UPDATE notification_counts SET count = count + 1 WHERE scope = 'archived';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS notifications_archive_count_delete AFTER DELETE ON notifications_archive BEGIN
+            UPDATE notification_counts SET count = count - 1 WHERE scope = 'archived';
+        END
+        """,
+    ]),
+
+    # Resized WebP variants of the product image, as JSON {"320": url, "640": url};
+    # NULL until the background image worker (images.py) has produced them.
+    (5, "product image variants", [
+        "ALTER TABLE products ADD COLUMN image_variants TEXT",
+    ]),
+
+    # Messages queued by the /contact write-behind spool carry a unique key, so
+    # replaying a spool after a crash never inserts the same message twice.
+    (6, "notification spool keys", [
+        "ALTER TABLE notifications ADD COLUMN spool_key TEXT",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_notifications_spool_key ON notifications(spool_key) WHERE spool_key IS NOT NULL",
+    ]),
+
+    # Branches serve the base menu with their own prices and availability. Each
+    # branch has its own version counter; its overrides live here, or in a shard
+    # file (branches.py) when the branch row names one. Rows of deleted products
+    # are dropped here; shard files are cleaned lazily (unknown ids are ignored).
+    (7, "branches and per-branch overrides", [
+        """
+        CREATE TABLE IF NOT EXISTS branches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            slug TEXT NOT NULL UNIQUE,
+            name TEXT NOT NULL,
+            shard TEXT,
+            categories TEXT,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS branch_overrides (
+            branch_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            price REAL,
+            available INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (branch_id, product_id)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_branch_overrides_product ON branch_overrides(product_id)",
+        """
+        CREATE TRIGGER IF NOT EXISTS products_delete_overrides AFTER DELETE ON products BEGIN
+            DELETE FROM branch_overrides WHERE product_id = old.id;
+        END
+        """,
+    ]),
+
+    # The admin form offered "Cold Beverages" while the menu and the importer used
+    # "Cold Drinks", splitting one category in two; products and branch category
+    # orders move to "Cold Drinks", bumping the versions so caches notice.
+    (8, "one name for the cold drinks category", [
+        """
+        UPDATE menu_version SET version = version + 1
+        WHERE id = 1 AND EXISTS (SELECT 1 FROM products WHERE category = 'Cold Beverages')
+        """,
+        "UPDATE products SET category = 'Cold Drinks' WHERE category = 'Cold Beverages'",
+        """
+        UPDATE branches SET categories = replace(categories, '"Cold Beverages"', '"Cold Drinks"'),
+                            version = version + 1
+        WHERE categories LIKE '%"Cold Beverages"%'
+        """,
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    """Return the migration version recorded in the database file."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Bring the database up to LATEST_VERSION and return the version reached.
+    Safe to call from several workers at once: BEGIN IMMEDIATE serializes them
+    and the version is re-checked under the write lock.
+    """
+    for version, description, statements in MIGRATIONS:
+        if schema_version(conn) >= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            for sql in statements:
+                conn.execute(sql)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+            print(f"DB Migration: applied {version} ({description})")
+        except Exception:
+            conn.rollback()
+            raise
+    return schema_version(conn)
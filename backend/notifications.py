@@ -0,0 +1,375 @@
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+
+try:
+    import fcntl
+except ImportError:  # Windows: spools are not locked, see NotificationQueue.replay
+    fcntl = None
+
+# -----------------------
+# CONFIGURATION
+# -----------------------
+# Messages shown per dashboard page
+NOTIFICATIONS_PAGE_SIZE = int(os.getenv("NOTIFICATIONS_PAGE_SIZE", "20"))
+# Default age (days) for "archive old messages"; open messages older than this are rolled up
+NOTIFICATIONS_ARCHIVE_DAYS = int(os.getenv("NOTIFICATIONS_ARCHIVE_DAYS", "30"))
+# Rows moved per statement, so archiving a large backlog never holds the write lock for long
+ARCHIVE_BATCH = 500
+
+VIEWS = {"open": "notifications", "archived": "notifications_archive"}
+
+# /contact write-behind: submissions are spooled and queued, then group-committed by one thread
+WRITE_BEHIND_ENABLED = os.getenv("CONTACT_WRITE_BEHIND", "1") == "1"
+SPOOL_DIR = os.getenv("CONTACT_SPOOL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "spool"))
+# Accepted but not yet committed messages per worker; beyond this /contact answers 503
+QUEUE_MAX = int(os.getenv("CONTACT_QUEUE_MAX", "1000"))
+# Most messages written in one transaction
+FLUSH_BATCH = int(os.getenv("CONTACT_FLUSH_BATCH", "200"))
+# How long the flusher lets a batch fill up after the first message arrives
+FLUSH_DELAY = float(os.getenv("CONTACT_FLUSH_DELAY_MS", "20")) / 1000
+# The spool, like the WAL database (synchronous=NORMAL), survives a process crash without
+# fsync; set CONTACT_SPOOL_FSYNC=1 to also survive power loss at a cost per submission
+SPOOL_FSYNC = os.getenv("CONTACT_SPOOL_FSYNC", "0") == "1"
+# Attempts per batch before giving up on it for now (it stays in the spool, see NotificationQueue)
+WRITE_RETRIES = int(os.getenv("CONTACT_WRITE_RETRIES", "10"))
+RETRY_DELAY = 0.5
+
+
+# -----------------------
+# WRITES
+# -----------------------
+INSERT_SQL = """
+    INSERT OR IGNORE INTO notifications (full_name, email, category, message, created_at, spool_key)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+def add_notification(conn: sqlite3.Connection, full_name: str, email: str, category: str, message: str) -> int:
+    """Insert a contact message; the counters are kept up to date by triggers."""
+    cur = conn.execute(INSERT_SQL, (full_name, email, category, message, int(time.time()), None))
+    return cur.lastrowid
+
+
+def _archive_where(conn: sqlite3.Connection, where: str, params: tuple, reason: str) -> int:
+    """Move the notifications matching `where` into the archive table. Caller commits."""
+    now = int(time.time())
+    conn.execute(f"""
+        INSERT INTO notifications_archive
+            (id, full_name, email, category, message, created_at, archived_at, reason)
+        SELECT id, full_name, email, category, message, created_at, ?, ?
+        FROM notifications WHERE {where}
+    """, (now, reason) + params)
+    return conn.execute(f"DELETE FROM notifications WHERE {where}", params).rowcount
+
+
+def resolve_notification(conn: sqlite3.Connection, msg_id: int) -> bool:
+    """Archive one message as resolved. Returns False if it was not open."""
+    return _archive_where(conn, "id = ?", (msg_id,), "resolved") > 0
+
+
+def archive_older_than(conn: sqlite3.Connection, days: int = NOTIFICATIONS_ARCHIVE_DAYS) -> int:
+    """
+    Archive open messages older than `days`, ARCHIVE_BATCH rows per transaction.
+    Returns how many were moved.
+    """
+    cutoff = int(time.time()) - days * 86400
+    moved = 0
+    while True:
+        # Bounded by the created_at index, oldest first
+        batch = conn.execute(
+            "SELECT id FROM notifications WHERE created_at < ? ORDER BY created_at LIMIT ?",
+            (cutoff, ARCHIVE_BATCH)).fetchall()
+        if not batch:
+            return moved
+        ids = [row[0] for row in batch]
+        marks = ",".join("?" * len(ids))
+        moved += _archive_where(conn, f"id IN ({marks})", tuple(ids), "expired")
+        conn.commit()
+
+
+# -----------------------
+# WRITE-BEHIND QUEUE
+# -----------------------
+def _remove_open(path: str, fd: int) -> None:
+    """
+    Delete a file this process holds open, then close it. POSIX keeps the flock
+    until the close; Windows cannot delete an open file, so it is closed first.
+    """
+    if fcntl is None:
+        os.close(fd)
+        os.remove(path)
+        return
+    try:
+        os.remove(path)
+    finally:
+        os.close(fd)
+
+
+def _record_row(record: dict) -> tuple:
+    return (record["full_name"], record["email"], record["category"], record["message"],
+            record["created_at"], record["key"])
+
+
+class NotificationQueue:
+    """
+    Bounded write-behind queue for /contact. submit() appends the message to this
+    worker's spool file (one O_APPEND write) and to an in-memory queue; a flusher
+    thread inserts queued messages in batches, one transaction per batch. After
+    each batch the spool is emptied, or rewritten with only the messages still
+    waiting once most of it is committed, so it stays proportional to the queue.
+    A batch that keeps failing is kept (in memory and in the spool) and retried
+    after the next batch that commits. Spools left behind by a crashed worker are
+    replayed by replay(); spool keys make replays idempotent.
+    """
+
+    def __init__(self, connect, spool_dir: str = SPOOL_DIR, max_pending: int = QUEUE_MAX,
+                 batch: int = FLUSH_BATCH, delay: float = FLUSH_DELAY, retries: int = WRITE_RETRIES):
+        self._connect = connect
+        self.spool_dir = spool_dir
+        self.max_pending = max_pending
+        self.batch = batch
+        self.delay = delay
+        self.retries = retries
+        self._cond = threading.Condition()
+        self._pending = deque()   # (record, spool line)
+        self._failed = []         # batches given up on, still in the spool
+        self._in_flight = 0
+        self._pid = None
+        self._spool_fd = None
+        self._spool_path = None
+        self._spool_bytes = 0     # size of the spool file
+        self._live_bytes = 0      # bytes of it not committed yet
+        self._thread = None
+        self.stats = {"accepted": 0, "rejected": 0, "committed": 0, "batches": 0, "retries": 0,
+                      "failed_batches": 0, "compactions": 0}
+
+    # --- producer side ---
+    def _open_spool(self) -> int:
+        """Create and lock a new spool file for this process; returns its fd."""
+        os.makedirs(self.spool_dir, exist_ok=True)
+        path = os.path.join(self.spool_dir, f"contact-{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl")
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        # Held for the life of the spool; replay() skips spools that are still locked
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._spool_fd, self._spool_path, self._spool_bytes = fd, path, 0
+        return fd
+
+    def _start(self) -> None:
+        """Open this process's spool and flusher (again after a fork). Caller holds the lock."""
+        if self._pid == os.getpid():
+            return
+        self._open_spool()
+        self._pending = deque()
+        self._failed = []
+        self._in_flight = 0
+        self._live_bytes = 0
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name="contact-flusher", daemon=True)
+        self._thread.start()
+
+    def submit(self, full_name: str, email: str, category: str, message: str) -> bool:
+        """Accept a message for writing; False means the queue is full (back off and retry)."""
+        record = {"key": uuid.uuid4().hex, "full_name": full_name, "email": email, "category": category,
+                  "message": message, "created_at": int(time.time())}
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._cond:
+            self._start()
+            # Messages of failed batches count too, so a database that stays down means 503s
+            if len(self._pending) + self._in_flight + len(self._failed) >= self.max_pending:
+                self.stats["rejected"] += 1
+                return False
+            os.write(self._spool_fd, line)
+            if SPOOL_FSYNC:
+                os.fsync(self._spool_fd)
+            self._spool_bytes += len(line)
+            self._live_bytes += len(line)
+            self._pending.append((record, line))
+            self.stats["accepted"] += 1
+            self._cond.notify()
+        return True
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending) + self._in_flight + len(self._failed)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """
+        Wait until everything accepted so far has been written; False on timeout
+        or when a batch failed (its messages are still in the spool).
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return not self._failed
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush and remove this worker's spool (at exit); anything left over is replayed next start."""
+        if self._pid != os.getpid() or not self.flush(timeout):
+            return
+        with self._cond:
+            if not self._pending and not self._in_flight and not self._failed:
+                _remove_open(self._spool_path, self._spool_fd)
+                self._pid = self._spool_fd = self._spool_path = None
+
+    # --- flusher thread ---
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            # Let concurrent submissions join this batch (group commit)
+            if self.delay > 0:
+                time.sleep(self.delay)
+            with self._cond:
+                batch = [self._pending.popleft() for _ in range(min(self.batch, len(self._pending)))]
+                self._in_flight = len(batch)
+            committed = self._write([record for record, _ in batch])
+            with self._cond:
+                self._in_flight = 0
+                if committed:
+                    self.stats["committed"] += len(batch)
+                    self.stats["batches"] += 1
+                    self._live_bytes -= sum(len(line) for _, line in batch)
+                    # The database is back: give the batches that failed before another go
+                    self._pending.extendleft(reversed(self._failed))
+                    self._failed = []
+                else:
+                    self._failed.extend(batch)
+                    self.stats["failed_batches"] += 1
+                self._trim_spool()
+                self._cond.notify_all()
+
+    def _trim_spool(self) -> None:
+        """Keep the spool proportional to what is not committed yet. Caller holds the lock."""
+        if not self._pending and not self._failed:
+            # Everything in the spool is in the database now
+            os.ftruncate(self._spool_fd, 0)
+            self._spool_bytes = self._live_bytes = 0
+        elif self._spool_bytes > 2 * self._live_bytes:
+            # Mostly committed lines: move what is left to a fresh spool (amortized O(1) per message)
+            old_fd, old_path = self._spool_fd, self._spool_path
+            lines = b"".join(line for _, line in list(self._failed) + list(self._pending))
+            fd = self._open_spool()
+            os.write(fd, lines)
+            if SPOOL_FSYNC:
+                os.fsync(fd)
+            self._spool_bytes = self._live_bytes = len(lines)
+            _remove_open(old_path, old_fd)
+            self.stats["compactions"] += 1
+
+    def _write(self, records: list) -> bool:
+        """
+        Insert records in one transaction, retrying while the database is busy.
+        Returns False after `retries` failed attempts.
+        """
+        rows = [_record_row(r) for r in records]
+        for attempt in range(1, self.retries + 1):
+            conn = self._connect()
+            try:
+                conn.executemany(INSERT_SQL, rows)
+                conn.commit()
+                return True
+            except sqlite3.OperationalError as e:
+                with self._cond:
+                    self.stats["retries"] += 1
+                if attempt == self.retries:
+                    print(f"Contact Queue: ALERT giving up on {len(rows)} messages after {attempt} attempts "
+                          f"({e}); they stay in the spool")
+                    return False
+                print(f"Contact Queue: write failed ({e}), retrying")
+            finally:
+                conn.close()
+            time.sleep(RETRY_DELAY)
+        return False
+
+    # --- recovery ---
+    def replay(self) -> int:
+        """
+        Insert the messages of spools whose worker is gone, then delete them.
+        Returns messages read. Without flock (Windows) a live worker's spool may
+        be read too; its keys make that harmless, and it cannot be deleted
+        while its worker holds it open.
+        """
+        replayed = 0
+        for path in sorted(glob.glob(os.path.join(self.spool_dir, "contact-*.jsonl"))):
+            if path == self._spool_path:
+                continue
+            try:
+                fd = os.open(path, os.O_RDWR)
+            except FileNotFoundError:
+                continue  # another worker replayed it first
+            try:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        continue  # its worker is still running
+                with os.fdopen(os.dup(fd), "rb") as f:
+                    records = []
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break  # torn last write: the client never got an answer for it
+                        try:
+                            records.append(json.loads(line))
+                        except ValueError:
+                            continue
+                if records:
+                    if not self._write([r for r in records if "key" in r]):
+                        continue  # left in place for the next start
+                    print(f"Contact Queue: replayed {len(records)} messages from {os.path.basename(path)}")
+                try:
+                    _remove_open(path, fd)
+                except FileNotFoundError:
+                    pass  # replayed concurrently by another worker; the keys kept it single
+                except PermissionError:
+                    pass  # Windows: its worker still has it open
+                finally:
+                    fd = None
+                replayed += len(records)
+            finally:
+                if fd is not None:
+                    os.close(fd)
+        return replayed
+
+
+# -----------------------
+# READS
+# -----------------------
+def list_notifications(conn: sqlite3.Connection, view: str = "open", before_id=None,
+                       limit: int = NOTIFICATIONS_PAGE_SIZE):
+    """
+    One page of messages, newest first, keyset-paginated on id.
+    Returns (rows, next_before); next_before is None on the last page.
+    """
+    table = VIEWS.get(view, VIEWS["open"])
+    sql = f"SELECT * FROM {table}"
+    params = []
+    if before_id is not None:
+        sql += " WHERE id < ?"
+        params.append(before_id)
+    sql += " ORDER BY id DESC LIMIT ?"
+    # One extra row tells us whether an older page exists
+    params.append(limit + 1)
+    rows = conn.execute(sql, params).fetchall()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1]["id"]
+    return rows, None
+
+
+def notification_counts(conn: sqlite3.Connection) -> dict:
+    """Open and archived totals from the trigger-maintained counters (no COUNT(*))."""
+    counts = {"open": 0, "archived": 0}
+    counts.update(dict(conn.execute("SELECT scope, count FROM notification_counts").fetchall()))
+    return counts
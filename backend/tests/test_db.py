@@ -0,0 +1,37 @@
+import gc
+import sqlite3
+import threading
+
+from db import ConnectionPool
+
+
+def test_thread_connections_are_closed_when_the_thread_exits(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"))
+    opened = []
+
+    def request():
+        conn = pool.connect()
+        conn.execute("SELECT 1").fetchone()
+        opened.append(conn._conn)
+        conn.close()
+
+    for _ in range(50):
+        thread = threading.Thread(target=request)
+        thread.start()
+        thread.join()
+    gc.collect()
+
+    for conn in opened:
+        try:
+            conn.execute("SELECT 1")
+        except sqlite3.ProgrammingError:
+            continue
+        raise AssertionError("connection of a finished thread is still open")
+
+
+def test_idle_connections_are_reused_within_a_thread(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"))
+    first = pool.connect()
+    raw = first._conn
+    first.close()
+    assert pool.connect()._conn is raw
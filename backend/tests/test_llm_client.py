@@ -0,0 +1,131 @@
+import sys
+import threading
+import time
+
+import pytest
+
+from ai import llm_client
+from ai.llm_client import LLMClient, LLMOverloaded, LLMTimeout
+from bench.fake_openai import start_server
+from bench.synthetic import create_catalog_db
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    """Start a stub OpenAI API; call it with the same arguments as start_server()."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(llm_client, "LLM_BACKOFF_BASE", 0.001)
+    servers = []
+
+    def start(**kwargs):
+        server = start_server(**kwargs)
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def _wait_for(client, **expected):
+    deadline = time.monotonic() + 5
+    while {k: client.stats()[k] for k in expected} != expected:
+        assert time.monotonic() < deadline, f"client never reached {expected}: {client.stats()}"
+        time.sleep(0.005)
+
+
+def _occupy(client) -> threading.Thread:
+    """Run one slow call in the background and return once it holds its slot."""
+    thread = threading.Thread(target=client.chat, args=(MESSAGES,), daemon=True)
+    thread.start()
+    _wait_for(client, in_flight=1)
+    return thread
+
+
+def test_full_queue_sheds_load(fake):
+    _, url = fake(latency=0.5)
+    outcomes = []
+    client = LLMClient(base_url=url, max_concurrency=1, max_queue=1, queue_timeout=5,
+                       on_call=lambda mode, outcome, seconds, usage: outcomes.append(outcome))
+    first = _occupy(client)
+    queued = threading.Thread(target=client.chat, args=(MESSAGES,), daemon=True)
+    queued.start()
+    _wait_for(client, waiting=1)
+
+    started = time.perf_counter()
+    with pytest.raises(LLMOverloaded):
+        client.chat(MESSAGES)
+    assert time.perf_counter() - started < 0.1  # shed at once, not after waiting
+    first.join()
+    queued.join()
+    assert sorted(outcomes) == ["ok", "ok", "overloaded"]
+    assert client.stats() == {"in_flight": 0, "waiting": 0, "max_queue": 1}
+
+
+def test_queued_request_is_shed_after_queue_timeout(fake):
+    _, url = fake(latency=0.5)
+    client = LLMClient(base_url=url, max_concurrency=1, max_queue=1, queue_timeout=0.05)
+    first = _occupy(client)
+    with pytest.raises(LLMOverloaded):
+        client.chat(MESSAGES)
+    first.join()
+    assert client.stats()["waiting"] == 0
+
+
+@pytest.mark.parametrize("status", [429, 500])
+def test_retry_after_rate_limit_or_server_error(fake, status):
+    # Every 2nd upstream call fails: the client's second request needs one retry
+    server, url = fake(latency=0, fail_every=2, fail_status=status)
+    client = LLMClient(base_url=url, retries=2)
+    client.chat(MESSAGES)
+    response = client.chat(MESSAGES)
+    assert response.choices[0].message.content
+    assert server.RequestHandlerClass.state["calls"] == 3
+
+
+def test_error_is_raised_when_retries_run_out(fake):
+    server, url = fake(latency=0, fail_every=1)
+    client = LLMClient(base_url=url, retries=2)
+    with pytest.raises(Exception) as raised:
+        client.chat(MESSAGES)
+    assert raised.type.__name__ == "InternalServerError"
+    assert server.RequestHandlerClass.state["calls"] == 3
+    assert client.stats()["in_flight"] == 0
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_timeout_does_not_hang(fake, stream):
+    _, url = fake(latency=2)
+    outcomes = []
+    client = LLMClient(base_url=url, timeout=0.2, retries=1,
+                       on_call=lambda mode, outcome, seconds, usage: outcomes.append(outcome))
+    started = time.perf_counter()
+    with pytest.raises(LLMTimeout):
+        if stream:
+            client.chat_stream(MESSAGES)
+        else:
+            client.chat(MESSAGES)
+    assert time.perf_counter() - started < 1.5  # two 0.2 s attempts, not the 2 s upstream
+    assert outcomes == ["timeout"]
+    assert client.stats()["in_flight"] == 0
+
+
+def test_shed_chat_request_gets_503(fake, tmp_path, monkeypatch):
+    _, url = fake(latency=0.5)
+    monkeypatch.setenv("CAFE_DB_PATH", create_catalog_db(str(tmp_path / "cafe.db"), 20))
+    monkeypatch.setenv("CONTACT_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setenv("AI_INTENT_LOG", "")
+    monkeypatch.setenv("AI_CACHE_DB", "")
+    # Modules read their settings at import; app.py must see this database
+    for name in ("app", "db", "catalog", "metrics", "branches", "notifications"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    import app
+
+    client = LLMClient(base_url=url, max_concurrency=1, max_queue=0)
+    monkeypatch.setattr(app, "llm_client", client)
+    first = _occupy(client)
+    resp = app.app.test_client().post("/api/ai-suggest", json={"message": "what should i get on a rainy day"})
+    first.join()
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "2"
@@ -0,0 +1,50 @@
+import re
+
+from metrics import Metrics
+
+SAMPLE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})? (\S+)$")
+HISTOGRAM_SUFFIXES = ("_bucket", "_sum", "_count")
+
+
+def families(text: str) -> list:
+    """[(family, kind, sample names)] in output order; fails on anything the text format forbids."""
+    result = []
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split()
+            assert name not in [f for f, _, _ in result], f"{name} has two TYPE lines"
+            result.append((name, kind, []))
+            continue
+        m = SAMPLE.match(line)
+        assert m, f"not a sample line: {line!r}"
+        float(m.group(3))
+        family, kind, samples = result[-1]
+        name = m.group(1)
+        allowed = {family + s for s in HISTOGRAM_SUFFIXES} if kind == "histogram" else {family}
+        assert name in allowed, f"{name} sample outside its family block (under {family})"
+        samples.append(name)
+    return result
+
+
+def test_prometheus_families_are_contiguous():
+    metrics = Metrics(enabled=True)
+    metrics.observe_query("SELECT 1", 0.001)
+    metrics.observe_query("SELECT 2", 0.002)
+    metrics.observe_query("SELECT 2", 0.003)
+    metrics.end_request("/api/products", "GET", 200, 0.01)
+    metrics.end_request("/menu", "GET", 200, 0.02)
+
+    found = {name: (kind, samples) for name, kind, samples in families(metrics.prometheus())}
+    assert found["cafe_sql_calls_total"] == ("counter", ["cafe_sql_calls_total"] * 2)
+    assert found["cafe_sql_seconds_total"] == ("counter", ["cafe_sql_seconds_total"] * 2)
+    assert found["cafe_http_request_duration_seconds"][0] == "histogram"
+    assert "cafe_http_requests_total" in found
+
+
+def test_prometheus_sql_values():
+    metrics = Metrics(enabled=True)
+    metrics.observe_query("SELECT 2", 0.5)
+    metrics.observe_query("SELECT 2", 0.25)
+    text = metrics.prometheus()
+    assert 'cafe_sql_calls_total{statement="SELECT 2"} 2' in text
+    assert 'cafe_sql_seconds_total{statement="SELECT 2"} 0.75' in text
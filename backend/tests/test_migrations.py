@@ -0,0 +1,21 @@
+import json
+import sqlite3
+
+import migrations
+
+
+def test_cold_beverages_become_cold_drinks(tmp_path, monkeypatch):
+    conn = sqlite3.connect(str(tmp_path / "cafe.db"), isolation_level=None)
+    monkeypatch.setattr(migrations, "MIGRATIONS", [m for m in migrations.MIGRATIONS if m[0] < 8])
+    migrations.migrate(conn)
+    conn.execute("INSERT INTO products (name, price, category) VALUES ('Lemonade', 50, 'Cold Beverages')")
+    conn.execute("INSERT INTO branches (slug, name, categories) VALUES ('b', 'B', ?)",
+                 (json.dumps(["Cold Beverages", "Coffee"]),))
+    monkeypatch.undo()
+
+    assert migrations.migrate(conn) == migrations.LATEST_VERSION
+    assert conn.execute("SELECT category FROM products").fetchone()[0] == "Cold Drinks"
+    assert conn.execute("SELECT version FROM menu_version").fetchone()[0] == 1
+    categories, version = conn.execute("SELECT categories, version FROM branches").fetchone()
+    assert json.loads(categories) == ["Cold Drinks", "Coffee"]
+    assert version == 1
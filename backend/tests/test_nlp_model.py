@@ -0,0 +1,80 @@
+import pytest
+
+from ai.hybrid import answer_locally
+from ai.nlp_model import _build_intent, analyze_text
+from ai.online_training import training_label
+
+
+def intent_for(message, ai_label=None, confidence=0.0):
+    return _build_intent(message, ai_label, confidence, {})
+
+
+@pytest.mark.parametrize("message", [
+    "I am not sure, maybe a chocolate dessert",
+    "free wifi? i want chocolate cake",
+    "no sugar please, a coffee",
+])
+def test_ingredients_outside_a_negation_are_not_excluded(message):
+    intent = intent_for(message)
+    assert intent["exclude_labels"] == []
+    assert intent["keyword_label"] != "allergy"
+
+
+def test_sugar_free_is_a_diet_keyword():
+    intent = intent_for("sugar free coffee")
+    assert intent["sugar_free"]
+    assert intent["keyword_label"] == "diet"
+    assert intent["exclude_labels"] == []
+
+
+def test_negation_covers_only_its_ingredient():
+    intent = intent_for("vegan coffee without milk")
+    assert intent["exclude_labels"] == ["milk"]
+    assert intent["keyword_label"] == "allergy"
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("no milk, eggs or nuts", {"milk", "egg", "nuts", "almond", "peanut"}),
+    ("gluten-free cake please", {"gluten"}),
+    ("i have a nut allergy", {"nuts", "almond", "peanut"}),
+    ("sütsüz kahve", {"milk"}),
+    ("çilek alerjim var", {"strawberry"}),
+])
+def test_negation_scopes(message, expected):
+    assert set(intent_for(message)["exclude_labels"]) == expected
+
+
+def test_keyword_bypass_ignores_unsure_classifier_flags():
+    intent = intent_for("sugar free coffee", ai_label="diet", confidence=0.3)
+    assert intent["low_calorie"]  # the classifier's guess, below any threshold
+    products = [
+        {"id": 1, "name": "Sugar Free Latte", "category": "Coffee", "price": 90, "labels": ["Sugar Free"]},
+        {"id": 2, "name": "Light Americano", "category": "Coffee", "price": 70, "labels": ["Low Calorie"]},
+    ]
+    answer = answer_locally(intent, products, threshold=0.9)
+    assert answer is not None
+    assert "low calorie" not in answer["reply"]
+    assert [p["id"] for p in answer["recommendations"]["coffee"]] == [1]
+
+
+@pytest.mark.parametrize("message", ["i want a latte", "what time do you open", "recommend a dessert"])
+def test_bundled_classifier_alone_does_not_take_the_fast_path(message):
+    products = [{"id": 1, "name": "Light Americano", "category": "Coffee", "price": 70, "labels": ["Low Calorie"]}]
+    assert answer_locally(analyze_text(message), products) is None
+
+
+@pytest.mark.parametrize("message, label", [
+    ("low calorie options", "diet"),
+    ("kalorisiz olsun", "diet"),
+    ("plant-based milk please", "vegan"),
+    ("no animal products", "vegan"),
+])
+def test_training_phrases_are_backed_by_keywords(message, label):
+    assert intent_for(message)["keyword_label"] == label
+
+
+def test_training_label_needs_agreement_or_a_scoped_ingredient():
+    assert training_label(intent_for("sugar free coffee", ai_label="allergy")) is None
+    assert training_label(intent_for("sugar free coffee", ai_label="diet")) == "diet"
+    assert training_label(intent_for("vegan coffee without milk", ai_label="vegan")) == "allergy"
+    assert training_label(intent_for("free wifi? i want chocolate cake", ai_label="allergy")) is None
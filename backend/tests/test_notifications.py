@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import time
+
+import notifications
+from migrations import migrate
+from notifications import NotificationQueue
+
+
+def _connect_to(path, delay=0.0):
+    def connect():
+        if delay:
+            time.sleep(delay)  # a slow disk: submissions pile up behind each batch
+        return sqlite3.connect(path)
+    return connect
+
+
+def _migrated(path):
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.close()
+    return path
+
+
+def _spool_size(queue):
+    return os.path.getsize(queue._spool_path)
+
+
+def test_spool_stays_bounded_under_sustained_load(tmp_path):
+    db = _migrated(str(tmp_path / "cafe.db"))
+    queue = NotificationQueue(_connect_to(db, delay=0.005), spool_dir=str(tmp_path / "spool"),
+                              max_pending=200, batch=20, delay=0)
+    largest = 0
+    for i in range(2000):
+        # The queue never drains: clients back off on 503 and try again
+        while not queue.submit("Ada", "ada@example.com", "Other", f"message {i:04d}"):
+            time.sleep(0.001)
+        largest = max(largest, _spool_size(queue))
+    assert queue.flush(30)
+    line = 150  # bytes per spooled message, roughly
+    # About twice what is still queued at most, not the whole history
+    assert queue.stats["compactions"] > 0
+    assert largest < 3 * 200 * line
+    assert _spool_size(queue) == 0
+    count = sqlite3.connect(db).execute("SELECT COUNT(*) FROM notifications").fetchone()[0]
+    assert count == 2000
+
+
+def test_failed_batch_stays_in_the_spool_and_is_retried(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(notifications, "RETRY_DELAY", 0)
+    db = str(tmp_path / "cafe.db")
+    sqlite3.connect(db).close()  # no schema yet: every insert fails
+    queue = NotificationQueue(_connect_to(db), spool_dir=str(tmp_path / "spool"), retries=2, delay=0)
+
+    assert queue.submit("Ada", "ada@example.com", "Other", "first")
+    assert not queue.flush(5)
+    assert queue.stats["failed_batches"] == 1
+    assert queue.stats["retries"] == 2
+    assert queue.pending() == 1
+    assert b"first" in open(queue._spool_path, "rb").read()
+    assert "ALERT" in capsys.readouterr().out
+
+    _migrated(db)
+    assert queue.submit("Ada", "ada@example.com", "Other", "second")
+    deadline = time.monotonic() + 5
+    while queue.pending() and time.monotonic() < deadline:
+        queue.flush(1)
+    messages = {row[0] for row in sqlite3.connect(db).execute("SELECT message FROM notifications")}
+    assert messages == {"first", "second"}
+    assert _spool_size(queue) == 0
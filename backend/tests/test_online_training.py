@@ -0,0 +1,13 @@
+import pytest
+
+from ai import online_training
+from ai.model_registry import ModelRegistry
+
+
+@pytest.mark.parametrize("argv", [["rollback"], ["rollback", "7"], ["rollback", "v7"]])
+def test_rollback_errors_are_one_line(argv, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(online_training, "ModelRegistry", lambda: ModelRegistry(root=str(tmp_path)))
+    assert online_training.main(argv) == 1
+    out = capsys.readouterr().out
+    assert out.startswith("Online Training: cannot roll back:")
+    assert out.count("\n") == 1
@@ -0,0 +1,27 @@
+import pytest
+
+from ai.response_cache import ResponseCache
+
+ANSWER = {"reply": "Try the oat latte", "recommendations": {}}
+
+
+@pytest.fixture(params=["memory", "persistent"])
+def cache(request, tmp_path):
+    path = str(tmp_path / "cache.db") if request.param == "persistent" else ""
+    return ResponseCache(persist_path=path)
+
+
+def test_answer_is_served_for_the_version_it_was_built_from(cache):
+    cache.sync_version(1)
+    assert cache.set("k", ANSWER, 1)
+    assert cache.get("k", 1) == ANSWER
+
+
+def test_answer_computed_across_a_menu_change_is_not_cached(cache):
+    cache.sync_version(1)
+    version = 1                    # read before the prompt is built
+    assert cache.get("k", version) is None
+    cache.sync_version(2)          # the menu changes while the LLM is answering
+    assert not cache.set("k", ANSWER, version)
+    assert cache.get("k", 2) is None
+    assert cache.get("k", 1) is None
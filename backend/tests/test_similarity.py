@@ -0,0 +1,53 @@
+import time
+
+import pytest
+
+from ai import similarity
+
+PRODUCTS = [
+    {"id": 1, "name": "Latte", "category": "Hot Beverages", "price": 60, "description": "espresso steamed milk", "labels": ["milk"]},
+    {"id": 2, "name": "Oat Latte", "category": "Hot Beverages", "price": 70, "description": "espresso steamed oat milk", "labels": ["vegan"]},
+    {"id": 3, "name": "Mocha", "category": "Hot Beverages", "price": 65, "description": "espresso chocolate milk", "labels": ["milk"]},
+    {"id": 4, "name": "Lemonade", "category": "Cold Drinks", "price": 50, "description": "fresh lemon", "labels": ["vegan"]},
+]
+
+
+@pytest.fixture
+def background(monkeypatch):
+    """Every versioned build goes to the background thread; the module starts empty."""
+    monkeypatch.setattr(similarity, "SIMILAR_SYNC_BUILD_MAX", 0)
+    monkeypatch.setattr(similarity, "_SIMILARITY_CACHE", (None, None))
+    monkeypatch.setattr(similarity, "_BUILDING", None)
+
+
+def _wait_for(version, products):
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        index = similarity.get_similarity_index(products, version)
+        if index is not None and index.version == version:
+            return index
+        time.sleep(0.01)
+    raise AssertionError(f"table for version {version} was never built")
+
+
+def test_first_table_builds_in_the_background(background):
+    assert similarity.get_similarity_index(PRODUCTS, 1) is None
+    index = _wait_for(1, PRODUCTS)
+    assert similarity.building_version() is None
+    assert [p["id"] for p, _ in index.similar(2)] == [1, 3, 4]
+
+
+def test_previous_table_answers_while_the_new_one_builds(background):
+    old = _wait_for(1, PRODUCTS)
+    menu = PRODUCTS + [{"id": 5, "name": "Cortado", "category": "Hot Beverages", "price": 55,
+                        "description": "espresso milk", "labels": ["milk"]}]
+    assert similarity.get_similarity_index(menu, 2) is old
+    new = _wait_for(2, menu)
+    assert 5 in new.position
+
+
+def test_unversioned_table_is_cached_per_products_list(monkeypatch):
+    monkeypatch.setattr(similarity, "_SIMILARITY_CACHE", (None, None))
+    index = similarity.get_similarity_index(PRODUCTS)
+    assert similarity.get_similarity_index(PRODUCTS) is index
+    assert similarity.get_similarity_index(list(PRODUCTS)) is not index
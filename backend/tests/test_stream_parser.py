@@ -0,0 +1,31 @@
+import pytest
+
+from ai.stream_parser import ReplyStreamParser
+
+
+def feed_all(chunks) -> ReplyStreamParser:
+    parser = ReplyStreamParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser
+
+
+@pytest.mark.parametrize("size", [1, 3, 100])
+def test_reply_is_decoded_across_chunks(size):
+    raw = '{"reply": "Caf\\u00e9 \\ud83d\\ude00 \\"latte\\"\\n", "recommendations": {}}'
+    parser = feed_all(raw[i:i + size] for i in range(0, len(raw), size))
+    assert parser.reply == 'Café 😀 "latte"\n'
+    assert parser.finish() == {"reply": parser.reply, "recommendations": {}}
+
+
+@pytest.mark.parametrize("escape", ["\\u12", "\\uzz12", "\\u 1a2", "\\u+1a2"])
+def test_malformed_unicode_escape_is_kept_as_text(escape):
+    raw = '{"reply": "a' + escape + 'b", "recommendations": {}}'
+    parser = feed_all(raw[i:i + 2] for i in range(0, len(raw), 2))
+    assert parser.reply == "a" + escape + "b"
+    assert parser.finish() is None  # not valid JSON; the caller falls back to the raw text
+
+
+def test_high_surrogate_without_low_half():
+    parser = feed_all(['{"reply": "x\\ud83d\\u0041y"}'])
+    assert parser.reply == "x\ud83dAy"
@@ -35,29 +35,20 @@ document.addEventListener("DOMContentLoaded", () => {
     try {
       const res = await fetch("/api/ai-suggest", {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ message: text })
+        headers: { "Content-Type": "application/json", "Accept": "text/event-stream" },
+        body: JSON.stringify({ message: text, stream: true, branch: document.body.dataset.branch || undefined })
       });
 
-      const data = await res.json();
-      
-      // Remove loading text
-      if (loadingEl) loadingEl.remove();
-
-      if (data.error) {
-        addMessage("bot", "Sorry, I encountered an error.");
+      // Errors (400/503/...) and non-streaming servers still answer with plain JSON
+      const type = res.headers.get("Content-Type") || "";
+      if (!type.includes("text/event-stream") || !res.body) {
+        const data = await res.json();
+        if (loadingEl) loadingEl.remove();
+        showResult(data);
         return;
       }
 
-      // Add Bot Reply
-      if (data.reply) {
-        addMessage("bot", data.reply);
-      }
-
-      // Add Recommendations
-      if (data.recommendations) {
-        renderRecommendations(data.recommendations);
-      }
+      await readStream(res.body, loadingEl);
 
     } catch (err) {
       if (loadingEl) loadingEl.remove();
@@ -65,14 +56,78 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   }
 
+  function showResult(data) {
+    if (data.error) {
+      addMessage("bot", "Sorry, I encountered an error.");
+      return;
+    }
+
+    // Add Bot Reply
+    if (data.reply) {
+      addMessage("bot", data.reply);
+    }
+
+    // Add Recommendations
+    if (data.recommendations) {
+      renderRecommendations(data.recommendations);
+    }
+  }
+
+  // Render Server-Sent Events as they arrive: reply text first, recommendations last
+  async function readStream(body, loadingEl) {
+    const reader = body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let replyEl = null;
+
+    function handleEvent(name, data) {
+      if (name === "reply") {
+        if (!replyEl) {
+          if (loadingEl) loadingEl.remove();
+          replyEl = document.getElementById(addMessage("bot", "")).querySelector(".msg-txt");
+        }
+        replyEl.textContent += data.text || "";
+        chatBody.scrollTop = chatBody.scrollHeight;
+      } else if (name === "recommendations") {
+        if (loadingEl) loadingEl.remove();
+        renderRecommendations(data);
+      } else if (name === "error") {
+        if (loadingEl) loadingEl.remove();
+        addMessage("bot", "Sorry, I encountered an error.");
+      }
+    }
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // Events are separated by a blank line
+      let sep;
+      while ((sep = buffer.indexOf("\n\n")) !== -1) {
+        const raw = buffer.slice(0, sep);
+        buffer = buffer.slice(sep + 2);
+        let name = "message";
+        let dataLines = [];
+        raw.split("\n").forEach(line => {
+          if (line.startsWith("event:")) name = line.slice(6).trim();
+          else if (line.startsWith("data:")) dataLines.push(line.slice(5).trim());
+        });
+        if (dataLines.length) handleEvent(name, JSON.parse(dataLines.join("\n")));
+      }
+    }
+    if (loadingEl) loadingEl.remove();
+  }
+
   sendBtn?.addEventListener("click", sendMessage);
   input?.addEventListener("keypress", (e) => {
     if (e.key === "Enter") sendMessage();
   });
 
   // Helpers
+  let msgCounter = 0;
   function addMessage(sender, text) {
-    const id = "msg-" + Date.now();
+    const id = "msg-" + Date.now() + "-" + (msgCounter++);
     const div = document.createElement("div");
     div.className = `chat-msg ${sender}`;
     div.id = id;
@@ -118,7 +173,7 @@ document.addEventListener("DOMContentLoaded", () => {
         };
         
         item.innerHTML = `
-            <img src="${p.image || '/static/images/placeholder.jpg'}" alt="${p.name}">
+            <img src="${(p.image_variants && p.image_variants["320"]) || p.image || '/static/images/placeholder.jpg'}" alt="${p.name}">
             <div class="rec-info">
                 <div class="rec-name">${p.name}</div>
                 <div class="rec-price">${p.price} TL</div>
@@ -1,10 +1,8 @@
-let ALL_PRODUCTS = [];
-let ACTIVE_CAT = "All";
-
-function catMatches(p, cat) {
-  if (cat === "All") return true;
-  return (p.category || "") === cat;
-}
+// The first page of every category arrives server-rendered in menu.html;
+// this script only switches categories, loads further pages and opens the modal.
+const PAGE_SIZE = 24;
+// Every product on the page, for the product modal
+const PRODUCTS_BY_ID = new Map();
 
 function imgUrl(p) {
 
@@ -13,64 +11,109 @@ function imgUrl(p) {
   return "/static/images/placeholder.jpg";
 }
 
-function renderGrid() {
-  const grid = document.getElementById("menuGrid");
-  if (!grid) return;
-
-  const items = ALL_PRODUCTS.filter(p => catMatches(p, ACTIVE_CAT));
-
-  if (!items.length) {
-    grid.innerHTML = `<p style="color:#666;font-weight:600;">No products yet. Please add products from Admin Panel.</p>`;
-    return;
-  }
+// Resized WebP variants ({width: url}) when the image worker has built them
+function imgTag(p) {
+  const variants = p.image_variants || {};
+  const widths = Object.keys(variants).map(Number).sort((a, b) => a - b);
+  if (!widths.length) return `<img src="${imgUrl(p)}" alt="${p.name}" loading="lazy">`;
+  const srcset = widths.map(w => `${variants[w]} ${w}w`).join(", ");
+  return `<img src="${variants[widths[0]]}" srcset="${srcset}" sizes="(max-width: 600px) 50vw, 320px" alt="${p.name}" loading="lazy" decoding="async">`;
+}
 
-  grid.innerHTML = items.map(p => `
-    <div class="menu-card" data-id="${p.id}">
-      <img src="${imgUrl(p)}" alt="${p.name}">
+// Same markup as templates/menu_category.html
+function cardHtml(p, cat) {
+  return `
+    <div class="menu-card" data-id="${p.id}" data-cat="${cat}">
+      ${imgTag(p)}
       <div class="card-info">
         <h3>${p.name}</h3>
         <div class="card-category">${p.category}</div>
         <div class="card-price">${Number(p.price || 0).toFixed(0)} TL</div>
       </div>
     </div>
-  `).join("");
-
-
-  grid.querySelectorAll(".menu-card").forEach(card => {
-    card.addEventListener("click", () => {
-      const productId = card.dataset.id;
-      const p = ALL_PRODUCTS.find(x => String(x.id) === String(productId));
-      if (p && window.openProductModal) {
-        window.openProductModal(p);
-      }
-    });
-  });
+  `;
 }
 
 function setActiveFilter(cat) {
-  ACTIVE_CAT = cat;
-  document.querySelectorAll(".filter-btn").forEach(btn => {
-    btn.classList.toggle("active", btn.dataset.cat === cat);
+  document.querySelectorAll(".filter-btn[data-cat]").forEach(btn => {
+    if (!btn.classList.contains("menu-more")) btn.classList.toggle("active", btn.dataset.cat === cat);
+  });
+  document.querySelectorAll(".menu-category").forEach(block => {
+    block.hidden = cat !== "All" && block.dataset.cat !== cat;
   });
-  renderGrid();
 }
 
-async function loadProducts() {
-  const res = await fetch("/api/products");
-  ALL_PRODUCTS = await res.json();
-  renderGrid();
+function pageUrl(cat, cursor) {
+  const params = new URLSearchParams({ limit: PAGE_SIZE, category: cat, cursor });
+  // Branch menus (/menu?branch=...) page through that branch's prices and availability
+  if (document.body.dataset.branch) params.set("branch", document.body.dataset.branch);
+  return `/api/products?${params}`;
+}
+
+async function loadMore(btn) {
+  // Further pages of one category come from the keyset API, revalidated by ETag
+  btn.disabled = true;
+  const cat = btn.dataset.cat;
+  const res = await fetch(pageUrl(cat, btn.dataset.cursor));
+  if (!res.ok) throw new Error(`HTTP ${res.status}`);
+  const page = await res.json();
+
+  page.items.forEach(p => PRODUCTS_BY_ID.set(String(p.id), p));
+  btn.insertAdjacentHTML("beforebegin", page.items.map(p => cardHtml(p, cat)).join(""));
+  if (page.next_cursor) {
+    btn.dataset.cursor = page.next_cursor;
+    btn.disabled = false;
+  } else {
+    btn.remove();
+  }
+}
+
+function showLoadError(btn) {
+  btn.disabled = false;
+  btn.textContent = "Could not load products, try again";
+}
+
+// First contentful paint and time to first byte, reported to /api/rum for /admin/metrics
+function reportPaintTiming() {
+  if (!("PerformanceObserver" in window) || !navigator.sendBeacon) return;
+  const nav = performance.getEntriesByType("navigation")[0];
+  try {
+    new PerformanceObserver((list, observer) => {
+      const fcp = list.getEntries().find(e => e.name === "first-contentful-paint");
+      if (!fcp) return;
+      observer.disconnect();
+      const timing = { page: "menu", fcp: fcp.startTime, ttfb: nav ? nav.responseStart : null };
+      navigator.sendBeacon("/api/rum", JSON.stringify(timing));
+    }).observe({ type: "paint", buffered: true });
+  } catch (e) { /* paint timing not supported */ }
 }
 
 document.addEventListener("DOMContentLoaded", () => {
+  document.querySelectorAll("script.menu-data").forEach(el => {
+    JSON.parse(el.textContent).forEach(p => PRODUCTS_BY_ID.set(String(p.id), p));
+  });
+
   document.getElementById("menuFilters")?.addEventListener("click", (e) => {
     const btn = e.target.closest(".filter-btn");
     if (!btn) return;
     setActiveFilter(btn.dataset.cat);
   });
 
-  loadProducts().catch(() => {
-    const grid = document.getElementById("menuGrid");
-    if (grid) grid.innerHTML = `<p style="color:#666;font-weight:600;">Could not load products.</p>`;
+  document.getElementById("menuGrid")?.addEventListener("click", (e) => {
+    const more = e.target.closest(".menu-more");
+    if (more) {
+      loadMore(more).catch(() => showLoadError(more));
+      return;
+    }
+    const card = e.target.closest(".menu-card");
+    const p = card && PRODUCTS_BY_ID.get(String(card.dataset.id));
+    if (p && window.openProductModal) {
+      window.openProductModal(p);
+    }
   });
-});
 
+  // Copies kept by earlier versions are no longer used
+  try { localStorage.removeItem("menuCache"); } catch (e) { /* storage disabled */ }
+
+  reportPaintTiming();
+});
@@ -1,30 +1,3 @@
-document.addEventListener("DOMContentLoaded", () => {
-  const buttons = document.querySelectorAll(".filter-btn");
-  const cards = document.querySelectorAll(".menu-card");
-
-  function applyFilter(filter) {
-    cards.forEach(card => {
-      const cat = card.dataset.category; // coffee / tea / cold / sweet
-      if (filter === "all" || cat === filter) {
-        card.style.display = "block";
-      } else {
-        card.style.display = "none";
-      }
-    });
-  }
-
-  buttons.forEach(btn => {
-    btn.addEventListener("click", () => {
-      buttons.forEach(b => b.classList.remove("active"));
-      btn.classList.add("active");
-      applyFilter(btn.dataset.filter);
-    });
-  });
-
-  
-  applyFilter("all");
-});
-
 window.openProductModal = function(p) {
   const modal = document.getElementById("productModal");
   if(!modal) return;
@@ -32,6 +5,9 @@ window.openProductModal = function(p) {
 
   
   const getImg = (obj) => {
+      const variants = obj.image_variants || {};
+      const largest = Object.keys(variants).map(Number).sort((a, b) => b - a)[0];
+      if(largest) return variants[largest];
       if(obj.image && obj.image.startsWith("/static/")) return obj.image;
       if(obj.image) return `/static/images/${obj.image}`;
       return "/static/images/placeholder.jpg";
@@ -46,6 +22,7 @@ window.openProductModal = function(p) {
   const tagsEl = document.getElementById("modalTags");
   const labels = p.labels || [];
   tagsEl.innerHTML = labels.map(l => `<span class="modal-tag">${l}</span>`).join("");
+  loadSimilar(p);
 
   modal.style.display = "flex";
 
@@ -67,4 +44,35 @@ window.openProductModal = function(p) {
   modal.addEventListener("click", overlayClose);
   closeBtn.addEventListener("click", onClose);
   document.addEventListener("keydown", escClose);
-};
\ No newline at end of file
+};
+// "You may also like": precomputed neighbours from /api/products/<id>/similar
+let similarFor = null;
+
+async function loadSimilar(p) {
+  const box = document.getElementById("modalSimilar");
+  const list = document.getElementById("modalSimilarList");
+  if (!box || !list || p.id == null) return;
+  box.hidden = true;
+  similarFor = p.id;
+  try {
+    const branch = document.body.dataset.branch;
+    const res = await fetch(`/api/products/${p.id}/similar?limit=4` + (branch ? `&branch=${encodeURIComponent(branch)}` : ""));
+    if (!res.ok) return;
+    const { items } = await res.json();
+    // Another product was opened while this one loaded
+    if (similarFor !== p.id || !items.length) return;
+    // Names come from the database: set as text, never as HTML
+    list.replaceChildren(...items.map(item => {
+      const btn = document.createElement("button");
+      btn.type = "button";
+      btn.className = "modal-similar-item";
+      btn.textContent = item.name || "";
+      const price = document.createElement("span");
+      price.textContent = `${Number(item.price || 0).toFixed(0)} TL`;
+      btn.appendChild(price);
+      btn.addEventListener("click", () => window.openProductModal(item));
+      return btn;
+    }));
+    box.hidden = false;
+  } catch (e) { /* suggestions are optional */ }
+}